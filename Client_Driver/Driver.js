@@ -305,7 +305,7 @@ function connectOpenCVDataStream() {
         if (data.message) {
             if (data.type === 'error') { systemStatusOpenCVEl.textContent = data.message; systemStatusOpenCVEl.className = 'status-error'; setOpenCVAlertMessage(data.message, 'error'); }
             else if (data.type === 'calibration_info') { systemStatusOpenCVEl.textContent = data.message; systemStatusOpenCVEl.className = 'status-calibrating'; if(calibrationStatusOpenCVEl) calibrationStatusOpenCVEl.textContent = 'Sedang Berlangsung'; }
-            else if (data.type === 'calibration_done') { systemStatusOpenCVEl.textContent = 'OpenCV Terkalibrasi & Memantau'; systemStatusOpenCVEl.className = 'status-monitoring'; if(calibrationStatusOpenCVEl) calibrationStatusOpenCVEl.textContent = 'Selesai'; setOpenCVAlertMessage(data.message || 'Kalibrasi Selesai!', 'normal'); }
+            else if (data.type === 'calibration_done' || data.type === 'calibration_resumed') { systemStatusOpenCVEl.textContent = 'OpenCV Terkalibrasi & Memantau'; systemStatusOpenCVEl.className = 'status-monitoring'; if(calibrationStatusOpenCVEl) calibrationStatusOpenCVEl.textContent = 'Selesai'; setOpenCVAlertMessage(data.message || 'Kalibrasi Selesai!', 'normal'); }
             else if (data.type === 'no_face') { 
                 systemStatusOpenCVEl.textContent = data.message; systemStatusOpenCVEl.className = 'status-no-face'; 
                 if(earValueOpenCVEl) earValueOpenCVEl.textContent = '-'; 
@@ -369,6 +369,14 @@ function connectOpenCVDataStream() {
             }
         }
     });
+
+    opencvSocket.on('alarm_escalation', (data) => {
+        // Eskalasi dari dispatcher alarm Python: kantuk berlanjut, teruskan ke supervisor.
+        console.log('[DriverJS] ⚠️ Eskalasi alarm (level ' + data.level + '):', data);
+        if (webrtcWebsocket && webrtcWebsocket.readyState === WebSocket.OPEN && myDriverId) {
+            webrtcWebsocket.send(JSON.stringify({ type: 'driver_alarm_escalation', driver_id: myDriverId, message: data.message, level: data.level, episode_seconds: data.episode_seconds, timestamp: new Date().toISOString() }));
+        }
+    });
 }
 
 function formatOpenCVValue(value, precision = 3, defaultValue = '-') { return (value != null && value !== -1 && !isNaN(Number(value))) ? Number(value).toFixed(precision) : defaultValue; }
@@ -1,14 +1,16 @@
-from flask import Flask, render_template, Response, request, jsonify
-from flask_socketio import SocketIO, emit
-import cv2
-import dlib
-import numpy as np
-from scipy.spatial import distance
+import atexit
 import time
-import threading
+STARTUP_BEGIN = time.perf_counter() # Acuan waktu startup (dilaporkan di /ready)
+from flask import Flask, render_template, Response, request, jsonify, abort
+from flask_socketio import SocketIO, emit
 import os
-import collections
 import traceback # Untuk debugging exception
+from alarm_dispatcher import AlarmDispatcher, engine_alarm_fn, post_webhook
+from drowsiness_engine import DrowsinessEngine, EngineManager, parse_camera_source
+from event_store import EventStore
+from mjpeg_stream import ViewerPacer, mjpeg_part, placeholder_jpeg
+from metrics import MetricsRegistry
+from model_registry import MODEL_FAILED, get_registry
 
 # --- Konfigurasi Awal & Path ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -21,12 +23,12 @@ print(f"[*] Looking for HTML templates in: {TEMPLATE_FOLDER}")
 
 app = Flask(__name__, template_folder=TEMPLATE_FOLDER)
 app.config['SECRET_KEY'] = 'kunci_rahasia_anda_yang_sangat_aman_dan_unik!' # GANTI INI!
-socketio = SocketIO(app, cors_allowed_origins="*")
+# async_mode 'threading' eksplisit: capture/deteksi/kamera/alarm berjalan di threading.Thread biasa dan
+# memanggil socketio.emit dari sana. Tanpa ini Flask-SocketIO otomatis memilih eventlet (jika terpasang),
+# yang tanpa monkey_patch() tidak mendukung emit dari thread native (emit tersendat/hilang).
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
 print("[*] Aplikasi Flask dan SocketIO diinisialisasi.")
 
-call_status_http = {'in_call': False, 'call_type': None }
-camera_requested_by_webrtc = False
-
 try:
     import winsound
     SOUND_ENABLED = True
@@ -37,378 +39,368 @@ except ImportError:
     print("[WARNING] Modul 'winsound' tidak ditemukan. Alarm suara akan dinonaktifkan.")
     def play_alarm_sound_internal(): print("ALARM! MENGANTUK TERDETEKSI! (Suara dinonaktifkan)")
 
-CONSEC_FRAMES_THRESHOLD = 20
-frame_counter_consecutive_closed = 0
-alarm_on = False
-last_alarm_time = time.time()
-ALARM_COOLDOWN = 5
-
-CALIBRATION_FRAMES_TARGET = 60
-calibration_ear_values = []
-is_calibrated = False
-DYNAMIC_EAR_THRESHOLD = 0.25 
-INITIAL_OPEN_EAR_AVG = 0.30
-
-PERCLOS_WINDOW_SIZE = 90 
-PERCLOS_THRESHOLD = 0.35 
-eye_closure_deque = collections.deque(maxlen=PERCLOS_WINDOW_SIZE)
-
-print("[*] Memuat Dlib frontal face detector...")
-try:
-    detector = dlib.get_frontal_face_detector()
-    print("[*] Dlib frontal face detector berhasil dimuat.")
-    if not os.path.exists(MODEL_PATH):
-        print(f"[ERROR] File model Dlib tidak ditemukan di: {MODEL_PATH}")
-        predictor = None
-    else:
-        predictor = dlib.shape_predictor(MODEL_PATH)
-        print("[*] Dlib shape predictor berhasil dimuat.")
-except Exception as e:
-    print(f"[ERROR] Gagal memuat model Dlib: {e}")
-    detector = None
-    predictor = None
-
-cap = None
-camera_lock = threading.Lock()
-active_sio_clients = 0
-
-left_eye_idx = list(range(42, 48))
-right_eye_idx = list(range(36, 42))
-
-def calculate_ear(eye_landmarks):
-    A = distance.euclidean(eye_landmarks[1], eye_landmarks[5])
-    B = distance.euclidean(eye_landmarks[2], eye_landmarks[4])
-    C = distance.euclidean(eye_landmarks[0], eye_landmarks[3])
-    if C == 0: return INITIAL_OPEN_EAR_AVG
-    return (A + B) / (2.0 * C)
-
-def sound_alarm_thread_target():
-    if SOUND_ENABLED: play_alarm_sound_internal()
-    else: print("ALARM! MENGANTUK TERDETEKSI! (Suara dinonaktifkan)")
-
-def reset_detection_state(source="unknown"):
-    global is_calibrated, calibration_ear_values, frame_counter_consecutive_closed, alarm_on, eye_closure_deque, last_alarm_time, DYNAMIC_EAR_THRESHOLD
-    is_calibrated = False
-    calibration_ear_values = []
-    frame_counter_consecutive_closed = 0
-    alarm_on = False
-    eye_closure_deque.clear()
-    last_alarm_time = time.time()
-    DYNAMIC_EAR_THRESHOLD = 0.25
-    print(f"[INFO] Status deteksi dan kalibrasi direset (sumber: {source}).")
-    socketio.emit('status_update', {
-        'message': 'Kalibrasi dimulai ulang...', 'is_calibrated': False,
-        'dynamic_threshold': DYNAMIC_EAR_THRESHOLD, 'type': 'calibration_info'
+# Model Dlib dimuat lazy di thread latar (lihat model_registry.py) agar server langsung bisa menerima
+# koneksi; engine mendapat model lewat on_ready, progres pemuatan terlihat di /ready.
+model_registry = get_registry(MODEL_PATH)
+
+# Track-then-detect: detector HOG penuh hanya tiap FACE_DETECT_KEYFRAME_INTERVAL frame
+# atau saat confidence tracker turun. Mode: 'off', 'correlation', 'roi' (lihat face_tracker.py).
+# Default 'off' (detector penuh tiap frame, perilaku lama) sampai latensi & deviasi EAR tiap mode diukur
+# pada rekaman kabin dengan benchmarks/bench_face_tracking.py; aktifkan lewat env FACE_TRACKING_MODE.
+FACE_TRACKING_MODE = os.environ.get('FACE_TRACKING_MODE', 'off')
+FACE_DETECT_KEYFRAME_INTERVAL = 10
+FACE_TRACKING_MIN_CONFIDENCE = 7.0
+# Skala citra untuk deteksi wajah (1.0 = resolusi penuh). Landmark & EAR tetap dihitung di resolusi penuh.
+# Pilih nilai termurah yang EAR-nya masih stabil dengan benchmarks/bench_detection_scale.py.
+FACE_DETECTION_SCALE = 1.0
+FACE_TRACKER_KWARGS = {'mode': FACE_TRACKING_MODE, 'keyframe_interval': FACE_DETECT_KEYFRAME_INTERVAL,
+                       'min_confidence': FACE_TRACKING_MIN_CONFIDENCE, 'detection_scale': FACE_DETECTION_SCALE}
+
+# Sumber kamera per driver, format "DriverA=0;DriverB=rtsp://host/stream" (angka = indeks kamera).
+# Driver pertama memakai namespace Socket.IO default '/' (kompatibel dengan Driver.js),
+# driver lain di namespace '/driver/<driver_id>'.
+CAMERA_SOURCES = os.environ.get('CAMERA_SOURCES', 'default=0')
+DETECTION_WORKERS = int(os.environ.get('DETECTION_WORKERS', os.cpu_count() or 1))
+TELEMETRY_RATE_HZ = 5.0 # Frekuensi kirim update_data ke klien (0 = setiap frame seperti sebelumnya)
+
+# Encode MJPEG: kualitas JPEG & skala output stream (deteksi tetap di resolusi penuh).
+# Default 95 = kualitas bawaan cv2.imencode (sama seperti sebelumnya). Operator boleh menurunkan (mis.
+# JPEG_QUALITY=80) untuk menghemat bandwidth/waktu encode dengan artefak kompresi lebih terlihat;
+# bandingkan avg_jpeg_bytes dengan benchmarks/bench_pipeline.py run --jpeg-quality.
+JPEG_QUALITY = int(os.environ.get('JPEG_QUALITY', '95'))
+STREAM_SCALE = 1.0
+# Batas default per viewer (0 = tanpa batas); bisa diubah per viewer lewat /video_feed?fps=10&kbps=800
+VIEWER_MAX_FPS = 0
+VIEWER_MAX_KBPS = 0
+
+# Instrumentasi latensi per tahap (/metrics, format Prometheus). METRICS_LOG_INTERVAL > 0: dump berkala ke log.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+METRICS_LOG_INTERVAL = float(os.environ.get('METRICS_LOG_INTERVAL', '0'))
+metrics = MetricsRegistry(enabled=METRICS_ENABLED)
+
+# Riwayat alarm/kalibrasi & deret EAR per driver (SQLite WAL, ditulis batch di thread latar; lihat event_store.py).
+# EVENT_STORE_PATH kosong = nonaktif. Query: /history/<driver_id>/alarms dan /history/<driver_id>/ear
+EVENT_STORE_PATH = os.environ.get('EVENT_STORE_PATH', os.path.join(BASE_DIR, "data", "events.db"))
+EVENT_RETENTION_DAYS = float(os.environ.get('EVENT_RETENTION_DAYS', '30'))
+EVENT_FLUSH_INTERVAL = 1.0 # Detik maksimum record menunggu di antrean sebelum ditulis
+HISTORY_DEFAULT_RANGE = 3600 # Rentang default query riwayat (detik ke belakang dari sekarang)
+event_store = None
+if EVENT_STORE_PATH:
+    try:
+        event_store = EventStore(EVENT_STORE_PATH, flush_interval=EVENT_FLUSH_INTERVAL, retention_days=EVENT_RETENTION_DAYS)
+        event_store.start()
+        atexit.register(event_store.stop) # Tulis record yang masih di antrean (<= EVENT_FLUSH_INTERVAL) saat server berhenti
+    except Exception as e:
+        print(f"[WARNING] Event store tidak bisa dibuka ({EVENT_STORE_PATH}): {e}. Riwayat tidak disimpan.")
+        event_store = None
+
+def collect_event_store_metrics():
+    if event_store is None: return
+    stats = event_store.stats()
+    yield ('event_store_written_total', 'counter', 'Record riwayat yang sudah ditulis ke SQLite', {}, stats['written'])
+    yield ('event_store_dropped_total', 'counter', 'Record riwayat yang dibuang (antrean penuh/gagal tulis)', {}, stats['dropped'])
+    yield ('event_store_queued', 'gauge', 'Record riwayat yang menunggu ditulis', {}, stats['queued'])
+
+metrics.add_collector(collect_event_store_metrics)
+
+
+# Alarm dikirim oleh satu thread dispatcher (lihat alarm_dispatcher.py), bereskalasi selama kantuk berlanjut:
+# audio (langsung) -> push Socket.IO ke supervisor -> webhook HTTP (jika ALARM_WEBHOOK_URL diisi).
+ALARM_DEBOUNCE_SECONDS = 5.0 # Alarm yang kembali dalam jendela ini dianggap episode yang sama
+ALARM_SUPERVISOR_ESCALATE_SECONDS = 5.0
+ALARM_WEBHOOK_ESCALATE_SECONDS = 15.0
+ALARM_WEBHOOK_URL = os.environ.get('ALARM_WEBHOOK_URL', '') # mis. http://127.0.0.1:8099/alarm
+
+def deliver_alarm_audio(alarm): play_alarm_sound_internal() # winsound.Beep memblok ~1 s, tapi hanya di thread dispatcher
+
+def deliver_alarm_supervisor(alarm):
+    engine = engine_manager.get(alarm['driver_id'])
+    if engine is None: return
+    engine.emit('alarm_escalation', {
+        'message': f"ESKALASI: Pengemudi masih mengantuk selama {alarm['episode_seconds']:.0f} detik ({alarm['reason']})",
+        'type': 'escalation', 'level': alarm['level'], 'reason': alarm['reason'], 'episode_seconds': alarm['episode_seconds'],
     })
 
-@socketio.on('connect')
-def handle_connect():
-    global cap, active_sio_clients, camera_lock, camera_requested_by_webrtc, is_calibrated, DYNAMIC_EAR_THRESHOLD
-    with camera_lock:
-        active_sio_clients += 1
-        print(f"[SocketIO] Klien terhubung (SID: {request.sid}). Klien aktif: {active_sio_clients}")
+def deliver_alarm_webhook(alarm): post_webhook(ALARM_WEBHOOK_URL, alarm)
+
+alarm_levels = [('audio', 0.0, deliver_alarm_audio), ('supervisor', ALARM_SUPERVISOR_ESCALATE_SECONDS, deliver_alarm_supervisor)]
+if ALARM_WEBHOOK_URL: alarm_levels.append(('webhook', ALARM_WEBHOOK_ESCALATE_SECONDS, deliver_alarm_webhook))
+alarm_dispatcher = AlarmDispatcher(alarm_levels, debounce_seconds=ALARM_DEBOUNCE_SECONDS, metrics=metrics)
+alarm_dispatcher.start()
+
+def collect_alarm_metrics():
+    stats = alarm_dispatcher.stats()
+    yield ('alarm_episodes_total', 'counter', 'Episode alarm kantuk (alert berulang dalam debounce = satu episode)', {}, stats['episodes'])
+    yield ('alarm_debounced_total', 'counter', 'Alert yang digabung ke episode berjalan tanpa kirim ulang', {}, stats['debounced'])
+    yield ('alarm_dropped_total', 'counter', 'Perintah alarm dibuang karena antrean dispatcher penuh', {}, stats['dropped'])
+
+metrics.add_collector(collect_alarm_metrics)
+
+dispatch_alarm = engine_alarm_fn(alarm_dispatcher) # Dipanggil dari loop deteksi: hanya memasukkan perintah ke antrean
+
+engine_manager = EngineManager(workers=DETECTION_WORKERS)
+for index, entry in enumerate(e for e in CAMERA_SOURCES.split(';') if e.strip()):
+    driver_id, _, camera_source = entry.partition('=')
+    driver_id = driver_id.strip()
+    engine_manager.add_engine(DrowsinessEngine(
+        driver_id, parse_camera_source(camera_source or '0'), '/' if index == 0 else f'/driver/{driver_id}',
+        None, None, socketio.emit, dispatch_alarm, tracker_kwargs=FACE_TRACKER_KWARGS,
+        telemetry_rate_hz=TELEMETRY_RATE_HZ, jpeg_quality=JPEG_QUALITY, stream_scale=STREAM_SCALE,
+        metrics=metrics, event_store=event_store))
+default_engine = engine_manager.engines()[0]
+
+def attach_models_to_engines(detector, predictor):
+    for engine in engine_manager.engines(): engine.attach_models(detector, predictor)
+
+model_registry.on_ready(attach_models_to_engines)
+model_registry.start_background_load()
+
+def handle_connect(engine):
+    sid = request.sid
+    with engine.camera_lock:
+        engine.active_sio_clients += 1
+        print(f"[SocketIO] [{engine.driver_id}] Klien terhubung (SID: {sid}). Klien aktif: {engine.active_sio_clients}")
         
         cam_status_message = 'Terhubung ke server deteksi.'
         current_cam_ready = False
-        trigger_reset = False # Flag apakah reset_detection_state perlu dipanggil
 
-        if camera_requested_by_webrtc:
+        if engine.camera_requested_by_webrtc:
             print("[Kamera] handle_connect: Kamera sedang diminta oleh WebRTC. Tidak ada aksi kamera.")
             cam_status_message = 'Terhubung, kamera digunakan WebRTC.'
-        elif call_status_http['in_call']:
+        elif engine.call_status_http['in_call']:
             print("[Kamera] handle_connect: Panggilan HTTP aktif. Tidak ada aksi kamera.")
             cam_status_message = 'Terhubung, kamera digunakan panggilan HTTP.'
-        elif cap is None:
-            print("[Kamera] handle_connect: Kamera belum ada, mencoba membuka...")
-            cap = cv2.VideoCapture(0)
-            if cap.isOpened():
-                print("[Kamera] handle_connect: Kamera berhasil diakuisisi.")
-                trigger_reset = True # Akan memanggil reset_detection_state
-                cam_status_message = "Terhubung. Kalibrasi dimulai..." 
-                current_cam_ready = True
-            else:
-                print("[ERROR] handle_connect: GAGAL mengakuisisi kamera.")
-                cap = None
-                cam_status_message = 'Terhubung, GAGAL buka kamera deteksi.'
-        elif cap.isOpened():
+        elif engine.camera.is_streaming():
             print("[Kamera] handle_connect: Kamera sudah aktif dan terbuka.")
             current_cam_ready = True
-            cam_status_message = "Terhubung. Status deteksi: " + ("Memantau" if is_calibrated else "Kalibrasi")
-        else: 
-            print("[Kamera] handle_connect: Kamera ada tapi tidak terbuka. Mencoba membuka ulang...")
-            cap.release() 
-            cap = cv2.VideoCapture(0)
-            if cap.isOpened():
-                print("[Kamera] handle_connect: Kamera berhasil dibuka ulang.")
-                trigger_reset = True
-                cam_status_message = "Terhubung. Kalibrasi dimulai..."
-                current_cam_ready = True
-            else:
-                print("[ERROR] handle_connect: GAGAL membuka ulang kamera.")
-                cap = None
-                cam_status_message = 'Terhubung, GAGAL membuka ulang kamera deteksi.'
-        
-        if trigger_reset:
-            reset_detection_state(source="handle_connect_new_or_reopened_cap")
-        else: # Emit status jika reset tidak dipanggil (karena reset sudah emit sendiri)
-            socketio.emit('status_update', {
-                'message': cam_status_message,
-                'is_calibrated': is_calibrated if current_cam_ready else False,
-                'dynamic_threshold': DYNAMIC_EAR_THRESHOLD if current_cam_ready and is_calibrated else None,
-                'type': 'info' if current_cam_ready else ('error' if "GAGAL" in cam_status_message else 'info')
-            }, room=request.sid)
-
-
-@socketio.on('disconnect')
-def handle_disconnect():
-    global cap, active_sio_clients, camera_lock, camera_requested_by_webrtc
-    with camera_lock:
-        active_sio_clients -= 1
-        print(f"[SocketIO] Klien terputus (SID: {request.sid}). Klien aktif: {active_sio_clients}")
-        if active_sio_clients <= 0 and not call_status_http['in_call'] and not camera_requested_by_webrtc:
-            active_sio_clients = 0 
-            if cap is not None:
-                print("[Kamera] Tidak ada klien aktif & kamera bebas, melepaskan kamera...")
-                cap.release()
-                cap = None
-                print("[Kamera] Kamera berhasil dilepaskan.")
-
-@socketio.on('request_camera_release')
-def handle_request_camera_release(data):
-    global cap, camera_lock, camera_requested_by_webrtc
-    sid = request.sid; driver_id_log = data.get('driver_id', 'N/A')
-    print(f"[SocketIO] Klien {sid} (Driver: {driver_id_log}) -> PELEPASAN kamera untuk WebRTC.")
-    with camera_lock:
-        camera_requested_by_webrtc = True 
-        if cap is not None:
-            print("[Kamera] Melepaskan `cap` atas permintaan Driver.js...")
-            cap.release()
-            cap = None
-            print("[Kamera] `cap` DILEPASKAN untuk WebRTC.")
-            socketio.emit('status_update', {'message': 'Kamera internal dilepaskan untuk WebRTC.', 'type': 'info'})
+            cam_status_message = "Terhubung. Status deteksi: " + ("Memantau" if engine.state.is_calibrated else "Kalibrasi")
         else:
-            print("[Kamera] `cap` sudah tidak aktif, tidak ada yang dilepaskan.")
-            socketio.emit('status_update', {'message': 'Kamera internal sudah nonaktif.', 'type': 'info'})
+            # Pembukaan kamera berjalan di thread CameraManager; status kalibrasi dikirim saat kamera siap.
+            print("[Kamera] handle_connect: Kamera belum aktif, meminta pembukaan kamera...")
+            engine.camera.request_open("handle_connect")
+            cam_status_message = 'Terhubung. Membuka kamera deteksi...'
+
+    engine.emit('status_update', {
+        'message': cam_status_message,
+        'is_calibrated': engine.state.is_calibrated if current_cam_ready else False,
+        'dynamic_threshold': engine.state.ear_threshold if current_cam_ready and engine.state.is_calibrated else None,
+        'type': 'info'
+    }, room=sid)
+
+
+def handle_disconnect(engine):
+    with engine.camera_lock:
+        engine.active_sio_clients -= 1
+        print(f"[SocketIO] [{engine.driver_id}] Klien terputus (SID: {request.sid}). Klien aktif: {engine.active_sio_clients}")
+        if engine.active_sio_clients <= 0 and not engine.call_status_http['in_call'] and not engine.camera_requested_by_webrtc:
+            engine.active_sio_clients = 0 
+            print("[Kamera] Tidak ada klien aktif & kamera bebas, melepaskan kamera...")
+            engine.camera.release("no_active_clients")
+
+def handle_request_camera_release(engine, data):
+    sid = request.sid; driver_id_log = data.get('driver_id', 'N/A')
+    print(f"[SocketIO] Klien {sid} (Driver: {driver_id_log}) -> PELEPASAN kamera '{engine.driver_id}' untuk WebRTC.")
+    with engine.camera_lock:
+        engine.camera_requested_by_webrtc = True 
+    # Status 'dilepaskan' dikirim oleh engine setelah device benar-benar dilepas (state handed_over).
+    engine.camera.hand_over("webrtc")
 
-@socketio.on('request_camera_acquire')
-def handle_request_camera_acquire(data):
-    global cap, camera_lock, active_sio_clients, camera_requested_by_webrtc, is_calibrated
+def handle_request_camera_acquire(engine, data):
     sid = request.sid; driver_id_log = data.get('driver_id', 'N/A')
-    print(f"[SocketIO] Klien {sid} (Driver: {driver_id_log}) -> AKUISISI kamera kembali pasca-WebRTC.")
-    
-    success_reacquire = False
-    trigger_reset_after_acquire = False
-    with camera_lock:
-        camera_requested_by_webrtc = False 
-        if active_sio_clients > 0 and cap is None and not call_status_http['in_call']:
-            print("[Kamera] Mencoba akuisisi `cap` kembali (attempt 1)...")
-            cap = cv2.VideoCapture(0)
-            if cap.isOpened():
-                print("[Kamera] SUKSES akuisisi `cap` (attempt 1).")
-                trigger_reset_after_acquire = True
-                success_reacquire = True
-            else:
-                print("[Kamera] GAGAL akuisisi `cap` (attempt 1). Mencoba lagi setelah delay...")
-                cap = None 
-                socketio.sleep(0.5) 
-                cap = cv2.VideoCapture(0)
-                if cap.isOpened():
-                    print("[Kamera] SUKSES akuisisi `cap` (attempt 2).")
-                    trigger_reset_after_acquire = True
-                    success_reacquire = True
-                else:
-                    print("[ERROR] GAGAL TOTAL akuisisi `cap` kembali setelah 2 attempt.")
-                    cap = None
-        elif cap is not None and cap.isOpened():
-             print("[Kamera] `cap` sudah aktif, tidak perlu akuisisi ulang.")
-             success_reacquire = True 
-        elif active_sio_clients <= 0:
-             print("[Kamera] Tidak ada klien aktif, `cap` tidak diakuisisi ulang.")
-        elif call_status_http['in_call']:
-            print("[Kamera] Panggilan HTTP aktif, akuisisi `cap` ditunda.")
+    print(f"[SocketIO] Klien {sid} (Driver: {driver_id_log}) -> AKUISISI kamera '{engine.driver_id}' kembali pasca-WebRTC.")
     
-    if trigger_reset_after_acquire:
-        reset_detection_state(source="request_camera_acquire_success")
+    with engine.camera_lock:
+        engine.camera_requested_by_webrtc = False 
+        if engine.active_sio_clients > 0 and not engine.call_status_http['in_call']:
+            # Buka ulang di latar (dengan retry+backoff); kalibrasi dipertahankan jika jeda handover singkat.
+            print("[Kamera] Meminta akuisisi kamera kembali pasca-WebRTC...")
+            engine.camera.request_open("request_camera_acquire")
+        elif engine.active_sio_clients <= 0:
+             print("[Kamera] Tidak ada klien aktif, kamera tidak diakuisisi ulang.")
+             engine.camera.release("request_camera_acquire_no_clients")
+        else:
+            print("[Kamera] Panggilan HTTP aktif, akuisisi kamera ditunda.")
 
-    if not success_reacquire and active_sio_clients > 0 :
-        print(f"[SocketIO] Gagal akuisisi `cap` pasca-WebRTC, mengirim error ke klien.")
-        socketio.emit('status_update', {'message': 'Gagal memulai ulang kamera deteksi pasca-WebRTC.', 'type': 'error'})
+def register_engine_handlers(engine):
+    # Handler Socket.IO per engine, terdaftar di namespace milik engine tersebut.
+    def on_connect(auth=None): handle_connect(engine)
+    def on_disconnect(*args): handle_disconnect(engine)
+    def on_request_camera_release(data): handle_request_camera_release(engine, data)
+    def on_request_camera_acquire(data): handle_request_camera_acquire(engine, data)
+    socketio.on_event('connect', on_connect, namespace=engine.namespace)
+    socketio.on_event('disconnect', on_disconnect, namespace=engine.namespace)
+    socketio.on_event('request_camera_release', on_request_camera_release, namespace=engine.namespace)
+    socketio.on_event('request_camera_acquire', on_request_camera_acquire, namespace=engine.namespace)
 
+for registered_engine in engine_manager.engines():
+    register_engine_handlers(registered_engine)
 
-def generate_frames():
-    global cap, camera_lock, call_status_http, camera_requested_by_webrtc
-    global frame_counter_consecutive_closed, alarm_on, last_alarm_time
-    global is_calibrated, DYNAMIC_EAR_THRESHOLD, calibration_ear_values, eye_closure_deque
+
+FRAME_POLL_INTERVAL = 0.01 # Interval polling generator /video_feed saat menunggu frame baru dari pipeline
+PLACEHOLDER_RESEND_INTERVAL = 0.5 # Placeholder yang sama dikirim ulang tiap interval ini
+PLACEHOLDER_POLL_INTERVAL = 0.05 # Interval cek status kamera, agar frame live langsung muncul begitu kamera siap
+
+def generate_frames(engine, pacer):
 
     # print("[generate_frames] Memulai generator video stream.") # Bisa terlalu verbose
     frames_yielded_count = 0
+    last_frame_seq = 0
+    last_placeholder_key, last_placeholder_time = None, 0.0
     
-    if detector is None or predictor is None:
+    while not engine.models_ready() and model_registry.state != MODEL_FAILED:
+        # Model masih dimuat di latar: kirim placeholder sampai siap.
+        try:
+            yield mjpeg_part(placeholder_jpeg('models_loading'))
+        except (GeneratorExit, ConnectionAbortedError): print("[generate_frames] Client (model loading stream) disconnected."); return
+        socketio.sleep(PLACEHOLDER_RESEND_INTERVAL)
+
+    if not engine.models_ready():
         print("[generate_frames] ERROR: Model Dlib tidak dimuat! Mengirim frame error statis.")
+        error_part = mjpeg_part(placeholder_jpeg('model_error'))
         while True: 
-            error_img = np.zeros((480, 640, 3), dtype=np.uint8)
-            cv2.putText(error_img, "ERROR: Model Dlib Gagal Dimuat!", (50, 240), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-            ret, buffer = cv2.imencode('.jpg', error_img)
-            if ret:
-                try:
-                    yield (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-                    frames_yielded_count +=1
-                except GeneratorExit: print("[generate_frames] Client (Dlib error stream) disconnected."); return
-                except ConnectionAbortedError: print("[generate_frames] Client (Dlib error stream) connection aborted."); return
+            try:
+                yield error_part
+                frames_yielded_count +=1
+            except GeneratorExit: print("[generate_frames] Client (Dlib error stream) disconnected."); return
+            except ConnectionAbortedError: print("[generate_frames] Client (Dlib error stream) connection aborted."); return
             socketio.sleep(1)
 
+    engine_manager.start_engine(engine)
+    frame_subscription = engine.pipeline.frame_hub.subscribe(pacer)
     try:
         while True:
-            if camera_requested_by_webrtc:
-                webrtc_frame_img = np.zeros((480, 640, 3), dtype=np.uint8)
-                cv2.putText(webrtc_frame_img, "KAMERA DIGUNAKAN UNTUK PANGGILAN (WebRTC)", (10, 240),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 2)
-                ret, buffer = cv2.imencode('.jpg', webrtc_frame_img)
-                if ret:
+            # Placeholder statis: bytes JPEG di-cache, tidak di-render/encode ulang tiap kirim.
+            placeholder_key = None
+            if engine.camera_requested_by_webrtc: placeholder_key = 'webrtc'
+            elif engine.call_status_http['in_call']: placeholder_key = 'http_call'
+            elif engine.camera.is_opening(): placeholder_key = 'camera_opening'
+            elif not engine.camera_is_open(): placeholder_key = 'camera_unavailable'
+            if placeholder_key is not None:
+                now = time.monotonic()
+                if placeholder_key != last_placeholder_key or now - last_placeholder_time >= PLACEHOLDER_RESEND_INTERVAL:
                     try:
-                        yield (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+                        yield mjpeg_part(placeholder_jpeg(placeholder_key))
                         frames_yielded_count += 1
                     except (GeneratorExit, ConnectionAbortedError):
-                        print("[generate_frames] Client (WebRTC placeholder stream) disconnected or aborted.")
+                        print(f"[generate_frames] Client (placeholder '{placeholder_key}' stream) disconnected or aborted.")
                         return
-                socketio.sleep(0.5)
+                    last_placeholder_key, last_placeholder_time = placeholder_key, now
+                socketio.sleep(PLACEHOLDER_POLL_INTERVAL)
                 continue
+            last_placeholder_key = None
 
-            if call_status_http['in_call']:
-                http_call_frame_img = np.zeros((480, 640, 3), dtype=np.uint8)
-                cv2.putText(http_call_frame_img, "DETEKSI DIJEDA: PANGGILAN HTTP AKTIF", (20, 240), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (200, 200, 200), 2)
-                ret, buffer = cv2.imencode('.jpg', http_call_frame_img)
-                if ret:
-                    try:
-                        yield (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-                        frames_yielded_count += 1
-                    except (GeneratorExit, ConnectionAbortedError):
-                        print("[generate_frames] Client (HTTP call placeholder stream) disconnected or aborted.")
-                        return
-                socketio.sleep(0.5)
+            # Pacing per viewer: selama belum waktunya kirim, frame baru menimpa mailbox (frame lama di-drop).
+            pacing_delay = pacer.delay()
+            if pacing_delay > 0:
+                socketio.sleep(min(pacing_delay, PLACEHOLDER_POLL_INTERVAL))
                 continue
 
-            current_frame_to_process = None
-            acquired_successfully = False
-            with camera_lock:
-                if cap is not None and cap.isOpened():
-                    success, frame = cap.read()
-                    if success:
-                        current_frame_to_process = frame.copy()
-                        acquired_successfully = True
-                    else:
-                        print("[generate_frames] Gagal baca frame dari kamera terbuka.")
-            
-            if not acquired_successfully:
-                cam_unavailable_img = np.zeros((480, 640, 3), dtype=np.uint8)
-                status_text = "Kamera Deteksi Tidak Aktif."
-                if camera_requested_by_webrtc: # Seharusnya sudah ditangani di atas
-                    status_text = "Kamera digunakan WebRTC." 
-                elif not (cap and cap.isOpened()): 
-                    status_text = "Kamera Deteksi Tidak Aktif."
-                
-                cv2.putText(cam_unavailable_img, status_text, (50, 240), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-                if status_text == "Kamera Deteksi Tidak Aktif.":
-                     cv2.putText(cam_unavailable_img, "Pastikan Driver.js terhubung.", (50, 280), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
-                
-                ret, buffer = cv2.imencode('.jpg', cam_unavailable_img)
-                if ret:
-                    try:
-                        yield (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-                        frames_yielded_count += 1
-                    except (GeneratorExit, ConnectionAbortedError):
-                        print("[generate_frames] Client (cam unavailable stream) disconnected or aborted.")
-                        return
-                socketio.sleep(0.5)
+            # Ambil JPEG terbaru dari mailbox viewer ini; viewer yang lambat cukup melewatkan frame lama.
+            last_frame_seq, frame_bytes = frame_subscription.get_newer(last_frame_seq)
+            if frame_bytes is None:
+                socketio.sleep(FRAME_POLL_INTERVAL)
                 continue
-            
-            # ---- MULAI LOGIKA DETEKSI KANTUK ----
-            gray = cv2.cvtColor(current_frame_to_process, cv2.COLOR_BGR2GRAY); faces = detector(gray); ear_value_current_frame = -1; perclos_value_current_frame = -1
-            if not faces:
-                if not alarm_on : socketio.emit('status_update', {'message': 'Tidak ada wajah terdeteksi.', 'type': 'no_face', 'is_calibrated': is_calibrated, 'dynamic_threshold': DYNAMIC_EAR_THRESHOLD if is_calibrated else None})
-                frame_counter_consecutive_closed = 0; eye_closure_deque.clear()
-            else: 
-                face = faces[0]; landmarks = predictor(gray, face); left_eye_coords = np.array([(landmarks.part(i).x, landmarks.part(i).y) for i in left_eye_idx]); right_eye_coords = np.array([(landmarks.part(i).x, landmarks.part(i).y) for i in right_eye_idx]); left_ear = calculate_ear(left_eye_coords); right_ear = calculate_ear(right_eye_coords); ear_value_current_frame = (left_ear + right_ear) / 2.0
-                if not is_calibrated:
-                    calibration_ear_values.append(ear_value_current_frame); cal_progress = len(calibration_ear_values) / CALIBRATION_FRAMES_TARGET * 100
-                    socketio.emit('status_update', { 'message': f"Kalibrasi: {len(calibration_ear_values)}/{CALIBRATION_FRAMES_TARGET} ({cal_progress:.0f}%)", 'type': 'calibration_info', 'is_calibrated': False, 'dynamic_threshold': DYNAMIC_EAR_THRESHOLD })
-                    if len(calibration_ear_values) >= CALIBRATION_FRAMES_TARGET:
-                        avg_open_ear = np.mean(calibration_ear_values) if calibration_ear_values else INITIAL_OPEN_EAR_AVG; DYNAMIC_EAR_THRESHOLD = max(0.1, min(0.35, avg_open_ear * 0.75)); is_calibrated = True; calibration_ear_values = []
-                        socketio.emit('status_update', { 'message': f"Kalibrasi Selesai! Threshold: {DYNAMIC_EAR_THRESHOLD:.3f}", 'type': 'calibration_done', 'is_calibrated': True, 'dynamic_threshold': DYNAMIC_EAR_THRESHOLD }); print(f"[Kalibrasi] Selesai. Avg Open EAR: {avg_open_ear:.3f}, Threshold: {DYNAMIC_EAR_THRESHOLD:.3f}")
-                else: 
-                    if ear_value_current_frame < DYNAMIC_EAR_THRESHOLD: frame_counter_consecutive_closed += 1; eye_closure_deque.append(1)
-                    else:
-                        if frame_counter_consecutive_closed > 0 and alarm_on: print("[Deteksi] Mata terbuka, alarm nonaktif."); alarm_on = False; socketio.emit('drowsiness_alert', {'message': 'Pengemudi kembali sadar.', 'type': 'normal', 'is_calibrated': True})
-                        frame_counter_consecutive_closed = 0; eye_closure_deque.append(0)
-                    if len(eye_closure_deque) == PERCLOS_WINDOW_SIZE: perclos_value_current_frame = sum(eye_closure_deque) / PERCLOS_WINDOW_SIZE
-                    drowsiness_detected_reason = None
-                    if frame_counter_consecutive_closed >= CONSEC_FRAMES_THRESHOLD: drowsiness_detected_reason = f"EAR < Threshold ({frame_counter_consecutive_closed} frames)"
-                    elif perclos_value_current_frame != -1 and perclos_value_current_frame >= PERCLOS_THRESHOLD: drowsiness_detected_reason = f"PERCLOS tinggi ({perclos_value_current_frame*100:.1f}%)"
-                    if drowsiness_detected_reason and not alarm_on and (time.time() - last_alarm_time) > ALARM_COOLDOWN:
-                        alarm_on = True; last_alarm_time = time.time(); print(f"[ALARM] Kantuk! {drowsiness_detected_reason}"); threading.Thread(target=sound_alarm_thread_target).start()
-                        socketio.emit('drowsiness_alert', { 'message': f"PERINGATAN KANTUK! {drowsiness_detected_reason}", 'type': 'alert', 'ear': ear_value_current_frame, 'perclos': perclos_value_current_frame, 'is_calibrated': True })
-                    elif not drowsiness_detected_reason and alarm_on: print("[Deteksi] Kondisi normal, alarm nonaktif."); alarm_on = False; socketio.emit('drowsiness_alert', {'message': 'Pengemudi kembali sadar.', 'type': 'normal', 'is_calibrated': True})
-            if is_calibrated: cv2.putText(current_frame_to_process, f"EAR: {ear_value_current_frame:.3f} (T: {DYNAMIC_EAR_THRESHOLD:.3f})", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0) if ear_value_current_frame >= DYNAMIC_EAR_THRESHOLD else (0, 0, 255), 1);_ = cv2.putText(current_frame_to_process, f"PERCLOS: {perclos_value_current_frame*100:.1f}%", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0) if perclos_value_current_frame < PERCLOS_THRESHOLD else (0, 0, 255), 1) if perclos_value_current_frame != -1 else None ;cv2.putText(current_frame_to_process, "Status: Memantau", (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0) if not alarm_on else (0,165,255), 1)
-            else: cv2.putText(current_frame_to_process, "Status: Kalibrasi...", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 192, 0), 2); _ = cv2.putText(current_frame_to_process, f"EAR: {ear_value_current_frame:.3f}", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 192, 0), 1) if ear_value_current_frame != -1 else None
-            if alarm_on: cv2.putText(current_frame_to_process, "ALARM KANTUK!", (current_frame_to_process.shape[1] // 2 - 100, current_frame_to_process.shape[0] - 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,0,255), 2)
-            socketio.emit('update_data', { 'ear': ear_value_current_frame if ear_value_current_frame != -1 else None, 'perclos': perclos_value_current_frame if perclos_value_current_frame != -1 else None, 'is_calibrated': is_calibrated, 'dynamic_threshold': DYNAMIC_EAR_THRESHOLD if is_calibrated else None, 'alarm_on': alarm_on })
-            # ---- AKHIR LOGIKA DETEKSI KANTUK ----
-
-            ret, buffer = cv2.imencode('.jpg', current_frame_to_process)
-            if not ret: print("[generate_frames] Gagal encode frame."); continue
-            frame_bytes = buffer.tobytes()
             try:
-                yield (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n'); frames_yielded_count +=1
+                write_start = time.monotonic()
+                yield mjpeg_part(frame_bytes); frames_yielded_count +=1
+                write_time = time.monotonic() - write_start
+                pacer.sent(len(frame_bytes), write_time); engine.stage_latency['yield'].observe(write_time)
             except ConnectionAbortedError: print("[generate_frames] Koneksi diaborsi oleh klien (yield)."); return
             except GeneratorExit: print("[generate_frames] Client disconnected (yield)."); return
-            socketio.sleep(0.03) 
     except Exception as e:
         print(f"[generate_frames] Exception dalam loop utama generator: {e}")
         traceback.print_exc()
     finally:
+        engine.pipeline.frame_hub.unsubscribe(frame_subscription)
         print(f"[generate_frames] Keluar dari generator. Total frame di-yield: {frames_yielded_count}.")
 
 @app.route('/')
 def index_route(): return render_template('Driver.html') 
 
-@app.route('/video_feed')
-def video_feed(): return Response(generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
+def get_engine_or_404(driver_id):
+    engine = engine_manager.get(driver_id) if driver_id else default_engine
+    if engine is None: abort(404, description=f"Driver '{driver_id}' tidak dikenal.")
+    return engine
 
-# Endpoint HTTP opsional
+@app.route('/video_feed')
+@app.route('/video_feed/<driver_id>')
+def video_feed(driver_id=None):
+    engine = get_engine_or_404(driver_id)
+    pacer = ViewerPacer(max_fps=request.args.get('fps', VIEWER_MAX_FPS, type=float),
+                        max_kbps=request.args.get('kbps', VIEWER_MAX_KBPS, type=float))
+    return Response(generate_frames(engine, pacer), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+@app.route('/pipeline_stats')
+def pipeline_stats(): return jsonify(engine_manager.stats())
+
+def history_range():
+    end = request.args.get('end', time.time(), type=float)
+    start = request.args.get('start', end - HISTORY_DEFAULT_RANGE, type=float)
+    if start >= end: abort(400, description="Parameter 'start' harus lebih kecil dari 'end'.")
+    return start, end
+
+# Riwayat per driver untuk review keselamatan; start/end = unix timestamp (detik), default 1 jam terakhir.
+@app.route('/history/<driver_id>/alarms')
+def history_alarms(driver_id):
+    if event_store is None: abort(503, description="Event store nonaktif.")
+    start, end = history_range()
+    limit = request.args.get('limit', 500, type=int)
+    if limit <= 0: abort(400, description="Parameter 'limit' harus lebih besar dari 0.")
+    events = event_store.alarm_history(driver_id, start, end, limit=limit)
+    return jsonify({'driver_id': driver_id, 'start': start, 'end': end, 'events': events})
+
+@app.route('/history/<driver_id>/ear')
+def history_ear(driver_id):
+    # Deret EAR/PERCLOS di-downsample per bucket (?bucket=detik, atau otomatis agar <= ?points titik).
+    if event_store is None: abort(503, description="Event store nonaktif.")
+    start, end = history_range()
+    bucket = request.args.get('bucket', None, type=float)
+    if bucket is not None and bucket <= 0: abort(400, description="Parameter 'bucket' harus lebih besar dari 0.")
+    points = request.args.get('points', 500, type=int)
+    if points <= 0: abort(400, description="Parameter 'points' harus lebih besar dari 0.")
+    series = event_store.ear_series(driver_id, start, end, bucket_seconds=bucket, max_points=points)
+    return jsonify(dict(series, driver_id=driver_id, start=start, end=end))
+
+@app.route('/ready')
+def ready_route():
+    # 200 jika model siap & deteksi bisa berjalan, 503 selama model masih dimuat (atau gagal).
+    status = dict(model_registry.status(), startup_ms=round((time.perf_counter() - STARTUP_BEGIN) * 1000.0, 1))
+    return jsonify(status), (200 if status['ready'] else 503)
+
+@app.route('/metrics')
+def metrics_route(): return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+# Endpoint HTTP opsional (body JSON boleh berisi 'driver_id'; default: driver pertama)
 @app.route('/start_call_http', methods=['POST'])
 def start_call_http():
-    global cap, call_status_http, camera_lock
-    with camera_lock:
+    engine = get_engine_or_404(request.json.get('driver_id'))
+    with engine.camera_lock:
         call_type = request.json.get('call_type', 'video')
-        call_status_http['in_call'] = True
-        call_status_http['call_type'] = call_type
-        print(f"[Panggilan HTTP] Panggilan '{call_type}' dimulai.")
-        if cap is not None and not camera_requested_by_webrtc:
+        engine.call_status_http['in_call'] = True
+        engine.call_status_http['call_type'] = call_type
+        print(f"[Panggilan HTTP] [{engine.driver_id}] Panggilan '{call_type}' dimulai.")
+        if not engine.camera_requested_by_webrtc:
             print("[Panggilan HTTP] Melepaskan kamera deteksi...")
-            cap.release(); cap = None
-    socketio.emit('status_update', {'message': 'Kamera digunakan untuk panggilan HTTP.', 'type': 'info'})
+            engine.camera.hand_over("http_call")
     return jsonify({'status': 'success', 'message': f'Panggilan HTTP {call_type} dimulai'})
 
 @app.route('/end_call_http', methods=['POST'])
 def end_call_http():
-    global cap, call_status_http, active_sio_clients, camera_lock, is_calibrated
-    with camera_lock:
-        print("[Panggilan HTTP] Panggilan diakhiri.")
-        call_status_http['in_call'] = False
-        call_status_http['call_type'] = None
-        if active_sio_clients > 0 and cap is None and not camera_requested_by_webrtc:
+    engine = get_engine_or_404((request.json or {}).get('driver_id'))
+    with engine.camera_lock:
+        print(f"[Panggilan HTTP] [{engine.driver_id}] Panggilan diakhiri.")
+        engine.call_status_http['in_call'] = False
+        engine.call_status_http['call_type'] = None
+        if engine.active_sio_clients > 0 and not engine.camera_requested_by_webrtc:
             print("[Panggilan HTTP] Mengembalikan kamera ke deteksi...")
-            cap = cv2.VideoCapture(0)
-            if cap.isOpened(): reset_detection_state(source="end_call_http")
-            else: cap = None
-    if cap and cap.isOpened():
-         socketio.emit('status_update', {'message': 'Deteksi kantuk dilanjutkan (pasca HTTP call).', 'type': 'info', 'is_calibrated': is_calibrated})
+            engine.camera.request_open("end_call_http")
+        elif engine.active_sio_clients <= 0 and not engine.camera_requested_by_webrtc:
+            engine.camera.release("end_call_http_no_clients")
     return jsonify({'status': 'success', 'message': 'Panggilan HTTP diakhiri'})
 
-
 if __name__ == '__main__':
     print("[*] Memulai server Flask dengan SocketIO...")
-    if predictor is None or detector is None: print("[FATAL ERROR] Model Dlib tidak berhasil dimuat.")
+    if model_registry.state == MODEL_FAILED: print("[FATAL ERROR] Model Dlib tidak berhasil dimuat.")
+    metrics.start_log_dump(METRICS_LOG_INTERVAL)
     print("[*] Server berjalan di http://0.0.0.0:5000/")
-    socketio.run(app, host='0.0.0.0', port=5000, debug=False, use_reloader=False)
\ No newline at end of file
+    socketio.run(app, host='0.0.0.0', port=5000, debug=False, use_reloader=False, allow_unsafe_werkzeug=True) # Server lokal kabin (mode threading)
\ No newline at end of file
@@ -0,0 +1,214 @@
+# File: Client_Driver/alarm_dispatcher.py
+# Pengiriman alarm kantuk lewat SATU thread berumur panjang (menggantikan thread baru per alert).
+# Loop deteksi hanya memasukkan perintah alert/clear ke antrean terbatas (put_nowait); thread dispatcher
+# mengelola "episode" alarm per driver dan eskalasinya:
+#   - level = (nama, jeda detik sejak episode mulai, fungsi kirim), mis. audio (0 s) -> push supervisor
+#     lewat Socket.IO (5 s) -> webhook HTTP (15 s). Tiap level dikirim sekali per episode, hanya jika
+#     alarm masih aktif saat jedanya tercapai.
+#   - debounce: 'clear' baru menutup episode jika tidak ada alert lagi selama debounce_seconds, sehingga
+#     kondisi flapping di sekitar ALARM_COOLDOWN tetap dihitung satu episode (eskalasi tetap berjalan).
+#     Alert ulang dalam episode yang sama hanya mengulang level pertama (audio), paling cepat tiap debounce_seconds.
+#   - end: sesi deteksi berakhir (reset kalibrasi, handover/penutupan kamera): episode langsung ditutup
+#     tanpa debounce, sehingga tidak terus bereskalasi dan tidak digabung dengan alarm sesi berikutnya.
+#   - latensi: dari timestamp frame yang memicu alarm sampai fungsi kirim level selesai, per level.
+import json
+import queue
+import threading
+import time
+import urllib.request
+
+from drowsiness_state import ALARM_EVENT_ALERT, ALARM_EVENT_END
+from metrics import MetricsRegistry
+from thread_utils import spawn_daemon_thread
+
+ALARM_CMD_ALERT = 'alert'
+ALARM_CMD_CLEAR = 'clear'
+ALARM_CMD_END = 'end'
+
+
+def post_webhook(url, payload, timeout=2.0):
+    # POST JSON sederhana (tanpa dependensi tambahan); exception diteruskan ke dispatcher.
+    request = urllib.request.Request(url, data=json.dumps(payload).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'}, method='POST')
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.status
+
+
+def engine_alarm_fn(dispatcher):
+    # alarm_fn untuk DrowsinessEngine: event alarm engine -> perintah dispatcher (non-blocking).
+    def dispatch_alarm(engine, alarm_event, reason, detected_at):
+        if alarm_event == ALARM_EVENT_ALERT: dispatcher.alert(engine.driver_id, reason, detected_at)
+        elif alarm_event == ALARM_EVENT_END: dispatcher.end(engine.driver_id)
+        else: dispatcher.clear(engine.driver_id, detected_at)
+    return dispatch_alarm
+
+
+class AlarmEpisode:
+    __slots__ = ('driver_id', 'started_at', 'detected_at', 'reason', 'data', 'fired', 'last_repeat_at', 'cleared_at', 'alerts')
+
+    def __init__(self, driver_id, detected_at, reason, data):
+        self.driver_id = driver_id
+        self.started_at = detected_at
+        self.detected_at = detected_at
+        self.reason = reason
+        self.data = data
+        self.fired = set()
+        self.last_repeat_at = None
+        self.cleared_at = None
+        self.alerts = 1
+
+
+class AlarmDispatcher:
+    def __init__(self, levels, debounce_seconds=5.0, max_queue=64, metrics=None, spawn_fn=None, clock=time.time):
+        # levels: [(nama, jeda_detik, deliver_fn(alarm_dict))], urut menurut jeda.
+        self.levels = sorted(levels, key=lambda level: level[1])
+        self.debounce_seconds = debounce_seconds
+        self.clock = clock  # Harus sama dengan clock timestamp frame (DrowsinessState.clock)
+        self.spawn_fn = spawn_fn or spawn_daemon_thread
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._episodes = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self.running = False
+        self.counters = {'alerts': 0, 'clears': 0, 'ends': 0, 'dropped': 0, 'debounced': 0, 'episodes': 0, 'delivered': 0, 'failed': 0}
+        metrics = metrics or MetricsRegistry(enabled=False)
+        self.latency = {name: metrics.histogram('alarm_delivery_latency_seconds', 'Latensi frame pemicu -> alarm terkirim (detik)',
+                                                channel=name) for name, _, _ in self.levels}
+        self.deliveries = {(name, ok): metrics.counter('alarm_deliveries_total', 'Pengiriman alarm per level',
+                                                       channel=name, result='ok' if ok else 'error')
+                           for name, _, _ in self.levels for ok in (True, False)}
+        self.last_latency_ms = {}
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return False
+            self.running = True
+            self._thread = self.spawn_fn(self._run, 'alarm-dispatcher')
+        print(f"[AlarmDispatcher] Dimulai dengan level: {', '.join(f'{name}@{delay:g}s' for name, delay, _ in self.levels)}")
+        return True
+
+    def stop(self, timeout=5.0):
+        self.running = False
+        self._enqueue((None, None, None, None, None))  # Bangunkan thread
+        if isinstance(self._thread, threading.Thread):
+            self._thread.join(timeout)
+
+    # ---- Dipanggil dari loop deteksi: tidak pernah blocking ----
+    def _enqueue(self, command):
+        try:
+            self._queue.put_nowait(command)
+        except queue.Full:
+            self.counters['dropped'] += 1
+            print(f"[AlarmDispatcher] Antrean penuh, perintah '{command[0]}' untuk '{command[1]}' dibuang.")
+
+    def alert(self, driver_id, reason, detected_at, data=None):
+        self._enqueue((ALARM_CMD_ALERT, driver_id, reason, detected_at, data))
+
+    def clear(self, driver_id, detected_at=None):
+        self._enqueue((ALARM_CMD_CLEAR, driver_id, None, self.clock() if detected_at is None else detected_at, None))
+
+    def end(self, driver_id):
+        self._enqueue((ALARM_CMD_END, driver_id, None, self.clock(), None))
+
+    # ---- Thread dispatcher ----
+    def _run(self):
+        while self.running:
+            try:
+                command = self._queue.get(timeout=self._next_wakeup())
+            except queue.Empty:
+                command = None
+            if command is not None and command[0] is not None:
+                self._handle(*command)
+            self._deliver_due()
+
+    def _next_wakeup(self):
+        # Detik sampai level/penutupan episode berikutnya jatuh tempo (maks. 1 s).
+        now = self.clock()
+        wakeup = 1.0
+        for episode in self._episodes.values():
+            if episode.cleared_at is not None:
+                wakeup = min(wakeup, episode.cleared_at + self.debounce_seconds - now)
+                continue
+            for name, delay, _ in self.levels:
+                if name not in episode.fired:
+                    wakeup = min(wakeup, episode.started_at + delay - now)
+                    break
+        return max(0.0, wakeup)
+
+    def _handle(self, command, driver_id, reason, detected_at, data):
+        episode = self._episodes.get(driver_id)
+        if command == ALARM_CMD_END:
+            self.counters['ends'] += 1
+            self._episodes.pop(driver_id, None)
+            return
+        if command == ALARM_CMD_CLEAR:
+            self.counters['clears'] += 1
+            if episode is not None and episode.cleared_at is None:
+                episode.cleared_at = detected_at
+            return
+        self.counters['alerts'] += 1
+        if episode is None:
+            self.counters['episodes'] += 1
+            self._episodes[driver_id] = AlarmEpisode(driver_id, detected_at, reason, data)
+            return
+        # Alert lagi dalam episode yang sama (flapping / alarm berulang): lanjutkan eskalasi.
+        episode.cleared_at = None
+        episode.alerts += 1
+        episode.detected_at, episode.reason, episode.data = detected_at, reason, data
+        first_name = self.levels[0][0] if self.levels else None
+        if first_name in episode.fired and detected_at - episode.last_repeat_at >= self.debounce_seconds:
+            episode.fired.discard(first_name)  # Ulangi level pertama (audio) untuk alert baru ini
+        else:
+            self.counters['debounced'] += 1
+
+    def _deliver_due(self):
+        # Kumpulkan semua level yang jatuh tempo, lalu kirim level tertinggi dulu: eskalasi (supervisor,
+        # webhook) tidak ikut menunggu bunyi audio driver lain yang memblok thread ini.
+        now = self.clock()
+        due = []
+        for driver_id, episode in list(self._episodes.items()):
+            if episode.cleared_at is not None:
+                if now - episode.cleared_at >= self.debounce_seconds:
+                    del self._episodes[driver_id]
+                continue
+            for index, (name, delay, deliver_fn) in enumerate(self.levels):
+                if name in episode.fired or now < episode.started_at + delay:
+                    continue
+                episode.fired.add(name)
+                if index == 0:
+                    episode.last_repeat_at = episode.detected_at
+                due.append((index, episode, name, deliver_fn))
+        due.sort(key=lambda item: -item[0])
+        for index, episode, name, deliver_fn in due:
+            self._deliver(episode, index, name, deliver_fn)
+
+    def _deliver(self, episode, index, name, deliver_fn):
+        alarm = {
+            'driver_id': episode.driver_id, 'level': index, 'channel': name, 'reason': episode.reason,
+            'detected_at': episode.detected_at, 'episode_started_at': episode.started_at,
+            'episode_seconds': round(self.clock() - episode.started_at, 3), 'alerts': episode.alerts,
+            'data': episode.data,
+        }
+        try:
+            deliver_fn(alarm)
+            ok = True
+        except Exception as e:
+            ok = False
+            print(f"[AlarmDispatcher] Gagal kirim level '{name}' untuk '{episode.driver_id}': {e}")
+        # Untuk level tertunda, latensi dihitung dari saat level jatuh tempo, bukan dari frame pertama.
+        due_at = max(episode.detected_at, episode.started_at + self.levels[index][1])
+        latency = max(0.0, self.clock() - due_at)
+        self.counters['delivered' if ok else 'failed'] += 1
+        self.deliveries[(name, ok)].inc()
+        if ok:
+            self.latency[name].observe(latency)
+            self.last_latency_ms[name] = round(latency * 1000.0, 3)
+
+    def stats(self):
+        stats = dict(self.counters)
+        stats['queued'] = self._queue.qsize()
+        stats['active_episodes'] = sorted(driver_id for driver_id, episode in list(self._episodes.items())
+                                          if episode.cleared_at is None)
+        stats['last_latency_ms'] = dict(self.last_latency_ms)
+        return stats
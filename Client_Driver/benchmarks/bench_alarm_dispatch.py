@@ -0,0 +1,111 @@
+# File: Client_Driver/benchmarks/bench_alarm_dispatch.py
+# Benchmark dispatcher alarm dengan kondisi flapping (alert/normal bergantian di sekitar cooldown):
+#   - webhook dikirim ke stand-in HTTP lokal (http.server) agar jalur urllib ikut terukur
+#   - audio disimulasikan dengan sleep (pengganti winsound.Beep yang memblok ~1 s)
+#   - dibandingkan dengan cara lama: satu thread baru per transisi alarm-on yang lolos ALARM_COOLDOWN
+#     (bukan per alert), dihitung dengan cooldown yang sama atas deretan alert simulasi
+# Output: jumlah pengiriman per level, alert yang di-debounce, latensi p50/p95 per level, thread puncak.
+#
+# Contoh:
+#   python benchmarks/bench_alarm_dispatch.py --drivers 4 --duration 20 --flap-interval 0.5 -o alarm.json
+import argparse
+import http.server
+import json
+import threading
+import time
+
+import bench_common  # noqa: F401  (menambahkan Client_Driver ke sys.path)
+from alarm_dispatcher import AlarmDispatcher, post_webhook
+from drowsiness_state import ALARM_COOLDOWN
+from metrics import MetricsRegistry
+
+
+class WebhookStandIn(http.server.BaseHTTPRequestHandler):
+    received = 0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        WebhookStandIn.received += 1
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dispatcher alarm (debounce, eskalasi, latensi).")
+    parser.add_argument('--drivers', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=20.0, help="Lama simulasi (detik)")
+    parser.add_argument('--flap-interval', type=float, default=0.5, help="Jeda alert <-> normal per driver (detik)")
+    parser.add_argument('--audio-ms', type=float, default=200.0, help="Simulasi lama bunyi alarm (ms)")
+    parser.add_argument('--debounce', type=float, default=5.0)
+    parser.add_argument('--supervisor-after', type=float, default=2.0)
+    parser.add_argument('--webhook-after', type=float, default=5.0)
+    parser.add_argument('--legacy-cooldown', type=float, default=ALARM_COOLDOWN,
+                        help="ALARM_COOLDOWN cara lama (detik) untuk menghitung thread yang akan dibuat")
+    parser.add_argument('-o', '--output', default=None, help="File JSON hasil")
+    args = parser.parse_args()
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), WebhookStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    webhook_url = f"http://127.0.0.1:{server.server_address[1]}/alarm"
+
+    metrics = MetricsRegistry(enabled=True)
+    levels = [('audio', 0.0, lambda alarm: time.sleep(args.audio_ms / 1000.0)),
+              ('supervisor', args.supervisor_after, lambda alarm: None),
+              ('webhook', args.webhook_after, lambda alarm: post_webhook(webhook_url, alarm))]
+    dispatcher = AlarmDispatcher(levels, debounce_seconds=args.debounce, metrics=metrics)
+    dispatcher.start()
+
+    baseline_threads = threading.active_count()
+    peak_threads = baseline_threads
+    alerts_sent = 0
+    legacy_threads = 0
+    legacy_last_alarm = {}  # driver -> waktu thread terakhir cara lama (cooldown dihitung dari sini)
+    end = time.time() + args.duration
+    alarm_on = False
+    while time.time() < end:
+        alarm_on = not alarm_on
+        for index in range(args.drivers):
+            if alarm_on:
+                now = time.time()
+                dispatcher.alert(f"driver{index}", "Flapping", now)
+                alerts_sent += 1
+                # Cara lama: alarm_on baru (dan thread audio) hanya jika cooldown sejak alarm terakhir terlewati.
+                if now - legacy_last_alarm.get(index, float('-inf')) > args.legacy_cooldown:
+                    legacy_last_alarm[index] = now
+                    legacy_threads += 1
+            else:
+                dispatcher.clear(f"driver{index}")
+        peak_threads = max(peak_threads, threading.active_count())
+        time.sleep(args.flap_interval)
+    time.sleep(max(args.audio_ms / 1000.0 * args.drivers, 0.5))
+    dispatcher.stop()
+    server.shutdown()
+
+    stats = dispatcher.stats()
+    latency = {name: {'p50_ms': round(histogram.quantile(0.5) * 1000.0, 3) if histogram.quantile(0.5) is not None else None,
+                      'p95_ms': round(histogram.quantile(0.95) * 1000.0, 3) if histogram.quantile(0.95) is not None else None}
+               for name, histogram in dispatcher.latency.items()}
+    report = {
+        'alerts': alerts_sent,
+        'dispatcher': stats,
+        'latency': latency,
+        'webhook_received': WebhookStandIn.received,
+        'peak_extra_threads': peak_threads - baseline_threads,
+        'legacy_threads_spawned': legacy_threads,  # Cara lama: satu thread per alarm-on setelah cooldown
+    }
+    print(f"[Bench] {alerts_sent} alert -> {stats['episodes']} episode, {stats['debounced']} di-debounce, "
+          f"{stats['delivered']} terkirim, {stats['failed']} gagal, webhook diterima stand-in: {WebhookStandIn.received}")
+    for name, values in latency.items():
+        print(f"[Bench] Latensi {name}: p50 {values['p50_ms']} ms, p95 {values['p95_ms']} ms")
+    print(f"[Bench] Thread tambahan puncak: {report['peak_extra_threads']} (cara lama: {legacy_threads} thread dibuat, cooldown {args.legacy_cooldown:g}s)")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"[Bench] Hasil disimpan ke {args.output}")
+
+
+if __name__ == '__main__':
+    main()
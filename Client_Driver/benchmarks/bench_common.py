@@ -0,0 +1,94 @@
+# File: Client_Driver/benchmarks/bench_common.py
+# Utilitas bersama untuk skrip benchmark (tanpa kamera: frame dibaca dari video rekaman).
+import os
+import sys
+import time
+
+try:
+    import resource  # Hanya tersedia di Unix
+except ImportError:
+    resource = None
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+CLIENT_DRIVER_DIR = os.path.dirname(BENCH_DIR)
+DEFAULT_MODEL_PATH = os.path.join(CLIENT_DRIVER_DIR, "model", "shape_predictor_68_face_landmarks.dat")
+
+# Agar modul di Client_Driver/ (face_tracker, frame_pipeline, ...) bisa diimpor dari sini.
+if CLIENT_DRIVER_DIR not in sys.path:
+    sys.path.insert(0, CLIENT_DRIVER_DIR)
+
+
+def load_dlib_models(model_path=DEFAULT_MODEL_PATH):
+    import dlib
+    if not os.path.exists(model_path):
+        raise SystemExit(f"[ERROR] File model Dlib tidak ditemukan di: {model_path}")
+    return dlib.get_frontal_face_detector(), dlib.shape_predictor(model_path)
+
+
+def iter_video_frames(video_path, max_frames=None, gray=True):
+    # Decode frame satu per satu (tanpa menampung seluruh video di memori).
+    import cv2
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise SystemExit(f"[ERROR] Gagal membuka video: {video_path}")
+    count = 0
+    try:
+        while max_frames is None or count < max_frames:
+            success, frame = capture.read()
+            if not success:
+                break
+            count += 1
+            yield cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if gray else frame
+    finally:
+        capture.release()
+    if not count:
+        raise SystemExit(f"[ERROR] Tidak ada frame yang terbaca dari: {video_path}")
+
+
+def read_video_frames(video_path, max_frames=None, gray=True):
+    # Baca frame video rekaman ke memori agar waktu decode tidak ikut terukur.
+    return list(iter_video_frames(video_path, max_frames, gray))
+
+
+def shape_ear(shape):
+    # EAR rata-rata kedua mata dari hasil predictor, sama dengan perhitungan di DrowsinessDetection.
+    from facial_metrics import mean_ear, shape_to_np
+    return float(mean_ear(shape_to_np(shape)))
+
+
+def summarize_latencies(latencies_s):
+    values_ms = np.asarray(latencies_s, dtype=np.float64) * 1000.0
+    if values_ms.size == 0:
+        return {'count': 0}
+    return {
+        'count': int(values_ms.size),
+        'mean_ms': round(float(values_ms.mean()), 3),
+        'p50_ms': round(float(np.percentile(values_ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(values_ms, 95)), 3),
+        'p99_ms': round(float(np.percentile(values_ms, 99)), 3),
+        'max_ms': round(float(values_ms.max()), 3),
+    }
+
+
+def peak_rss_mb():
+    # Peak RSS proses ini (MB); None jika modul `resource` tidak tersedia (Windows).
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux melaporkan KB, macOS melaporkan bytes.
+    return round(peak / (1024.0 * 1024.0) if sys.platform == 'darwin' else peak / 1024.0, 1)
+
+
+class Stopwatch:
+    def __init__(self):
+        self.elapsed = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self._start
+        return False
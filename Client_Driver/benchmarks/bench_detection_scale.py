@@ -0,0 +1,79 @@
+# File: Client_Driver/benchmarks/bench_detection_scale.py
+# Benchmark deteksi wajah pada beberapa skala (downscale sebelum detector HOG) dengan predictor
+# landmark tetap di resolusi penuh. Melaporkan latensi deteksi dan deviasi EAR terhadap baseline 1.0,
+# untuk memilih FACE_DETECTION_SCALE termurah yang EAR-nya masih stabil.
+#
+# Contoh:
+#   python benchmarks/bench_detection_scale.py rekaman_kabin.mp4 --scales 1.0 0.75 0.5 0.35
+import argparse
+import json
+
+import numpy as np
+
+import bench_common
+from bench_common import Stopwatch, load_dlib_models, read_video_frames, shape_ear, summarize_latencies
+from face_tracker import FaceTracker
+
+
+def run_scale(frames, detector, predictor, scale):
+    # Mode 'off': detector dijalankan di setiap frame agar yang terukur murni biaya deteksi per skala.
+    tracker = FaceTracker(detector, mode='off', detection_scale=scale)
+    detect_latencies = []
+    ears = []
+    for gray in frames:
+        with Stopwatch() as watch:
+            face = tracker.locate(gray)
+        detect_latencies.append(watch.elapsed)
+        ears.append(shape_ear(predictor(gray, face)) if face is not None else None)
+    return summarize_latencies(detect_latencies), ears
+
+
+def ear_deviation(ears, baseline_ears):
+    pairs = [(e, b) for e, b in zip(ears, baseline_ears) if e is not None and b is not None]
+    baseline_faces = sum(1 for b in baseline_ears if b is not None)
+    missed = sum(1 for e, b in zip(ears, baseline_ears) if e is None and b is not None)
+    if not pairs:
+        return {'compared_frames': 0, 'missed_faces': missed}
+    diffs = np.abs(np.array([e - b for e, b in pairs]))
+    return {
+        'compared_frames': len(pairs),
+        'missed_faces': missed,
+        'miss_rate': round(missed / baseline_faces, 4) if baseline_faces else 0.0,
+        'mean_abs_dev': round(float(diffs.mean()), 5),
+        'p95_abs_dev': round(float(np.percentile(diffs, 95)), 5),
+        'max_abs_dev': round(float(diffs.max()), 5),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark skala deteksi wajah vs deviasi EAR.")
+    parser.add_argument('video', help="Path video rekaman kabin")
+    parser.add_argument('--model', default=bench_common.DEFAULT_MODEL_PATH, help="Path shape_predictor_68_face_landmarks.dat")
+    parser.add_argument('--scales', nargs='+', type=float, default=[1.0, 0.75, 0.5, 0.35, 0.25])
+    parser.add_argument('--max-frames', type=int, default=None)
+    parser.add_argument('--json', action='store_true', help="Cetak hasil sebagai JSON")
+    args = parser.parse_args()
+
+    detector, predictor = load_dlib_models(args.model)
+    frames = read_video_frames(args.video, args.max_frames)
+    if not args.json:  # Dengan --json, stdout hanya berisi dokumen JSON
+        print(f"[Bench] {len(frames)} frame dimuat dari {args.video} ({frames[0].shape[1]}x{frames[0].shape[0]})")
+
+    scales = [1.0] + sorted((s for s in args.scales if s != 1.0), reverse=True)
+    results = {}
+    baseline_ears = None
+    for scale in scales:
+        latency, ears = run_scale(frames, detector, predictor, scale)
+        if scale == 1.0:
+            baseline_ears = ears
+        results[str(scale)] = {'detect_latency': latency, 'ear': ear_deviation(ears, baseline_ears)}
+        if not args.json:
+            dev = results[str(scale)]['ear']
+            print(f"[Bench] scale={scale:<5} detect mean={latency['mean_ms']:.2f}ms p95={latency['p95_ms']:.2f}ms "
+                  f"EAR |dev| mean={dev.get('mean_abs_dev')} max={dev.get('max_abs_dev')} missed={dev['missed_faces']}")
+    if args.json:
+        print(json.dumps({'video': args.video, 'frames': len(frames), 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
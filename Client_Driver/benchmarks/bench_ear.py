@@ -0,0 +1,122 @@
+# File: Client_Driver/benchmarks/bench_ear.py
+# Microbenchmark EAR: implementasi lama (list comprehension per landmark + 6x distance.euclidean)
+# vs facial_metrics (konversi 68 titik sekali jalan + EAR kedua mata tervektorisasi), termasuk
+# mode batch (N, 68, 2) untuk scoring offline. Tidak butuh kamera, model Dlib, maupun video.
+#
+# Contoh:
+#   python benchmarks/bench_ear.py --frames 5000 --batch 10000
+import argparse
+import json
+import math
+import time
+
+import numpy as np
+
+import bench_common  # noqa: F401  (menambahkan Client_Driver ke sys.path)
+from facial_metrics import mean_ear, shape_to_np
+
+try:
+    from scipy.spatial import distance
+    _euclidean = distance.euclidean
+    LEGACY_BACKEND = 'scipy'
+except ImportError:
+    _euclidean = math.dist
+    LEGACY_BACKEND = 'math.dist'
+
+INITIAL_OPEN_EAR_AVG = 0.30
+
+
+class _Point:
+    __slots__ = ('x', 'y')
+
+    def __init__(self, x, y):
+        self.x = int(x)
+        self.y = int(y)
+
+
+class SyntheticShape:
+    # Tiruan minimal dlib.full_object_detection (part(i) & parts()).
+    def __init__(self, points):
+        self._points = [_Point(x, y) for x, y in points]
+
+    def part(self, i):
+        return self._points[i]
+
+    def parts(self):
+        return self._points
+
+
+def legacy_calculate_ear(eye_landmarks):
+    A = _euclidean(eye_landmarks[1], eye_landmarks[5])
+    B = _euclidean(eye_landmarks[2], eye_landmarks[4])
+    C = _euclidean(eye_landmarks[0], eye_landmarks[3])
+    if C == 0: return INITIAL_OPEN_EAR_AVG
+    return (A + B) / (2.0 * C)
+
+
+def legacy_frame_ear(landmarks):
+    left_eye_coords = np.array([(landmarks.part(i).x, landmarks.part(i).y) for i in range(42, 48)])
+    right_eye_coords = np.array([(landmarks.part(i).x, landmarks.part(i).y) for i in range(36, 42)])
+    return (legacy_calculate_ear(left_eye_coords) + legacy_calculate_ear(right_eye_coords)) / 2.0
+
+
+def vectorized_frame_ear(landmarks):
+    return float(mean_ear(shape_to_np(landmarks), INITIAL_OPEN_EAR_AVG))
+
+
+def synthetic_landmarks(count, seed=0):
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(200, 400, size=(1, 68, 2))
+    return np.rint(base + rng.normal(0, 4, size=(count, 68, 2)))
+
+
+def time_per_call(fn, items):
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - start) / len(items)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark EAR lama vs tervektorisasi.")
+    parser.add_argument('--frames', type=int, default=5000, help="Jumlah frame untuk mode per-frame")
+    parser.add_argument('--batch', type=int, default=10000, help="Jumlah frame untuk mode batch (N, 68, 2)")
+    parser.add_argument('--json', action='store_true', help="Cetak hasil sebagai JSON")
+    args = parser.parse_args()
+
+    points = synthetic_landmarks(max(args.frames, args.batch))
+    shapes = [SyntheticShape(p) for p in points[:args.frames]]
+
+    legacy_values = np.array([legacy_frame_ear(s) for s in shapes])
+    vector_values = np.array([vectorized_frame_ear(s) for s in shapes])
+    max_abs_diff = float(np.abs(legacy_values - vector_values).max())
+
+    legacy_s = time_per_call(legacy_frame_ear, shapes)
+    vector_s = time_per_call(vectorized_frame_ear, shapes)
+    batch_points = points[:args.batch]
+    start = time.perf_counter()
+    mean_ear(batch_points, INITIAL_OPEN_EAR_AVG)
+    batch_s = (time.perf_counter() - start) / len(batch_points)
+
+    results = {
+        'legacy_backend': LEGACY_BACKEND,
+        'frames': args.frames,
+        'legacy_us_per_frame': round(legacy_s * 1e6, 2),
+        'vectorized_us_per_frame': round(vector_s * 1e6, 2),
+        'batch_frames': len(batch_points),
+        'batch_us_per_frame': round(batch_s * 1e6, 3),
+        'speedup_per_frame': round(legacy_s / vector_s, 2),
+        'speedup_batch': round(legacy_s / batch_s, 1),
+        'max_abs_diff': max_abs_diff,
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"[Bench] Legacy ({LEGACY_BACKEND}): {results['legacy_us_per_frame']:.2f} us/frame")
+    print(f"[Bench] Vectorized     : {results['vectorized_us_per_frame']:.2f} us/frame ({results['speedup_per_frame']}x)")
+    print(f"[Bench] Batch (N={len(batch_points)}): {results['batch_us_per_frame']:.3f} us/frame ({results['speedup_batch']}x)")
+    print(f"[Bench] Selisih maksimum EAR: {max_abs_diff:.2e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# File: Client_Driver/benchmarks/bench_face_tracking.py
+# Benchmark latensi per frame (lokalisasi wajah + predictor landmark) untuk tiap mode FaceTracker
+# pada video rekaman. Mode 'off' = baseline lama (detector HOG penuh di setiap frame).
+#
+# Contoh:
+#   python benchmarks/bench_face_tracking.py rekaman_kabin.mp4 --keyframe-interval 10 --max-frames 600
+import argparse
+import json
+
+import bench_common
+from bench_common import Stopwatch, load_dlib_models, read_video_frames, summarize_latencies
+from face_tracker import TRACKING_MODES, FaceTracker
+
+
+def run_mode(frames, detector, predictor, mode, keyframe_interval, min_confidence):
+    tracker = FaceTracker(detector, mode=mode, keyframe_interval=keyframe_interval, min_confidence=min_confidence)
+    latencies = []
+    centers = []
+    for gray in frames:
+        with Stopwatch() as watch:
+            face = tracker.locate(gray)
+            if face is not None:
+                predictor(gray, face)
+        latencies.append(watch.elapsed)
+        centers.append(None if face is None else ((face.left() + face.right()) / 2.0, (face.top() + face.bottom()) / 2.0))
+    return tracker.stats(), summarize_latencies(latencies), centers
+
+
+def center_drift_px(centers, baseline_centers):
+    # Rata-rata selisih pusat kotak wajah terhadap baseline (frame yang sama-sama punya wajah).
+    diffs = [((c[0] - b[0]) ** 2 + (c[1] - b[1]) ** 2) ** 0.5
+             for c, b in zip(centers, baseline_centers) if c is not None and b is not None]
+    return round(sum(diffs) / len(diffs), 2) if diffs else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark track-then-detect vs detector HOG penuh.")
+    parser.add_argument('video', help="Path video rekaman kabin")
+    parser.add_argument('--model', default=bench_common.DEFAULT_MODEL_PATH, help="Path shape_predictor_68_face_landmarks.dat")
+    parser.add_argument('--modes', nargs='+', default=list(TRACKING_MODES), choices=TRACKING_MODES)
+    parser.add_argument('--keyframe-interval', type=int, default=10)
+    parser.add_argument('--min-confidence', type=float, default=7.0)
+    parser.add_argument('--max-frames', type=int, default=None)
+    parser.add_argument('--json', action='store_true', help="Cetak hasil sebagai JSON")
+    args = parser.parse_args()
+
+    detector, predictor = load_dlib_models(args.model)
+    frames = read_video_frames(args.video, args.max_frames)
+    if not args.json:  # Dengan --json, stdout hanya berisi dokumen JSON
+        print(f"[Bench] {len(frames)} frame dimuat dari {args.video}")
+
+    modes = ['off'] + [m for m in args.modes if m != 'off']
+    results = {}
+    baseline_centers = None
+    for mode in modes:
+        stats, latency, centers = run_mode(frames, detector, predictor, mode, args.keyframe_interval, args.min_confidence)
+        if mode == 'off':
+            baseline_centers = centers
+        results[mode] = {'latency': latency, 'tracker': stats, 'center_drift_px': center_drift_px(centers, baseline_centers)}
+        if not args.json:
+            print(f"[Bench] mode={mode:<11} mean={latency['mean_ms']:.2f}ms p50={latency['p50_ms']:.2f}ms "
+                  f"p95={latency['p95_ms']:.2f}ms detector_ratio={stats['detector_ratio']:.2f} "
+                  f"drift={results[mode]['center_drift_px']}px")
+    baseline_mean = results['off']['latency']['mean_ms']
+    for mode, result in results.items():
+        result['speedup_vs_off'] = round(baseline_mean / result['latency']['mean_ms'], 2) if result['latency']['mean_ms'] else None
+        if not args.json:
+            print(f"[Bench] mode={mode:<11} speedup vs off: {result['speedup_vs_off']}x")
+    if args.json:
+        print(json.dumps({'video': args.video, 'frames': len(frames), 'keyframe_interval': args.keyframe_interval, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
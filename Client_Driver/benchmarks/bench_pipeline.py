@@ -0,0 +1,407 @@
+# File: Client_Driver/benchmarks/bench_pipeline.py
+# Benchmark end-to-end hot path deteksi: DrowsinessEngine.process_frame() (cvtColor, deteksi/tracking
+# wajah, predictor, EAR/PERCLOS, overlay, telemetri) + encode_frame() (JPEG), tanpa kamera dan tanpa
+# Socket.IO. Sumber frame: sintetis (latar + N tempelan foto wajah) atau video rekaman, untuk setiap
+# kombinasi resolusi x jumlah wajah. Tiap kombinasi dijalankan di proses baru agar CPU & peak RSS
+# terukur terpisah. Hasil disimpan sebagai JSON dan bisa dibandingkan antar run untuk menangkap regresi.
+# Frame sintetis diambil bergiliran dari ring kecil (FRAME_RING_SIZE) dan video di-decode per frame, jadi memori
+# benchmark sendiri tidak menutupi pertumbuhan memori pipeline; `rss_delta_mb` = kenaikan peak RSS selama
+# warmup + pengukuran terhadap baseline setelah model & engine dimuat. Decode video tidak ikut terukur.
+#
+# Contoh:
+#   python benchmarks/bench_pipeline.py run --face-image wajah.jpg --resolutions 640x480 1280x720 --faces 0 1 2 -o baseline.json
+#   python benchmarks/bench_pipeline.py run --video rekaman_kabin.mp4 --resolutions 640x480 -o sesudah.json
+#   python benchmarks/bench_pipeline.py compare baseline.json sesudah.json --tolerance 0.10
+#   (compare juga menerima dua hasil `scale`; hasil `run` tidak bisa dibandingkan dengan hasil `scale`)
+#
+# Subcommand `scale`: N driver (engine + thread capture masing-masing) x W worker deteksi EngineManager
+# dalam satu proses, seperti server sebenarnya. Mengukur fps agregat & utilisasi CPU per kombinasi, untuk
+# melihat seberapa jauh worker thread benar-benar memakai banyak core (bagian Python per frame memegang GIL).
+#   python benchmarks/bench_pipeline.py scale --face-image wajah.jpg --drivers 1 2 4 --workers 1 2 4 -o scale.json
+import argparse
+import concurrent.futures
+import json
+import multiprocessing
+import platform
+import sys
+import time
+
+import numpy as np
+
+import bench_common
+from bench_common import Stopwatch, load_dlib_models, peak_rss_mb, summarize_latencies
+from face_tracker import TRACKING_MODES
+
+RESULT_FORMAT_VERSION = 2
+FRAME_RING_SIZE = 32  # ~satu periode jitter sin(index / 5) frame sintetis
+RSS_NOISE_MB = 5.0    # Perubahan rss_delta_mb di bawah ini tidak dianggap regresi (noise alokator)
+
+
+def parse_resolution(value):
+    width, _, height = value.lower().partition('x')
+    return int(width), int(height)
+
+
+def synthetic_frames(width, height, faces, count=FRAME_RING_SIZE, face_image=None, seed=0):
+    # Latar bertekstur + `faces` salinan foto wajah di grid, digeser sedikit per frame (agar tracker
+    # dan encoder JPEG tidak mendapat frame identik). Tanpa face_image: hanya latar (jalur "tanpa wajah").
+    # Dipakai sebagai ring: pemanggil mengambil frame bergiliran, bukan membuat satu array per frame terukur.
+    import cv2
+    rng = np.random.default_rng(seed)
+    background = cv2.GaussianBlur(rng.integers(0, 255, (height, width, 3), dtype=np.uint8), (0, 0), 3)
+    face = None
+    if faces and face_image is not None:
+        face = cv2.imread(face_image)
+        if face is None:
+            raise SystemExit(f"[ERROR] Gagal membaca foto wajah: {face_image}")
+        columns = int(np.ceil(np.sqrt(faces)))
+        rows = int(np.ceil(faces / columns))
+        cell = min(width // columns, height // rows)
+        face = cv2.resize(face, (int(cell * 0.8), int(cell * 0.8)), interpolation=cv2.INTER_AREA)
+    frames = []
+    for index in range(count):
+        frame = background.copy()
+        if face is not None:
+            jitter = int(round(cell * 0.05 * (1 + np.sin(index / 5.0))))  # 0 .. 10% sel
+            for slot in range(faces):
+                row, column = divmod(slot, columns)
+                y, x = row * cell + jitter, column * cell + cell // 10
+                frame[y:y + face.shape[0], x:x + face.shape[1]] = face
+        frames.append(frame)
+    return frames
+
+
+def recorded_frames(video_path, width, height, count):
+    # Generator: hanya satu frame video di memori pada satu waktu.
+    import cv2
+    for frame in bench_common.iter_video_frames(video_path, count, gray=False):
+        if frame.shape[1] != width or frame.shape[0] != height:
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+        yield frame
+
+
+def frame_source(config):
+    # Iterator warmup + frame terukur; frame sintetis bergiliran dari ring, selalu salinan baru
+    # (process_frame menggambar overlay di frame input).
+    width, height = config['resolution']
+    count = config['frames'] + config['warmup']
+    if config['video']:
+        return recorded_frames(config['video'], width, height, count)
+    ring = synthetic_frames(width, height, config['faces'], FRAME_RING_SIZE, config['face_image'])
+    return (ring[index % len(ring)].copy() for index in range(count))
+
+
+def run_config(config):
+    # Dijalankan di proses worker baru: muat model, bangun engine, ukur per frame.
+    from drowsiness_engine import DrowsinessEngine
+    from metrics import MetricsRegistry
+
+    frames = frame_source(config)
+    detector, predictor = load_dlib_models(config['model'])
+    emitted = []
+    metrics = MetricsRegistry(enabled=config['stage_metrics'])
+    engine = DrowsinessEngine(
+        'bench', None, '/', detector, predictor,
+        emit_fn=lambda event, data, **kwargs: emitted.append(event), alarm_fn=lambda engine, alarm_event, reason, detected_at: None,
+        tracker_kwargs={'mode': config['tracking_mode'], 'keyframe_interval': config['keyframe_interval'],
+                        'detection_scale': config['detection_scale']},
+        telemetry_rate_hz=config['telemetry_rate_hz'], jpeg_quality=config['jpeg_quality'],
+        stream_scale=config['stream_scale'], metrics=metrics)
+    baseline_rss = peak_rss_mb()
+
+    warmup = 0
+    latencies = []
+    encoded_bytes = 0
+    cpu_seconds = 0.0
+    for frame in frames:  # Ambil/decode frame di luar bagian yang diukur
+        if warmup < config['warmup']:
+            engine.encode_frame(engine.process_frame(frame))
+            warmup += 1
+            continue
+        cpu_start = time.process_time()
+        with Stopwatch() as watch:
+            jpeg = engine.encode_frame(engine.process_frame(frame))
+        cpu_seconds += time.process_time() - cpu_start
+        latencies.append(watch.elapsed)
+        encoded_bytes += len(jpeg) if jpeg else 0
+
+    measured = len(latencies)
+    elapsed = sum(latencies)
+    rss = peak_rss_mb()
+    result = {
+        'fps': round(measured / elapsed, 2) if elapsed else None,
+        'latency': summarize_latencies(latencies),
+        'cpu_seconds': round(cpu_seconds, 3),
+        'cpu_utilization': round(cpu_seconds / elapsed, 3) if elapsed else None,
+        'peak_rss_mb': rss,
+        'rss_delta_mb': round(rss - baseline_rss, 1) if rss is not None else None,
+        'avg_jpeg_bytes': int(encoded_bytes / measured) if measured else 0,
+        'emits': len(emitted),
+        'face_tracker': engine.face_tracker.stats(),
+    }
+    if config['stage_metrics']:
+        result['stages'] = {key.split('stage="')[-1].rstrip('"}'): value
+                            for key, value in metrics.snapshot().items() if 'stage_latency_seconds' in key}
+    return result
+
+
+class SyntheticCapture:
+    # Pengganti cv2.VideoCapture untuk CameraManager: frame sintetis bergiliran, dibatasi camera_fps.
+    def __init__(self, frames, camera_fps):
+        self.frames = frames
+        self.interval = 1.0 / camera_fps if camera_fps else 0.0
+        self.index = 0
+        self.next_time = time.perf_counter()
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        if self.interval:
+            delay = self.next_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self.next_time = max(self.next_time + self.interval, time.perf_counter() - self.interval)
+        frame = self.frames[self.index % len(self.frames)].copy()
+        self.index += 1
+        return True, frame
+
+    def release(self):
+        pass
+
+
+def run_scale_config(config):
+    # Dijalankan di proses worker baru: N engine berbagi `workers` thread deteksi (EngineManager).
+    from drowsiness_engine import DrowsinessEngine, EngineManager
+
+    width, height = config['resolution']
+    frames = synthetic_frames(width, height, config['faces'], FRAME_RING_SIZE, config['face_image'])
+    detector, predictor = load_dlib_models(config['model'])
+    manager = EngineManager(workers=config['workers'])
+    engines = []
+    for index in range(config['drivers']):
+        engine = DrowsinessEngine(
+            f"bench{index}", index, '/', detector, predictor,
+            emit_fn=lambda event, data, **kwargs: None, alarm_fn=lambda engine, alarm_event, reason, detected_at: None,
+            tracker_kwargs={'mode': config['tracking_mode'], 'keyframe_interval': config['keyframe_interval'],
+                            'detection_scale': config['detection_scale']},
+            camera_open_fn=lambda source: SyntheticCapture(frames, config['camera_fps']))
+        engines.append(manager.add_engine(engine))
+        engine.camera.request_open('bench')
+    while not all(engine.camera.is_streaming() for engine in engines):
+        time.sleep(0.01)
+    for engine in engines:
+        manager.start_engine(engine)
+
+    def processed():
+        return sum(engine.pipeline.stages[1].processed_count for engine in engines)
+
+    time.sleep(config['warmup_seconds'])
+    start_count, cpu_start = processed(), time.process_time()
+    with Stopwatch() as total:
+        time.sleep(config['seconds'])
+    frames_done = processed() - start_count
+    cpu_seconds = time.process_time() - cpu_start
+    manager.stop()
+    for engine in engines:
+        engine.camera.release('bench_done')
+    time.sleep(0.5)  # Biarkan thread capture/worker keluar dari dlib/OpenCV sebelum proses berakhir
+    return {
+        'fps_total': round(frames_done / total.elapsed, 2),
+        'fps_per_driver': round(frames_done / total.elapsed / config['drivers'], 2),
+        'cpu_utilization': round(cpu_seconds / total.elapsed, 3),  # > 1.0 = lebih dari satu core terpakai
+        'worker_steps': list(manager.worker_steps),
+        'capture_dropped': sum(engine.pipeline.raw_buffer.drop_count for engine in engines),
+    }
+
+
+def environment_info():
+    import cv2
+    import dlib
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': multiprocessing.cpu_count(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'dlib': dlib.__version__,
+    }
+
+
+def config_key(config):
+    width, height = config['resolution']
+    if config['video']:
+        return f"video/{width}x{height}"
+    return f"synthetic/{width}x{height}/faces={config['faces']}"
+
+
+def command_run(args):
+    if args.faces != [0] and not args.face_image and not args.video:
+        print("[Bench] Peringatan: tanpa --face-image, frame sintetis tidak berisi wajah (faces diabaikan).")
+    configs = []
+    for resolution in args.resolutions:
+        for faces in ([None] if args.video else args.faces):
+            configs.append({
+                'resolution': parse_resolution(resolution), 'faces': faces, 'video': args.video,
+                'face_image': args.face_image, 'frames': args.frames, 'warmup': args.warmup, 'model': args.model,
+                'tracking_mode': args.tracking_mode, 'keyframe_interval': args.keyframe_interval,
+                'detection_scale': args.detection_scale, 'telemetry_rate_hz': args.telemetry_rate_hz,
+                'jpeg_quality': args.jpeg_quality, 'stream_scale': args.stream_scale, 'stage_metrics': args.stage_metrics,
+            })
+
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    for config in configs:
+        key = config_key(config)
+        # Proses baru per kombinasi: peak RSS & waktu CPU tidak tercampur antar konfigurasi.
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            result = executor.submit(run_config, config).result()
+        results[key] = dict(result, config={k: v for k, v in config.items() if k not in ('model',)})
+        latency = result['latency']
+        print(f"[Bench] {key:<32} {result['fps']:>7.1f} fps  p50={latency['p50_ms']:.2f}ms p95={latency['p95_ms']:.2f}ms "
+              f"p99={latency['p99_ms']:.2f}ms  cpu={result['cpu_utilization']:.2f}  rss=+{result['rss_delta_mb']}MB")
+
+    report = {'format': RESULT_FORMAT_VERSION, 'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'environment': environment_info(), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"[Bench] Hasil disimpan ke {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+
+def command_scale(args):
+    if args.faces and not args.face_image:
+        print("[Bench] Peringatan: tanpa --face-image, frame sintetis tidak berisi wajah (jalur predictor tidak terukur).")
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    for drivers in args.drivers:
+        for workers in args.workers:
+            config = {
+                'resolution': parse_resolution(args.resolution), 'faces': args.faces, 'face_image': args.face_image,
+                'drivers': drivers, 'workers': workers, 'camera_fps': args.camera_fps, 'seconds': args.seconds,
+                'warmup_seconds': args.warmup_seconds, 'model': args.model, 'tracking_mode': args.tracking_mode,
+                'keyframe_interval': args.keyframe_interval, 'detection_scale': args.detection_scale,
+            }
+            with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                result = executor.submit(run_scale_config, config).result()
+            key = f"drivers={drivers}/workers={workers}"
+            results[key] = dict(result, config={k: v for k, v in config.items() if k not in ('model',)})
+            print(f"[Bench] {key:<24} {result['fps_total']:>7.1f} fps total  {result['fps_per_driver']:>6.1f} fps/driver  "
+                  f"cpu={result['cpu_utilization']:.2f} core")
+
+    report = {'format': RESULT_FORMAT_VERSION, 'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'environment': environment_info(), 'scale': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"[Bench] Hasil disimpan ke {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+
+def report_kind(report):
+    # 'results' untuk hasil `run`, 'scale' untuk hasil `scale`.
+    for kind in ('results', 'scale'):
+        if kind in report:
+            return kind
+    raise SystemExit("[ERROR] File bukan hasil bench_pipeline (tidak ada 'results' atau 'scale').")
+
+
+def compare_reports(baseline, current, tolerance):
+    # Regresi: fps turun atau p95/kenaikan RSS naik lebih dari `tolerance` (relatif) dibanding baseline.
+    # Hasil `scale` dibandingkan pada fps agregat per kombinasi driver x worker.
+    kind = report_kind(current)
+    if report_kind(baseline) != kind:
+        raise SystemExit("[ERROR] Hasil `run` tidak bisa dibandingkan dengan hasil `scale`.")
+    rows = []
+    for key, new in current[kind].items():
+        old = baseline[kind].get(key)
+        if old is None:
+            continue
+        if kind == 'scale':
+            checks = [('fps_total', old.get('fps_total'), new.get('fps_total'), -1, 0.0)]
+        else:
+            checks = [
+                ('fps', old['fps'], new['fps'], -1, 0.0),
+                ('p95_ms', old['latency'].get('p95_ms'), new['latency'].get('p95_ms'), 1, 0.0),
+                ('rss_delta_mb', old.get('rss_delta_mb'), new.get('rss_delta_mb'), 1, RSS_NOISE_MB),
+            ]
+        for metric, old_value, new_value, worse_sign, noise in checks:
+            if old_value is None or new_value is None or (not old_value and not noise):
+                continue
+            # rss_delta_mb baseline bisa 0: kenaikan di atas `noise` tetap dihitung regresi.
+            change = (new_value - old_value) / old_value if old_value else (float('inf') if new_value > old_value else 0.0)
+            regressed = change * worse_sign > tolerance and abs(new_value - old_value) > noise
+            rows.append((key, metric, old_value, new_value, change, regressed))
+    return rows
+
+
+def command_compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows = compare_reports(baseline, current, args.tolerance)
+    if not rows:
+        raise SystemExit("[ERROR] Tidak ada konfigurasi yang sama di kedua hasil.")
+    for key, metric, old_value, new_value, change, regressed in rows:
+        flag = 'REGRESI' if regressed else ''
+        print(f"[Compare] {key:<32} {metric:<12} {old_value:>10} -> {new_value:<10} ({change * 100:+.1f}%) {flag}")
+    regressions = sum(1 for row in rows if row[-1])
+    print(f"[Compare] {regressions} regresi (toleransi {args.tolerance * 100:.0f}%).")
+    sys.exit(1 if regressions else 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark end-to-end hot path deteksi kantuk.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run = subparsers.add_parser('run', help="Jalankan benchmark dan simpan hasil JSON")
+    run.add_argument('--video', default=None, help="Video rekaman sebagai sumber frame (default: sintetis)")
+    run.add_argument('--face-image', default=None, help="Foto wajah untuk frame sintetis")
+    run.add_argument('--resolutions', nargs='+', default=['640x480'])
+    run.add_argument('--faces', nargs='+', type=int, default=[0, 1], help="Jumlah wajah per frame sintetis")
+    run.add_argument('--frames', type=int, default=300)
+    run.add_argument('--warmup', type=int, default=30)
+    run.add_argument('--model', default=bench_common.DEFAULT_MODEL_PATH)
+    run.add_argument('--tracking-mode', default='off', choices=TRACKING_MODES)
+    run.add_argument('--keyframe-interval', type=int, default=10)
+    run.add_argument('--detection-scale', type=float, default=1.0)
+    run.add_argument('--telemetry-rate-hz', type=float, default=5.0)
+    run.add_argument('--jpeg-quality', type=int, default=95)
+    run.add_argument('--stream-scale', type=float, default=1.0)
+    run.add_argument('--stage-metrics', action='store_true', help="Sertakan latensi per tahap (metrics.py)")
+    run.add_argument('-o', '--output', default=None, help="File JSON hasil (default: cetak ke stdout)")
+    run.set_defaults(func=command_run)
+
+    scale = subparsers.add_parser('scale', help="Ukur fps agregat N driver x W worker deteksi (skalabilitas core)")
+    scale.add_argument('--face-image', default=None, help="Foto wajah untuk frame sintetis")
+    scale.add_argument('--resolution', default='640x480')
+    scale.add_argument('--faces', type=int, default=1, help="Jumlah wajah per frame sintetis")
+    scale.add_argument('--drivers', nargs='+', type=int, default=[1, 2, 4])
+    scale.add_argument('--workers', nargs='+', type=int, default=[1, 2, 4])
+    scale.add_argument('--camera-fps', type=float, default=30.0, help="Laju frame kamera sintetis (0 = secepatnya)")
+    scale.add_argument('--seconds', type=float, default=10.0)
+    scale.add_argument('--warmup-seconds', type=float, default=2.0)
+    scale.add_argument('--model', default=bench_common.DEFAULT_MODEL_PATH)
+    scale.add_argument('--tracking-mode', default='off', choices=TRACKING_MODES)
+    scale.add_argument('--keyframe-interval', type=int, default=10)
+    scale.add_argument('--detection-scale', type=float, default=1.0)
+    scale.add_argument('-o', '--output', default=None, help="File JSON hasil (default: cetak ke stdout)")
+    scale.set_defaults(func=command_scale)
+
+    compare = subparsers.add_parser('compare', help="Bandingkan dua file hasil, exit code 1 jika ada regresi")
+    compare.add_argument('baseline')
+    compare.add_argument('current')
+    compare.add_argument('--tolerance', type=float, default=0.10)
+    compare.set_defaults(func=command_compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
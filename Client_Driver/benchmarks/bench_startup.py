@@ -0,0 +1,91 @@
+# File: Client_Driver/benchmarks/bench_startup.py
+# Benchmark waktu startup server deteksi, di proses Python baru per run (cold import):
+#   - import_ms : import DrowsinessDetection sampai app Flask/SocketIO siap menerima koneksi
+#   - ready_ms  : sampai model Dlib selesai dimuat di latar (/ready = 200)
+#   - timings_ms: rincian langkah model_registry (import dlib, detector, predictor)
+# Median dari beberapa run dibandingkan dengan anggaran (budget); exit code 1 jika melewati anggaran.
+#
+# Contoh:
+#   python benchmarks/bench_startup.py --runs 5 --import-budget-ms 1500 --ready-budget-ms 8000 -o startup.json
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+import bench_common
+
+RESULT_MARKER = '@@BENCH_STARTUP@@'
+
+CHILD_CODE = f"""
+import json, sys, time
+begin = time.perf_counter()
+sys.path.insert(0, {bench_common.CLIENT_DRIVER_DIR!r})
+import DrowsinessDetection as server
+imported = time.perf_counter()
+server.model_registry.load(timeout=float(sys.argv[1]))
+ready = time.perf_counter()
+status = server.model_registry.status()
+print({RESULT_MARKER!r} + json.dumps({{
+    'import_ms': round((imported - begin) * 1000.0, 1),
+    'ready_ms': round((ready - begin) * 1000.0, 1),
+    'model_state': status['state'],
+    'timings_ms': status['timings_ms'],
+    'error': status['error'],
+}}))
+"""
+
+
+def run_once(timeout):
+    completed = subprocess.run([sys.executable, '-c', CHILD_CODE, str(timeout)], capture_output=True, text=True,
+                               cwd=bench_common.CLIENT_DRIVER_DIR, timeout=timeout + 60)
+    for line in completed.stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    raise SystemExit(f"[ERROR] Proses startup gagal (exit {completed.returncode}):\n{completed.stderr[-2000:]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark waktu startup server deteksi kantuk.")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--timeout', type=float, default=60.0, help="Batas tunggu model siap per run (detik)")
+    parser.add_argument('--import-budget-ms', type=float, default=1500.0)
+    parser.add_argument('--ready-budget-ms', type=float, default=10000.0)
+    parser.add_argument('-o', '--output', default=None, help="File JSON hasil")
+    args = parser.parse_args()
+
+    runs = []
+    for index in range(args.runs):
+        result = run_once(args.timeout)
+        runs.append(result)
+        print(f"[Bench] Run {index + 1}: import {result['import_ms']:.0f} ms, model {result['model_state']} "
+              f"dalam {result['ready_ms']:.0f} ms {result['timings_ms']}")
+
+    import_ms = statistics.median(run['import_ms'] for run in runs)
+    ready_ms = statistics.median(run['ready_ms'] for run in runs)
+    models_ok = all(run['model_state'] == 'ready' for run in runs)
+    over_budget = [name for name, value, budget in (('import', import_ms, args.import_budget_ms),
+                                                   ('ready', ready_ms, args.ready_budget_ms)) if value > budget]
+    report = {
+        'runs': runs,
+        'median_import_ms': import_ms,
+        'median_ready_ms': ready_ms,
+        'budget_ms': {'import': args.import_budget_ms, 'ready': args.ready_budget_ms},
+        'models_ready': models_ok,
+        'over_budget': over_budget,
+    }
+    print(f"[Bench] Median import {import_ms:.0f} ms (budget {args.import_budget_ms:.0f}), "
+          f"ready {ready_ms:.0f} ms (budget {args.ready_budget_ms:.0f})")
+    if not models_ok:
+        print(f"[Bench] Peringatan: model tidak siap ({runs[-1]['error']}); ready_ms tidak mencakup predictor.")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"[Bench] Hasil disimpan ke {args.output}")
+    if over_budget:
+        print(f"[Bench] MELEWATI anggaran: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+# File: Client_Driver/camera_manager.py
+# Siklus hidup kamera deteksi tanpa blocking. Handler Socket.IO / HTTP hanya menyatakan keadaan
+# yang diinginkan (request_open / release / hand_over) lalu langsung kembali; satu thread latar per
+# kamera yang membuka/menutup device (cv2.VideoCapture bisa makan ratusan ms) dan mencoba ulang
+# dengan backoff TANPA memegang lock apa pun. Perubahan state dilaporkan lewat on_state_change.
+#
+#   idle --request_open--> opening --berhasil--> streaming --hand_over--> handed_over
+#     ^                       |  gagal setelah semua retry -> idle (info['error'])
+#     +---- release ----------+------------------------------------------------+
+import threading
+import time
+
+import cv2
+
+from thread_utils import spawn_daemon_thread
+
+CAMERA_IDLE = 'idle'
+CAMERA_OPENING = 'opening'
+CAMERA_STREAMING = 'streaming'
+CAMERA_HANDED_OVER = 'handed_over'  # Device sengaja dilepas untuk WebRTC / panggilan HTTP
+
+DEFAULT_RETRY_DELAYS = (0.25, 0.5, 1.0, 2.0)
+
+
+class CameraManager:
+    def __init__(self, source, on_state_change=None, open_fn=cv2.VideoCapture, retry_delays=DEFAULT_RETRY_DELAYS,
+                 spawn_fn=None, clock=time.monotonic, name='camera'):
+        self.source = source
+        self.on_state_change = on_state_change
+        self.open_fn = open_fn
+        self.retry_delays = tuple(retry_delays)
+        self.spawn_fn = spawn_fn or spawn_daemon_thread
+        self.clock = clock
+        self.name = name
+        self.state = CAMERA_IDLE
+        self._cap = None
+        self._lock = threading.Lock()       # Melindungi state/_desired/_cap; tidak pernah dipegang saat open/read
+        self._read_lock = threading.Lock()  # cap.read() vs cap.release() pada objek capture yang sama
+        self._wake = threading.Event()
+        self._desired = CAMERA_IDLE
+        self._reason = None
+        self._worker = None
+        self._handed_over_at = None
+        self.open_attempts = 0
+        self.open_failures = 0
+        self.handovers = 0
+        self.last_open_seconds = None
+
+    # ---- API non-blocking (dipanggil dari handler) ----
+    def request_open(self, reason):
+        self._set_desired(CAMERA_STREAMING, reason)
+
+    def release(self, reason):
+        self._set_desired(CAMERA_IDLE, reason)
+
+    def hand_over(self, reason):
+        self._set_desired(CAMERA_HANDED_OVER, reason)
+
+    def _set_desired(self, desired, reason):
+        with self._lock:
+            self._desired = desired
+            self._reason = reason
+            if self._worker is None:
+                self._worker = self.spawn_fn(self._run, f"{self.name}-lifecycle")
+        self._wake.set()
+
+    # ---- Akses frame (thread capture pipeline) ----
+    def is_streaming(self):
+        return self.state == CAMERA_STREAMING
+
+    def is_opening(self):
+        return self.state == CAMERA_OPENING
+
+    def read(self, lap=None):
+        # (success, frame); (False, None) jika kamera tidak sedang streaming.
+        # lap (opsional, metrics.LapTimer): mencatat waktu tunggu lock baca sebagai 'camera_lock_wait'.
+        with self._read_lock:
+            if lap is not None:
+                lap.lap('camera_lock_wait')
+            cap = self._cap
+            if cap is None:
+                return False, None
+            return cap.read()
+
+    # ---- Thread latar ----
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            with self._lock:
+                desired, reason = self._desired, self._reason
+            if desired == CAMERA_STREAMING:
+                if self._cap is None:
+                    self._open_with_retry(reason)
+            else:
+                self._close(desired, reason)
+
+    def _open_with_retry(self, reason):
+        # _handed_over_at tetap tersimpan jika pembukaan dibatalkan (mis. handover lagi di tengah retry),
+        # sehingga handover_seconds tetap terukur dari saat stream terakhir benar-benar dilepas.
+        self._set_state(CAMERA_OPENING, {'reason': reason})
+        start = self.clock()
+        for attempt, delay in enumerate((0.0,) + self.retry_delays):
+            # Backoff menunggu di Event (tanpa lock): permintaan baru (mis. release) membatalkan retry.
+            if delay and self._wake.wait(delay):
+                print(f"[Kamera] [{self.name}] Pembukaan kamera dibatalkan oleh permintaan baru.")
+                return
+            self.open_attempts += 1
+            cap = self.open_fn(self.source)
+            if cap is not None and cap.isOpened():
+                with self._lock:
+                    still_wanted = self._desired == CAMERA_STREAMING
+                    if still_wanted:
+                        self._cap = cap
+                if not still_wanted:
+                    cap.release()
+                    return
+                self.last_open_seconds = self.clock() - start
+                info = {'reason': reason, 'attempts': attempt + 1, 'open_seconds': round(self.last_open_seconds, 3),
+                        'handover_seconds': None}
+                if self._handed_over_at is not None:
+                    info['handover_seconds'] = round(self.clock() - self._handed_over_at, 3)
+                    self._handed_over_at = None
+                print(f"[Kamera] [{self.name}] Kamera terbuka ({info['open_seconds']:.3f}s, attempt {attempt + 1}, sumber: {reason}).")
+                self._set_state(CAMERA_STREAMING, info)
+                return
+            if cap is not None:
+                cap.release()
+            print(f"[Kamera] [{self.name}] GAGAL membuka kamera (attempt {attempt + 1}).")
+        self.open_failures += 1
+        self._set_state(CAMERA_IDLE, {'reason': reason, 'error': f"Gagal membuka kamera setelah {len(self.retry_delays) + 1} attempt."})
+
+    def _close(self, target_state, reason):
+        with self._lock:
+            cap, self._cap = self._cap, None
+        if cap is not None:
+            with self._read_lock:  # Tunggu cap.read() yang sedang berjalan selesai
+                cap.release()
+            print(f"[Kamera] [{self.name}] Kamera dilepaskan (sumber: {reason}).")
+        if target_state == CAMERA_HANDED_OVER and self.state != CAMERA_HANDED_OVER:
+            # Hanya handover dari stream aktif yang memulai hitungan baru; handover saat kamera masih dibuka
+            # ulang mempertahankan timestamp handover sebelumnya (dari idle: tetap None, kalibrasi diulang).
+            self.handovers += 1
+            if self.state == CAMERA_STREAMING:
+                self._handed_over_at = self.clock()
+        elif target_state == CAMERA_IDLE:
+            self._handed_over_at = None
+        if target_state != self.state:
+            self._set_state(target_state, {'reason': reason, 'released': cap is not None})
+
+    def _set_state(self, state, info):
+        self.state = state
+        if self.on_state_change is not None:
+            try:
+                self.on_state_change(state, info)
+            except Exception as e:
+                print(f"[Kamera] [{self.name}] Exception di callback state '{state}': {e}")
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'open_attempts': self.open_attempts,
+            'open_failures': self.open_failures,
+            'handovers': self.handovers,
+            'last_open_ms': round(self.last_open_seconds * 1000.0, 1) if self.last_open_seconds is not None else None,
+        }
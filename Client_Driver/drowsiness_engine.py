@@ -0,0 +1,340 @@
+# File: Client_Driver/drowsiness_engine.py
+# Engine deteksi kantuk per kamera/stream. Semua state yang dulu berupa global modul
+# (kamera, kalibrasi, PERCLOS, alarm, tracker wajah) kini milik satu DrowsinessEngine, sehingga
+# satu host (mis. gateway depo) bisa memantau beberapa kabin sekaligus. EngineManager
+# menjadwalkan tahap deteksi+encode semua engine pada worker pool bersama.
+import threading
+import time
+
+import cv2
+
+from camera_manager import CAMERA_HANDED_OVER, CAMERA_IDLE, CAMERA_STREAMING, CameraManager
+from drowsiness_state import DrowsinessState, ALARM_EVENT_ALERT, ALARM_EVENT_END, ALARM_EVENT_NORMAL, INITIAL_OPEN_EAR_AVG, PERCLOS_THRESHOLD
+from event_store import EVENT_ALARM_ALERT, EVENT_ALARM_NORMAL, EVENT_CALIBRATION, EVENT_ERROR
+from face_tracker import FaceTracker
+from facial_metrics import mean_ear, shape_to_np
+from frame_pipeline import FramePipeline
+from metrics import MetricsRegistry
+from mjpeg_stream import JpegEncoder
+from telemetry import TelemetryPublisher
+from thread_utils import spawn_daemon_thread
+
+
+def parse_camera_source(value):
+    # "0" -> indeks kamera 0; selain angka dianggap path/URL stream (file, rtsp://, http://).
+    value = value.strip()
+    return int(value) if value.isdigit() else value
+
+
+# Tahap yang diukur per frame (lap timer); 'yield' diukur oleh generator /video_feed.
+LATENCY_STAGES = ('capture', 'cvtColor', 'detector', 'predictor', 'ear_state', 'overlay', 'emit', 'imencode', 'yield')
+
+
+class DrowsinessEngine:
+    __slots__ = ('driver_id', 'source', 'namespace', 'camera', 'camera_lock', 'camera_requested_by_webrtc',
+                 'call_status_http', 'active_sio_clients', 'state', 'face_tracker', 'predictor', 'pipeline',
+                 'emit_fn', 'alarm_fn', 'telemetry', 'encoder', 'metrics', 'stage_latency', 'frames_processed',
+                 'calibration_keep_seconds', 'calibrations_preserved', 'tracker_kwargs', 'event_store', '_session')
+
+    def __init__(self, driver_id, source, namespace, detector, predictor, emit_fn, alarm_fn, tracker_kwargs=None,
+                 pooled=True, spawn_fn=None, sleep_fn=None, telemetry_rate_hz=5.0,
+                 jpeg_quality=95, stream_scale=1.0, metrics=None, calibration_keep_seconds=300.0, camera_open_fn=None,
+                 event_store=None):
+        self.driver_id = driver_id
+        self.source = source
+        self.namespace = namespace
+        # camera_lock kini hanya melindungi flag klien/panggilan; buka/tutup device ada di CameraManager.
+        self.camera = CameraManager(source, on_state_change=self._on_camera_state, name=driver_id,
+                                    **({'open_fn': camera_open_fn} if camera_open_fn else {}))
+        self.camera_lock = threading.Lock()
+        self.camera_requested_by_webrtc = False
+        self.call_status_http = {'in_call': False, 'call_type': None}
+        self.active_sio_clients = 0
+        self.state = DrowsinessState()
+        self._session = 0  # Naik setiap reset/resume/kamera dilepas; frame dari sesi lama tidak dideteksi
+        self.tracker_kwargs = tracker_kwargs or {}
+        self.face_tracker = None
+        self.predictor = None
+        if detector is not None and predictor is not None:
+            self.attach_models(detector, predictor)
+        self.emit_fn = emit_fn
+        self.alarm_fn = alarm_fn
+        self.calibration_keep_seconds = calibration_keep_seconds
+        self.calibrations_preserved = 0
+        self.event_store = event_store
+        self.telemetry = TelemetryPublisher(self._send, rate_hz=telemetry_rate_hz)
+        self.encoder = JpegEncoder(quality=jpeg_quality, scale=stream_scale)
+        self.metrics = metrics or MetricsRegistry(enabled=False)
+        self.stage_latency = {stage: self.metrics.histogram('stage_latency_seconds', 'Latensi per tahap loop deteksi (detik)',
+                                                            driver=driver_id, stage=stage) for stage in LATENCY_STAGES}
+        self.stage_latency['camera_lock_wait'] = self.metrics.histogram(
+            'camera_lock_wait_seconds', 'Waktu tunggu lock baca kamera sebelum cap.read() (detik)', driver=driver_id)
+        self.frames_processed = self.metrics.counter('frames_processed_total', 'Frame yang melewati tahap deteksi', driver=driver_id)
+        self.metrics.add_collector(self._collect_metrics)
+        self.pipeline = FramePipeline(self.read_frame, self._process_captured, self.encode_frame,
+                                      spawn_fn=spawn_fn, sleep_fn=sleep_fn, pooled=pooled)
+
+    def _send(self, event, data, **kwargs):
+        # Semua event Socket.IO engine ini dikirim di namespace miliknya (per driver).
+        self.metrics.counter('socketio_emits_total', 'Event Socket.IO yang benar-benar dikirim', driver=self.driver_id, event=event).inc()
+        self.emit_fn(event, data, namespace=self.namespace, **kwargs)
+        if self.event_store is not None and 'room' not in kwargs:
+            self._record(event, data)
+
+    def _record(self, event, data):
+        # Riwayat = apa yang benar-benar dikirim ke klien: update_data sudah berupa batch telemetri
+        # (~rate_hz per detik), jadi tabel samples tidak tumbuh sebanding fps kamera.
+        store, driver_id = self.event_store, self.driver_id
+        if event == 'update_data':
+            store.record_sample(driver_id, data.get('ear_mean', data.get('ear')), data.get('perclos'),
+                                ear_min=data.get('ear_min'), ear_max=data.get('ear_max'), alarm_on=data.get('alarm_on'))
+        elif event == 'drowsiness_alert':
+            kind = EVENT_ALARM_ALERT if data.get('type') == 'alert' else EVENT_ALARM_NORMAL
+            store.record_event(driver_id, kind, data.get('message'), {'ear': data.get('ear'), 'perclos': data.get('perclos')})
+        elif event == 'status_update' and data.get('type') == 'calibration_done':
+            store.record_event(driver_id, EVENT_CALIBRATION, data.get('message'), {'threshold': data.get('dynamic_threshold')})
+        elif event == 'status_update' and data.get('type') == 'error':
+            store.record_event(driver_id, EVENT_ERROR, data.get('message'))
+
+    def emit(self, event, data, **kwargs):
+        # Kirim langsung lewat telemetri (tanpa penggabungan) agar status terakhirnya tetap sinkron.
+        self.telemetry.send(event, data, **kwargs)
+
+    def attach_models(self, detector, predictor):
+        # Dipanggil saat model Dlib siap (model_registry memuatnya lazy di thread latar).
+        self.face_tracker = FaceTracker(detector, **self.tracker_kwargs)
+        self.predictor = predictor
+
+    def models_ready(self):
+        return self.face_tracker is not None and self.predictor is not None
+
+    def camera_is_open(self):
+        return self.camera.is_streaming()
+
+    def _on_camera_state(self, camera_state, info):
+        # Dipanggil dari thread CameraManager setiap state kamera berubah. Perubahan state deteksi dilakukan
+        # sambil memegang pipeline.detect_lock (lihat _new_session), jadi frame yang sedang dideteksi worker
+        # selesai lebih dulu dan alarm-nya terkirim sebelum END, bukan sesudahnya.
+        if camera_state == CAMERA_STREAMING:
+            handover_seconds = info.get('handover_seconds')
+            if handover_seconds is not None and self.state.is_calibrated and handover_seconds <= self.calibration_keep_seconds:
+                self.resume(source=info['reason'], handover_seconds=handover_seconds)
+            else:
+                self.reset(source=info['reason'])
+        elif camera_state == CAMERA_HANDED_OVER:
+            with self.pipeline.detect_lock:
+                self._new_session(f"Kamera dilepas ({info['reason']})")
+            self.telemetry.flush()  # Frame berhenti: kirim nilai EAR/alarm terakhir yang masih tertahan
+            if self.call_status_http['in_call']: self.emit('status_update', {'message': 'Kamera digunakan untuk panggilan HTTP.', 'type': 'info'})
+            else: self.emit('status_update', {'message': 'Kamera internal dilepaskan untuk WebRTC.', 'type': 'info'})
+        elif camera_state == CAMERA_IDLE:
+            with self.pipeline.detect_lock:
+                self._new_session(f"Kamera ditutup ({info['reason']})")
+            self.telemetry.flush()
+            if info.get('error'):
+                print(f"[ERROR] [{self.driver_id}] {info['error']} (sumber: {info['reason']})")
+                self.emit('status_update', {'message': 'GAGAL membuka kamera deteksi.', 'type': 'error'})
+
+    def _new_session(self, reason):
+        # Harus dipanggil dengan pipeline.detect_lock dipegang. Frame yang sudah dibaca tapi belum dideteksi
+        # (termasuk yang masih di tangan thread capture) ditandai sesi lama dan dibuang oleh _process_captured.
+        # Episode alarm di dispatcher ditutup (tanpa debounce) meski alarm sedang aktif, agar eskalasi
+        # supervisor/webhook tidak berjalan untuk driver yang sudah tidak dipantau.
+        self._session += 1
+        self.pipeline.flush()
+        if self.state.alarm_on: print(f"[ALARM] [{self.driver_id}] Alarm dihentikan: {reason}.")
+        self.state.alarm_on = False
+        self.alarm_fn(self, ALARM_EVENT_END, reason, self.state.clock())
+
+    def reset(self, source="unknown"):
+        with self.pipeline.detect_lock:
+            self._new_session(f"Reset ({source})")
+            self.state.reset()
+            if self.face_tracker is not None: self.face_tracker.reset()
+            self.telemetry.reset()
+        print(f"[INFO] [{self.driver_id}] Status deteksi dan kalibrasi direset (sumber: {source}).")
+        self.telemetry.status_update({
+            'message': 'Kalibrasi dimulai ulang...', 'is_calibrated': False,
+            'dynamic_threshold': self.state.ear_threshold, 'type': 'calibration_info'
+        })
+
+    def resume(self, source="unknown", handover_seconds=0.0):
+        # Kamera kembali setelah handover singkat: kalibrasi dipertahankan, tanpa kalibrasi ulang 60 frame.
+        with self.pipeline.detect_lock:
+            self._new_session(f"Resume ({source})")
+            self.state.resume()
+            if self.face_tracker is not None: self.face_tracker.reset()
+            self.telemetry.reset()
+        self.calibrations_preserved += 1
+        print(f"[INFO] [{self.driver_id}] Deteksi dilanjutkan, kalibrasi dipertahankan (jeda {handover_seconds:.1f}s, sumber: {source}).")
+        self.telemetry.status_update({
+            'message': f"Deteksi dilanjutkan. Threshold: {self.state.ear_threshold:.3f}", 'is_calibrated': True,
+            'dynamic_threshold': self.state.ear_threshold, 'type': 'calibration_resumed'  # Bukan kalibrasi baru: tidak dicatat di riwayat
+        })
+
+    def read_frame(self):
+        # Tahap capture pipeline: baca satu frame dari kamera (None jika kamera tidak tersedia).
+        if self.camera_requested_by_webrtc or self.call_status_http['in_call'] or not self.camera.is_streaming():
+            return None
+        session = self._session  # Dibaca sebelum cap.read(): frame yang selesai dibaca setelah handover = sesi lama
+        lap = self.metrics.lap_timer(self.stage_latency)
+        success, frame = self.camera.read(lap)
+        captured_at = self.state.clock()  # Timestamp frame (clock yang sama dengan jendela PERCLOS/kalibrasi/kedipan)
+        lap.lap('capture')
+        if not success and not self.camera.is_streaming():
+            return None  # Kamera baru saja dilepas
+        if not success:
+            print(f"[read_frame] [{self.driver_id}] Gagal baca frame dari kamera terbuka.")
+            return None
+        return session, captured_at, frame
+
+    def _process_captured(self, captured):
+        # Tahap deteksi pipeline (detect_lock dipegang): item dari buffer capture = (sesi, timestamp capture, frame).
+        session, captured_at, frame = captured
+        if session != self._session:
+            return None  # Frame dari sebelum reset/resume/handover: jangan sentuh state sesi baru
+        return self.process_frame(frame, captured_at)
+
+    def process_frame(self, current_frame_to_process, captured_at=None):
+        # Update state kantuk dan gambar overlay pada frame. captured_at: timestamp saat frame dibaca dari
+        # kamera, sehingga antrean/jeda di pipeline tidak menggeser jendela waktu maupun latensi alarm.
+        # ---- MULAI LOGIKA DETEKSI KANTUK ----
+        state = self.state; lap = self.metrics.lap_timer(self.stage_latency); self.frames_processed.inc(); frame_time = state.clock() if captured_at is None else captured_at
+        gray = cv2.cvtColor(current_frame_to_process, cv2.COLOR_BGR2GRAY); lap.lap('cvtColor'); face = self.face_tracker.locate(gray); lap.lap('detector'); ear_value_current_frame = -1; perclos_value_current_frame = -1
+        if face is None:
+            if not state.alarm_on : self.telemetry.status_update({'message': 'Tidak ada wajah terdeteksi.', 'type': 'no_face', 'is_calibrated': state.is_calibrated, 'dynamic_threshold': state.ear_threshold if state.is_calibrated else None})
+            state.update_no_face(frame_time)
+        else:
+            landmarks = self.predictor(gray, face); lap.lap('predictor'); landmark_points = shape_to_np(landmarks); ear_value_current_frame = float(mean_ear(landmark_points, INITIAL_OPEN_EAR_AVG))
+            result = state.update(ear_value_current_frame, frame_time); perclos_value_current_frame = result.perclos
+            if result.calibration_count is not None:
+                cal_progress = result.calibration_progress * 100
+                self.telemetry.status_update({ 'message': f"Kalibrasi: {cal_progress:.0f}% ({result.calibration_count} sampel)", 'type': 'calibration_info', 'is_calibrated': False, 'dynamic_threshold': state.ear_threshold }, coalesce=True)
+                if result.calibration_avg_ear is not None:
+                    self.telemetry.status_update({ 'message': f"Kalibrasi Selesai! Threshold: {state.ear_threshold:.3f}", 'type': 'calibration_done', 'is_calibrated': True, 'dynamic_threshold': state.ear_threshold }); print(f"[Kalibrasi] [{self.driver_id}] Selesai. Avg Open EAR: {result.calibration_avg_ear:.3f}, Threshold: {state.ear_threshold:.3f}")
+            if result.alarm_event == ALARM_EVENT_ALERT:
+                print(f"[ALARM] [{self.driver_id}] Kantuk! {result.reason}"); self.alarm_fn(self, result.alarm_event, result.reason, frame_time)
+                self.telemetry.alert({ 'message': f"PERINGATAN KANTUK! {result.reason}", 'type': 'alert', 'ear': ear_value_current_frame, 'perclos': perclos_value_current_frame, 'is_calibrated': True })
+            elif result.alarm_event == ALARM_EVENT_NORMAL: print(f"[Deteksi] [{self.driver_id}] {result.reason}, alarm nonaktif."); self.alarm_fn(self, result.alarm_event, result.reason, frame_time); self.telemetry.alert({'message': 'Pengemudi kembali sadar.', 'type': 'normal', 'is_calibrated': True})
+        lap.lap('ear_state'); is_calibrated = state.is_calibrated; ear_threshold = state.ear_threshold; alarm_on = state.alarm_on
+        if is_calibrated: cv2.putText(current_frame_to_process, f"EAR: {ear_value_current_frame:.3f} (T: {ear_threshold:.3f})", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0) if ear_value_current_frame >= ear_threshold else (0, 0, 255), 1);_ = cv2.putText(current_frame_to_process, f"PERCLOS: {perclos_value_current_frame*100:.1f}%", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0) if perclos_value_current_frame < PERCLOS_THRESHOLD else (0, 0, 255), 1) if perclos_value_current_frame != -1 else None ;cv2.putText(current_frame_to_process, "Status: Memantau", (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0) if not alarm_on else (0,165,255), 1)
+        else: cv2.putText(current_frame_to_process, "Status: Kalibrasi...", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 192, 0), 2); _ = cv2.putText(current_frame_to_process, f"EAR: {ear_value_current_frame:.3f}", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 192, 0), 1) if ear_value_current_frame != -1 else None
+        if alarm_on: cv2.putText(current_frame_to_process, "ALARM KANTUK!", (current_frame_to_process.shape[1] // 2 - 100, current_frame_to_process.shape[0] - 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,0,255), 2)
+        lap.lap('overlay'); self.telemetry.update_data({ 'ear': ear_value_current_frame if ear_value_current_frame != -1 else None, 'perclos': perclos_value_current_frame if perclos_value_current_frame != -1 else None, 'is_calibrated': is_calibrated, 'dynamic_threshold': ear_threshold if is_calibrated else None, 'alarm_on': alarm_on, 'blink_rate': state.blink_rate(frame_time), 'blink_duration': state.mean_blink_duration() })
+        lap.lap('emit')
+        # ---- AKHIR LOGIKA DETEKSI KANTUK ----
+        return current_frame_to_process
+
+    def encode_frame(self, frame):
+        # Tahap encode pipeline: frame beranotasi -> bytes JPEG (kualitas/skala sesuai konfigurasi).
+        lap = self.metrics.lap_timer(self.stage_latency)
+        data = self.encoder.encode(frame)
+        lap.lap('imencode')
+        if data is None: print(f"[encode_frame] [{self.driver_id}] Gagal encode frame.")
+        return data
+
+    def _collect_metrics(self):
+        # Nilai yang sudah dihitung di tempat lain (pipeline, telemetri), dibaca saat scrape.
+        pipeline = self.pipeline.stats()
+        labels = {'driver': self.driver_id}
+        yield ('frames_captured_total', 'counter', 'Frame yang dibaca dari kamera', labels, pipeline['stages']['capture']['processed'])
+        yield ('frames_dropped_total', 'counter', 'Frame capture yang ditimpa sebelum sempat dideteksi', labels, pipeline['queues']['capture']['dropped'])
+        for name, viewer in pipeline['hub']['viewers'].items():
+            yield ('viewer_frames_dropped_total', 'counter', 'Frame JPEG yang dilewati viewer lambat', dict(labels, viewer=name), viewer['dropped'])
+        yield ('viewers', 'gauge', 'Jumlah viewer /video_feed aktif', labels, pipeline['hub']['subscribers'])
+        yield ('frames_encode_skipped_total', 'counter', 'Frame yang tidak di-encode JPEG karena tidak ada viewer', labels, pipeline['encode_skipped'])
+        yield ('stage_errors_total', 'counter', 'Exception per tahap pipeline', labels, sum(stage['errors'] for stage in pipeline['stages'].values()))
+        yield ('telemetry_messages_saved_total', 'counter', 'Pesan Socket.IO yang digabung/ditekan', labels, self.telemetry.stats()['messages_saved'])
+        yield ('camera_open', 'gauge', 'Kamera deteksi terbuka (1) atau tidak (0)', labels, int(self.camera_is_open()))
+
+    def stats(self):
+        stats = self.pipeline.stats()
+        stats['source'] = str(self.source)
+        stats['namespace'] = self.namespace
+        stats['camera_open'] = self.camera_is_open()
+        stats['camera'] = dict(self.camera.stats(), calibrations_preserved=self.calibrations_preserved)
+        stats['active_sio_clients'] = self.active_sio_clients
+        stats['face_tracker'] = self.face_tracker.stats() if self.face_tracker is not None else None
+        stats['telemetry'] = self.telemetry.stats()
+        stats['encoder'] = self.encoder.stats()
+        return stats
+
+
+class EngineManager:
+    # Registry engine per driver + worker pool bersama untuk tahap deteksi/encode.
+    # Capture tiap kamera tetap di thread sendiri (I/O bound); `workers` thread deteksi bergiliran
+    # (round-robin) mengambil frame terbaru dari engine mana pun yang sedang tidak diproses. Deteksi dan
+    # encode satu kamera adalah tugas terpisah: worker lain bisa mendeteksi frame berikutnya selagi encode.
+    # Bagian Python per frame (EAR, state, overlay, telemetri) tetap memegang GIL, jadi tambahan worker
+    # tidak otomatis menambah throughput sebanding jumlah core; ukur dengan benchmarks/bench_pipeline.py scale.
+    def __init__(self, workers, sleep_fn=None, idle_sleep=0.005):
+        self.workers = max(1, int(workers))
+        self.sleep_fn = sleep_fn or time.sleep
+        self.idle_sleep = idle_sleep
+        self._engines = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self.running = False
+        self.worker_steps = [0] * self.workers
+
+    def add_engine(self, engine):
+        with self._lock:
+            if engine.driver_id in self._engines:
+                raise ValueError(f"Engine untuk driver '{engine.driver_id}' sudah terdaftar.")
+            self._engines[engine.driver_id] = engine
+        print(f"[EngineManager] Engine '{engine.driver_id}' terdaftar (sumber: {engine.source}, namespace: {engine.namespace}).")
+        return engine
+
+    def get(self, driver_id):
+        with self._lock:
+            return self._engines.get(driver_id)
+
+    def engines(self):
+        with self._lock:
+            return list(self._engines.values())
+
+    def start_engine(self, engine):
+        # Mulai thread capture engine (sekali) dan worker pool (sekali untuk semua engine).
+        if not engine.models_ready():
+            return
+        self._start_workers()
+        engine.pipeline.start()
+
+    def _start_workers(self):
+        with self._lock:
+            if self.running:
+                return
+            self.running = True
+            for index in range(self.workers):
+                self._threads.append(spawn_daemon_thread(lambda index=index: self._worker_loop(index), f"detection-worker-{index}"))
+        print(f"[EngineManager] {self.workers} worker deteksi dimulai.")
+
+    def stop(self):
+        self.running = False
+        for engine in self.engines():
+            engine.pipeline.stop()
+
+    def _worker_loop(self, index):
+        offset = index
+        while self.running:
+            engines = self.engines()
+            did_work = False
+            for step in range(len(engines)):
+                engine = engines[(offset + step) % len(engines)]
+                if not engine.pipeline.started:
+                    continue
+                if engine.pipeline.try_process_latest():
+                    did_work = True
+                    self.worker_steps[index] += 1
+                if engine.pipeline.try_encode_latest():
+                    did_work = True
+            offset += 1
+            if not did_work:
+                self.sleep_fn(self.idle_sleep)
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'worker_steps': list(self.worker_steps),
+            'engines': {engine.driver_id: engine.stats() for engine in self.engines()},
+        }
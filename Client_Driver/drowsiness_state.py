@@ -0,0 +1,149 @@
+# File: Client_Driver/drowsiness_state.py
+# State machine deteksi kantuk (kalibrasi EAR, lama mata tertutup berturut-turut, PERCLOS, alarm)
+# tanpa ketergantungan ke kamera, Flask, maupun Socket.IO. Dipakai oleh DrowsinessEngine (loop deteksi
+# live per kamera) dan oleh replay offline (replay.py) agar keduanya memberi hasil identik.
+import collections
+import time
+
+from rolling_stats import BlinkTracker, CalibrationEstimator, TimeWindowSum
+
+ALARM_COOLDOWN = 5
+
+# Mata tertutup, kalibrasi & PERCLOS memakai WAKTU (detik, dari timestamp frame), bukan jumlah frame,
+# agar latensi alarm & makna jendela tetap sama saat fps berubah. Nilai default setara setelan lama pada 30 fps.
+CLOSED_EYES_SECONDS = 0.65            # Dulu 20 frame berturut-turut (19 interval = 0.63 s)
+CALIBRATION_SECONDS = 2.0             # Dulu 60 frame
+CALIBRATION_MIN_SAMPLES = 15          # Sampel mata terbuka minimum (setelah kedipan ditolak)
+DEFAULT_EAR_THRESHOLD = 0.25
+INITIAL_OPEN_EAR_AVG = 0.30
+CALIBRATION_EAR_RATIO = 0.75          # Threshold = rata-rata EAR mata terbuka x rasio ini
+CALIBRATION_THRESHOLD_RANGE = (0.1, 0.35)
+
+PERCLOS_WINDOW_SECONDS = 3.0          # Dulu 90 frame
+PERCLOS_THRESHOLD = 0.35
+
+BLINK_WINDOW_SECONDS = 60.0
+MAX_BLINK_SECONDS = 0.5
+
+ALARM_EVENT_ALERT = 'alert'
+ALARM_EVENT_NORMAL = 'normal'
+ALARM_EVENT_END = 'end'  # Dikirim engine (bukan state) saat sesi deteksi berakhir: reset/resume/kamera dilepas
+
+# Hasil satu frame. perclos = -1 jika jendela PERCLOS belum penuh (sama dengan konvensi lama).
+# calibration_count (sampel diterima) & calibration_progress (0..1) terisi selama kalibrasi;
+# calibration_avg_ear terisi tepat di frame kalibrasi selesai.
+# alarm_event: None, ALARM_EVENT_ALERT atau ALARM_EVENT_NORMAL; reason menjelaskan alasannya.
+FrameResult = collections.namedtuple('FrameResult', [
+    'ear', 'perclos', 'calibration_count', 'calibration_progress', 'calibration_avg_ear', 'alarm_event', 'reason',
+])
+
+
+class DrowsinessState:
+    # __slots__: banyak engine per host (satu per kamera) -> state ringkas tanpa __dict__.
+    # Semua statistik (PERCLOS, kalibrasi, kedipan) diperbarui inkremental, O(1) per frame.
+    __slots__ = ('closed_eyes_seconds', 'perclos_threshold', 'calibration_seconds', 'calibration_min_samples',
+                 'alarm_cooldown', 'clock', 'is_calibrated', 'calibration', '_calibration_started_at',
+                 'alarm_on', 'last_alarm_time', 'ear_threshold', 'closures', 'blinks')
+
+    def __init__(self, closed_eyes_seconds=CLOSED_EYES_SECONDS, perclos_window_seconds=PERCLOS_WINDOW_SECONDS,
+                 perclos_threshold=PERCLOS_THRESHOLD, calibration_seconds=CALIBRATION_SECONDS,
+                 calibration_min_samples=CALIBRATION_MIN_SAMPLES, alarm_cooldown=ALARM_COOLDOWN,
+                 blink_window_seconds=BLINK_WINDOW_SECONDS, max_blink_seconds=MAX_BLINK_SECONDS, clock=time.time):
+        self.closed_eyes_seconds = closed_eyes_seconds
+        self.perclos_threshold = perclos_threshold
+        self.calibration_seconds = calibration_seconds
+        self.calibration_min_samples = calibration_min_samples
+        self.alarm_cooldown = alarm_cooldown
+        self.clock = clock
+        self.calibration = CalibrationEstimator()
+        self.closures = TimeWindowSum(perclos_window_seconds)
+        self.blinks = BlinkTracker(blink_window_seconds, max_blink_seconds)
+        self.reset()
+
+    def reset(self, now=None):
+        self.is_calibrated = False
+        self.calibration.reset()
+        self._calibration_started_at = None
+        self.alarm_on = False
+        self.closures.clear()
+        self.blinks.clear()
+        self.last_alarm_time = self.clock() if now is None else now
+        self.ear_threshold = DEFAULT_EAR_THRESHOLD
+
+    def resume(self, now=None):
+        # Lanjut setelah jeda kamera singkat (handover WebRTC/HTTP): kalibrasi & threshold dipertahankan,
+        # hanya state antar-frame (mata tertutup berturut-turut, jendela PERCLOS, alarm) yang dibuang.
+        self.alarm_on = False
+        self.closures.clear()
+        self.blinks.clear()
+        self.last_alarm_time = self.clock() if now is None else now
+
+    def update_no_face(self, now=None):
+        # Tanpa wajah: penutupan mata berturut-turut & PERCLOS dimulai ulang; jendela kedipan tetap digeser
+        # agar blink_rate() turun seiring waktu, bukan membeku di nilai terakhir sebelum wajah hilang.
+        self.closures.clear()
+        self.blinks.interrupt(self.clock() if now is None else now)
+        return FrameResult(-1, -1, None, None, None, None, None)
+
+    def perclos(self, now):
+        # Fraksi waktu mata tertutup dalam jendela PERCLOS; -1 jika jendela belum terisi penuh.
+        if not self.closures.is_full(now) or not self.closures.count:
+            return -1
+        return self.closures.sum / self.closures.count
+
+    def blink_rate(self, now=None):
+        return self.blinks.rate_per_minute(self.clock() if now is None else now)
+
+    def mean_blink_duration(self):
+        return self.blinks.mean_duration()
+
+    def update(self, ear, now=None):
+        now = self.clock() if now is None else now
+        if not self.is_calibrated:
+            return self._update_calibration(ear, now)
+
+        alarm_event = None
+        reason = None
+        closed = ear < self.ear_threshold
+        if not closed and self.blinks.is_closed() and self.alarm_on:
+            self.alarm_on = False
+            alarm_event, reason = ALARM_EVENT_NORMAL, "Mata terbuka"
+        self.closures.add(now, 1 if closed else 0)
+        self.blinks.update(now, closed)
+        perclos = self.perclos(now)
+        closed_seconds = self.blinks.closed_seconds(now)
+
+        drowsiness_detected_reason = None
+        if closed and closed_seconds >= self.closed_eyes_seconds:
+            drowsiness_detected_reason = f"EAR < Threshold ({closed_seconds:.1f} s)"
+        elif perclos != -1 and perclos >= self.perclos_threshold:
+            drowsiness_detected_reason = f"PERCLOS tinggi ({perclos*100:.1f}%)"
+
+        if drowsiness_detected_reason and not self.alarm_on and (now - self.last_alarm_time) > self.alarm_cooldown:
+            self.alarm_on = True
+            self.last_alarm_time = now
+            alarm_event, reason = ALARM_EVENT_ALERT, drowsiness_detected_reason
+        elif not drowsiness_detected_reason and self.alarm_on:
+            self.alarm_on = False
+            alarm_event, reason = ALARM_EVENT_NORMAL, "Kondisi normal"
+        return FrameResult(ear, perclos, None, None, None, alarm_event, reason)
+
+    def _update_calibration(self, ear, now):
+        # Rata-rata EAR mata terbuka (Welford, kedipan ditolak) selama calibration_seconds
+        # dan minimal calibration_min_samples sampel diterima.
+        if self._calibration_started_at is None:
+            self._calibration_started_at = now
+        self.calibration.add(ear)
+        count = self.calibration.accepted
+        elapsed = now - self._calibration_started_at
+        progress = min(1.0, elapsed / self.calibration_seconds if self.calibration_seconds else 1.0,
+                       count / self.calibration_min_samples if self.calibration_min_samples else 1.0)
+        avg_open_ear = None
+        if progress >= 1.0:
+            avg_open_ear = self.calibration.mean()
+            if avg_open_ear is None:
+                avg_open_ear = INITIAL_OPEN_EAR_AVG
+            low, high = CALIBRATION_THRESHOLD_RANGE
+            self.ear_threshold = max(low, min(high, avg_open_ear * CALIBRATION_EAR_RATIO))
+            self.is_calibrated = True
+        return FrameResult(ear, -1, count, progress, avg_open_ear, None, None)
@@ -0,0 +1,214 @@
+# File: Client_Driver/event_store.py
+# Penyimpanan riwayat append-only di SQLite (mode WAL) untuk review keselamatan armada:
+#   - events : alarm kantuk (alert/normal), hasil kalibrasi, error kamera -- per driver
+#   - samples: deret EAR/PERCLOS (batch telemetri ~5 Hz, bukan per frame)
+# Loop deteksi hanya memasukkan record ke antrean terbatas (put_nowait, tidak pernah menunggu disk);
+# satu thread writer menulis dalam transaksi batch, menjalankan retensi berkala, dan checkpoint WAL.
+# Query (route Flask) memakai koneksi baca terpisah; indeks (driver_id, ts) membuat rentang waktu murah.
+import contextlib
+import json
+import os
+import pathlib
+import queue
+import sqlite3
+import threading
+import time
+
+from thread_utils import spawn_daemon_thread
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    driver_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    message TEXT,
+    payload TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_driver_kind_ts ON events (driver_id, kind, ts);
+CREATE INDEX IF NOT EXISTS idx_events_ts ON events (ts);
+CREATE TABLE IF NOT EXISTS samples (
+    ts REAL NOT NULL,
+    driver_id TEXT NOT NULL,
+    ear REAL,
+    ear_min REAL,
+    ear_max REAL,
+    perclos REAL,
+    alarm_on INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_samples_driver_ts ON samples (driver_id, ts);
+CREATE INDEX IF NOT EXISTS idx_samples_ts ON samples (ts);
+"""
+
+EVENT_ALARM_ALERT = 'alarm_alert'
+EVENT_ALARM_NORMAL = 'alarm_normal'
+EVENT_CALIBRATION = 'calibration'
+EVENT_ERROR = 'error'
+ALARM_KINDS = (EVENT_ALARM_ALERT, EVENT_ALARM_NORMAL)
+
+_INSERT_EVENT = "INSERT INTO events (ts, driver_id, kind, message, payload) VALUES (?, ?, ?, ?, ?)"
+_INSERT_SAMPLE = "INSERT INTO samples (ts, driver_id, ear, ear_min, ear_max, perclos, alarm_on) VALUES (?, ?, ?, ?, ?, ?, ?)"
+
+
+def _connect(path):
+    connection = sqlite3.connect(path, timeout=5.0)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")  # Aman dengan WAL; fsync hanya saat checkpoint
+    return connection
+
+
+class EventStore:
+    def __init__(self, path, batch_size=500, flush_interval=1.0, retention_days=30.0, max_queue=20000,
+                 retention_interval=3600.0, spawn_fn=None, clock=time.time):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retention_seconds = retention_days * 86400.0 if retention_days else None
+        self.retention_interval = retention_interval
+        self.spawn_fn = spawn_fn or spawn_daemon_thread
+        self.clock = clock
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._writer = None
+        self._lock = threading.Lock()
+        self.running = False
+        self.written_count = 0
+        self.dropped_count = 0
+        self.batch_count = 0
+        self.deleted_count = 0
+        self.last_flush_ms = 0.0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with contextlib.closing(_connect(path)) as connection:
+            connection.executescript(SCHEMA)
+        # URI baca-saja; as_uri() meng-escape karakter seperti '?', '#', '%' di path.
+        self._read_uri = pathlib.Path(os.path.abspath(path)).as_uri() + '?mode=ro'
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return False
+            self.running = True
+            self._writer = self.spawn_fn(self._writer_loop, 'event-store-writer')
+        print(f"[EventStore] Writer dimulai ({self.path}).")
+        return True
+
+    def stop(self, timeout=5.0):
+        self.running = False
+        if isinstance(self._writer, threading.Thread):
+            self._writer.join(timeout)
+
+    # ---- Dipanggil dari loop deteksi: tidak pernah blocking ----
+    def _enqueue(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped_count += 1
+
+    def record_event(self, driver_id, kind, message=None, payload=None, ts=None):
+        self._enqueue((_INSERT_EVENT, (self.clock() if ts is None else ts, driver_id, kind, message,
+                                       json.dumps(payload) if payload is not None else None)))
+
+    def record_sample(self, driver_id, ear, perclos, ear_min=None, ear_max=None, alarm_on=False, ts=None):
+        self._enqueue((_INSERT_SAMPLE, (self.clock() if ts is None else ts, driver_id, ear, ear_min, ear_max,
+                                        perclos, int(bool(alarm_on)))))
+
+    # ---- Thread writer ----
+    def _writer_loop(self):
+        connection = _connect(self.path)
+        next_retention = 0.0
+        try:
+            while self.running or not self._queue.empty():
+                batch = self._collect_batch()
+                if batch:
+                    self._write_batch(connection, batch)
+                if self.retention_seconds and time.monotonic() >= next_retention:
+                    self._apply_retention(connection)
+                    next_retention = time.monotonic() + self.retention_interval
+        finally:
+            connection.close()
+
+    def _collect_batch(self):
+        # Kumpulkan sampai batch_size record atau flush_interval detik, mana yang lebih dulu.
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write_batch(self, connection, batch):
+        start = time.perf_counter()
+        grouped = {}
+        for statement, params in batch:
+            grouped.setdefault(statement, []).append(params)
+        try:
+            with connection:  # Satu transaksi per batch
+                for statement, rows in grouped.items():
+                    connection.executemany(statement, rows)
+        except sqlite3.Error as e:
+            self.dropped_count += len(batch)
+            print(f"[EventStore] Gagal menulis batch ({len(batch)} record): {e}")
+            return
+        self.written_count += len(batch)
+        self.batch_count += 1
+        self.last_flush_ms = (time.perf_counter() - start) * 1000.0
+
+    def _apply_retention(self, connection):
+        cutoff = self.clock() - self.retention_seconds
+        try:
+            with connection:
+                deleted = connection.execute("DELETE FROM events WHERE ts < ?", (cutoff,)).rowcount
+                deleted += connection.execute("DELETE FROM samples WHERE ts < ?", (cutoff,)).rowcount
+            connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except sqlite3.Error as e:
+            print(f"[EventStore] Retensi gagal: {e}")
+            return
+        if deleted:
+            self.deleted_count += deleted
+            print(f"[EventStore] Retensi: {deleted} record lebih tua dari {self.retention_seconds / 86400.0:.0f} hari dihapus.")
+
+    # ---- Query (thread Flask) ----
+    def _query(self, sql, params):
+        connection = sqlite3.connect(self._read_uri, uri=True, timeout=5.0)
+        try:
+            connection.row_factory = sqlite3.Row
+            return [dict(row) for row in connection.execute(sql, params)]
+        finally:
+            connection.close()
+
+    def alarm_history(self, driver_id, start, end, limit=500):
+        rows = self._query(
+            "SELECT ts, kind, message, payload FROM events WHERE driver_id = ? AND kind IN (?, ?) AND ts >= ? AND ts < ? "
+            "ORDER BY ts DESC LIMIT ?", (driver_id, *ALARM_KINDS, start, end, limit))
+        for row in rows:
+            row['payload'] = json.loads(row['payload']) if row['payload'] else None
+        return rows
+
+    def ear_series(self, driver_id, start, end, bucket_seconds=None, max_points=500):
+        # Downsample di SQL: rata-rata/min/max per bucket waktu. Bucket otomatis agar <= max_points titik.
+        if not bucket_seconds:
+            bucket_seconds = max(1.0, (end - start) / max(1, max_points))
+        rows = self._query(
+            "SELECT CAST((ts - ?) / ? AS INTEGER) AS bucket, AVG(ear) AS ear, MIN(COALESCE(ear_min, ear)) AS ear_min, "
+            "MAX(COALESCE(ear_max, ear)) AS ear_max, AVG(perclos) AS perclos, MAX(alarm_on) AS alarm_on, COUNT(*) AS samples "
+            "FROM samples WHERE driver_id = ? AND ts >= ? AND ts < ? GROUP BY bucket ORDER BY bucket",
+            (start, bucket_seconds, driver_id, start, end))
+        for row in rows:
+            row['ts'] = start + row.pop('bucket') * bucket_seconds
+        return {'bucket_seconds': bucket_seconds, 'points': rows}
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'queued': self._queue.qsize(),
+            'written': self.written_count,
+            'dropped': self.dropped_count,
+            'batches': self.batch_count,
+            'deleted_by_retention': self.deleted_count,
+            'last_flush_ms': round(self.last_flush_ms, 3),
+        }
@@ -0,0 +1,150 @@
+# File: Client_Driver/face_tracker.py
+# Mode track-then-detect: detector HOG Dlib (mahal) hanya dijalankan pada keyframe,
+# frame di antaranya memakai posisi wajah hasil tracking agar CPU per frame turun.
+# Deteksi/tracking bisa dijalankan pada citra yang diperkecil (`detection_scale`); kotak wajah
+# dipetakan kembali ke koordinat resolusi penuh sehingga predictor landmark tetap memakai frame asli.
+# dlib diimpor di dalam fungsi: mengimpor modul ini (lewat drowsiness_engine) tidak ikut memuat dlib,
+# yang baru diimpor oleh model_registry di thread latar (langkah 'import_dlib').
+import threading
+
+import cv2
+import numpy as np
+
+TRACKING_MODES = ('off', 'correlation', 'roi')
+
+# Detector HOG dari ModelRegistry dipakai bersama oleh semua engine; object_detector Dlib tidak aman
+# dipanggil paralel (segfault saat dua worker EngineManager mendeteksi bersamaan), jadi panggilannya diserialkan.
+DETECTOR_LOCK = threading.Lock()
+
+
+class FaceTracker:
+    # mode 'off'         : detector full-frame di setiap frame (perilaku lama, default).
+    # mode 'correlation' : dlib.correlation_tracker di antara keyframe; deteksi ulang jika
+    #                      confidence (PSR) tracker turun di bawah `min_confidence`.
+    # mode 'roi'         : detector hanya di area sekitar wajah sebelumnya (dipad `roi_padding`),
+    #                      fallback ke full-frame jika wajah tidak ditemukan di ROI.
+    # detection_scale  : faktor skala citra untuk detector & correlation tracker (1.0 = resolusi penuh,
+    #                    0.5 = satu level pyrDown). Wajah < 80/scale px tidak lagi terdeteksi HOG.
+    def __init__(self, detector, mode='off', keyframe_interval=10, min_confidence=7.0, roi_padding=0.5,
+                 detection_scale=1.0):
+        if mode not in TRACKING_MODES:
+            raise ValueError(f"Mode tracking tidak dikenal: {mode} (pilihan: {', '.join(TRACKING_MODES)})")
+        if not 0.0 < detection_scale <= 1.0:
+            raise ValueError(f"detection_scale harus di antara 0 dan 1, bukan {detection_scale}")
+        self.detector = detector
+        self.mode = mode
+        self.keyframe_interval = max(1, int(keyframe_interval))
+        self.min_confidence = min_confidence
+        self.roi_padding = roi_padding
+        self.detection_scale = detection_scale
+        self._tracker = None
+        self._last_face = None
+        self._frames_since_keyframe = 0
+        self._reset_requested = False
+        self.detector_frames = 0
+        self.tracker_frames = 0
+        self.roi_frames = 0
+        self.low_confidence_redetects = 0
+
+    def reset(self):
+        # Boleh dipanggil dari thread lain (reset/handover kamera): hanya menandai; state tracker
+        # dibersihkan oleh thread deteksi sendiri di awal locate() berikutnya, sehingga _track()
+        # tidak pernah melihat _tracker yang di-None-kan di tengah jalan.
+        self._reset_requested = True
+
+    def _clear(self):
+        self._tracker = None
+        self._last_face = None
+        self._frames_since_keyframe = 0
+
+    def locate(self, gray):
+        # Kembalikan dlib.rectangle wajah pertama pada frame grayscale, atau None.
+        if self._reset_requested:
+            self._reset_requested = False
+            self._clear()
+        if self.mode != 'off' and self._last_face is not None and self._frames_since_keyframe < self.keyframe_interval:
+            face = self._track(gray)
+            if face is not None:
+                self._frames_since_keyframe += 1
+                self._last_face = face
+                return face
+        return self._detect_full(gray)
+
+    def _to_detection_space(self, gray):
+        if self.detection_scale == 1.0:
+            return gray
+        return cv2.resize(gray, None, fx=self.detection_scale, fy=self.detection_scale, interpolation=cv2.INTER_AREA)
+
+    def _detect_full(self, gray):
+        self.detector_frames += 1
+        self._frames_since_keyframe = 0
+        small = self._to_detection_space(gray)
+        with DETECTOR_LOCK:
+            faces = self.detector(small)
+        if not faces:
+            self._clear()
+            return None
+        face = self._clip(faces[0], gray.shape, 1.0 / self.detection_scale)
+        self._last_face = face
+        if self.mode == 'correlation':
+            import dlib
+            self._tracker = dlib.correlation_tracker()
+            self._tracker.start_track(small, faces[0])
+        return face
+
+    def _track(self, gray):
+        if self.mode == 'correlation':
+            confidence = self._tracker.update(self._to_detection_space(gray))
+            if confidence < self.min_confidence:
+                self.low_confidence_redetects += 1
+                return None
+            self.tracker_frames += 1
+            return self._clip(self._tracker.get_position(), gray.shape, 1.0 / self.detection_scale)
+        return self._detect_in_roi(gray)
+
+    def _detect_in_roi(self, gray):
+        last = self._last_face
+        pad_x = int(last.width() * self.roi_padding)
+        pad_y = int(last.height() * self.roi_padding)
+        height, width = gray.shape[:2]
+        x0, y0 = max(0, last.left() - pad_x), max(0, last.top() - pad_y)
+        x1, y1 = min(width, last.right() + pad_x), min(height, last.bottom() + pad_y)
+        # ROI diperkecil dengan detection_scale yang sama seperti deteksi full-frame, lalu kotak dipetakan balik.
+        roi = self._to_detection_space(np.ascontiguousarray(gray[y0:y1, x0:x1]))
+        if roi.shape[0] < 80 or roi.shape[1] < 80:
+            return None  # ROI terlalu kecil untuk detector HOG (jendela minimum 80x80)
+        with DETECTOR_LOCK:
+            faces = self.detector(roi)
+        if not faces:
+            self.low_confidence_redetects += 1
+            return None
+        self.roi_frames += 1
+        face = faces[0]
+        inverse = 1.0 / self.detection_scale
+        import dlib
+        return dlib.rectangle(int(round(face.left() * inverse)) + x0, int(round(face.top() * inverse)) + y0,
+                              int(round(face.right() * inverse)) + x0, int(round(face.bottom() * inverse)) + y0)
+
+    @staticmethod
+    def _clip(position, shape, scale=1.0):
+        # Petakan kotak (dlib.rectangle/drectangle) ke koordinat resolusi penuh dan batasi ke ukuran frame.
+        height, width = shape[:2]
+        left = min(max(0, int(round(position.left() * scale))), width - 1)
+        top = min(max(0, int(round(position.top() * scale))), height - 1)
+        right = min(max(left + 1, int(round(position.right() * scale))), width - 1)
+        bottom = min(max(top + 1, int(round(position.bottom() * scale))), height - 1)
+        import dlib
+        return dlib.rectangle(left, top, right, bottom)
+
+    def stats(self):
+        total = self.detector_frames + self.tracker_frames + self.roi_frames
+        return {
+            'mode': self.mode,
+            'keyframe_interval': self.keyframe_interval,
+            'detection_scale': self.detection_scale,
+            'detector_frames': self.detector_frames,
+            'tracker_frames': self.tracker_frames,
+            'roi_frames': self.roi_frames,
+            'low_confidence_redetects': self.low_confidence_redetects,
+            'detector_ratio': round(self.detector_frames / total, 4) if total else 0.0,
+        }
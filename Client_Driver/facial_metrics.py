@@ -0,0 +1,58 @@
+# File: Client_Driver/facial_metrics.py
+# Metrik wajah tervektorisasi (NumPy) dari 68 landmark Dlib: EAR kedua mata sekaligus, MAR,
+# dan titik untuk estimasi pose kepala. Semua fungsi menerima array (68, 2) untuk satu frame
+# atau (N, 68, 2) untuk batch (mis. scoring offline sesi rekaman).
+import numpy as np
+
+NUM_LANDMARKS = 68
+RIGHT_EYE = slice(36, 42)   # Mata kanan pengemudi (sisi kiri gambar)
+LEFT_EYE = slice(42, 48)
+INNER_MOUTH = slice(60, 68)
+# Ujung hidung, dagu, sudut luar mata kiri/kanan, sudut mulut kiri/kanan (urutan umum cv2.solvePnP).
+HEAD_POSE_IDX = [30, 8, 36, 45, 48, 54]
+
+# Indeks global pasangan titik untuk EAR: per mata (kiri, lalu kanan) dua jarak vertikal + satu
+# horizontal. Diambil sekaligus dengan satu `take` agar overhead NumPy per frame tetap kecil.
+_EAR_PAIRS = np.array([43, 44, 42, 37, 38, 36,    # titik awal: p2, p3, p1 mata kiri / kanan
+                       47, 46, 45, 41, 40, 39])   # titik akhir: p6, p5, p4 mata kiri / kanan
+
+
+def shape_to_np(shape, dtype=np.float64):
+    # Konversi full_object_detection Dlib -> array (68, 2) sekali jalan.
+    parts = shape.parts()
+    return np.array([[p.x for p in parts], [p.y for p in parts]], dtype=dtype).T
+
+
+def eye_aspect_ratios(points, fallback=0.0):
+    # Kembalikan array (..., 2) berisi [EAR mata kiri, EAR mata kanan].
+    # Mata dengan jarak horizontal 0 (landmark degenerate) diberi nilai `fallback`.
+    pairs = np.asarray(points, dtype=np.float64).take(_EAR_PAIRS, axis=-2)
+    delta = pairs[..., :6, :] - pairs[..., 6:, :]
+    dist = np.sqrt(np.einsum('...ij,...ij->...i', delta, delta)).reshape(delta.shape[:-2] + (2, 3))
+    horizontal = dist[..., 2]
+    if horizontal.all():
+        return (dist[..., 0] + dist[..., 1]) / (2.0 * horizontal)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ears = (dist[..., 0] + dist[..., 1]) / (2.0 * horizontal)
+    return np.where(horizontal == 0, fallback, ears)
+
+
+def mean_ear(points, fallback=0.0):
+    # EAR rata-rata kedua mata: skalar untuk (68, 2), array (N,) untuk (N, 68, 2).
+    return eye_aspect_ratios(points, fallback).mean(axis=-1)
+
+
+def mouth_aspect_ratio(points, fallback=0.0):
+    # MAR dari 8 titik bibir dalam (60-67): jumlah 3 bukaan vertikal / (2 x lebar mulut).
+    points = np.asarray(points, dtype=np.float64)
+    mouth = points[..., INNER_MOUTH, :]
+    vertical = np.linalg.norm(mouth[..., [1, 2, 3], :] - mouth[..., [7, 6, 5], :], axis=-1).sum(axis=-1)
+    horizontal = np.linalg.norm(mouth[..., 0, :] - mouth[..., 4, :], axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mar = vertical / (2.0 * horizontal)
+    return np.where(horizontal == 0, fallback, mar)
+
+
+def head_pose_image_points(points):
+    # Titik 2D (..., 6, 2) untuk cv2.solvePnP terhadap model wajah 3D generik.
+    return np.asarray(points, dtype=np.float64)[..., HEAD_POSE_IDX, :]
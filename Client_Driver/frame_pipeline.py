@@ -0,0 +1,299 @@
+# File: Client_Driver/frame_pipeline.py
+# Pipeline frame bertingkat: capture -> deteksi -> encode MJPEG -> FrameHub (fan-out ke viewer).
+# Tiap tahap berjalan di thread sendiri dan hanya bertukar frame TERBARU lewat
+# LatestFrameBuffer, sehingga tahap yang lambat (mis. viewer /video_feed yang lambat)
+# tidak pernah menahan tahap sebelumnya. Frame lama yang belum sempat diambil dibuang.
+import threading
+import time
+import traceback
+
+from thread_utils import spawn_daemon_thread
+
+
+class LatestFrameBuffer:
+    # Buffer satu-slot (bounded, kapasitas 1). put() selalu menimpa isi lama;
+    # jika isi lama belum diambil consumer, dihitung sebagai frame yang di-drop.
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._item = None
+        self._seq = 0
+        self._consumed_seq = 0
+        self.put_count = 0
+        self.drop_count = 0
+
+    def put(self, item):
+        with self._lock:
+            if self._seq > self._consumed_seq:
+                self.drop_count += 1
+            self._item = item
+            self._seq += 1
+            self.put_count += 1
+            return self._seq
+
+    def get_newer(self, last_seq):
+        # Kembalikan (seq, item) jika ada frame yang lebih baru dari last_seq, selain itu (last_seq, None).
+        with self._lock:
+            if self._seq <= last_seq:
+                return last_seq, None
+            self._consumed_seq = self._seq
+            return self._seq, self._item
+
+    def clear(self):
+        with self._lock:
+            self._item = None
+            self._consumed_seq = self._seq
+
+    def stats(self):
+        with self._lock:
+            return {
+                'depth': 1 if self._seq > self._consumed_seq else 0,
+                'put': self.put_count,
+                'dropped': self.drop_count,
+            }
+
+
+class FrameHub:
+    # Publish/subscribe untuk JPEG hasil encode. Satu loop deteksi mem-publish ke N viewer;
+    # tiap viewer punya mailbox LatestFrameBuffer sendiri, jadi viewer lambat hanya melewatkan
+    # frame miliknya tanpa mempengaruhi viewer lain maupun loop deteksi.
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self._pacers = {}
+        self._last_item = None
+        self._next_subscriber_id = 1
+        self.publish_count = 0
+        self.delivered_count = 0
+
+    def put(self, item):
+        # Alias publish() agar FrameHub bisa langsung dipakai sebagai sink PipelineStage.
+        return self.publish(item)
+
+    def publish(self, item):
+        with self._lock:
+            self._last_item = item
+            self.publish_count += 1
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.put(item)
+        self.delivered_count += len(subscribers)
+        return len(subscribers)
+
+    def subscribe(self, pacer=None):
+        # pacer (opsional): objek dengan stats() -- dilaporkan bersama statistik mailbox viewer.
+        with self._lock:
+            subscriber = LatestFrameBuffer(f"{self.name}-viewer-{self._next_subscriber_id}")
+            self._next_subscriber_id += 1
+            if self._last_item is not None:
+                subscriber.put(self._last_item)  # Viewer baru langsung dapat frame terakhir
+            self._subscribers.append(subscriber)
+            if pacer is not None:
+                self._pacers[subscriber.name] = pacer
+            count = len(self._subscribers)
+        print(f"[FrameHub] Viewer '{subscriber.name}' berlangganan. Total viewer: {count}")
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+            self._pacers.pop(subscriber.name, None)
+            count = len(self._subscribers)
+            if not count:
+                self._last_item = None  # Encode berhenti tanpa viewer; jangan kirim frame basi ke viewer berikutnya
+        print(f"[FrameHub] Viewer '{subscriber.name}' berhenti berlangganan. Total viewer: {count}")
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def clear(self):
+        with self._lock:
+            self._last_item = None
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.clear()
+
+    def stats(self):
+        with self._lock:
+            subscribers = list(self._subscribers)
+            pacers = dict(self._pacers)
+            stats = {
+                'published': self.publish_count,
+                'delivered': self.delivered_count,
+                'subscribers': len(subscribers),
+            }
+        stats['viewers'] = {subscriber.name: subscriber.stats() for subscriber in subscribers}
+        for name, pacer in pacers.items():
+            if name in stats['viewers']:
+                stats['viewers'][name]['pacing'] = pacer.stats()
+        return stats
+
+
+class PipelineStage:
+    # Satu tahap pipeline: ambil item terbaru dari `source` (atau panggil work_fn tanpa input
+    # jika source None, untuk tahap capture), proses, lalu taruh hasilnya ke `sink`.
+    def __init__(self, name, work_fn, source, sink, sleep_fn, idle_sleep=0.005):
+        self.name = name
+        self.work_fn = work_fn
+        self.source = source
+        self.sink = sink
+        self.sleep_fn = sleep_fn
+        self.idle_sleep = idle_sleep
+        self.running = False
+        self.processed_count = 0
+        self.empty_count = 0
+        self.error_count = 0
+        self.total_work_time = 0.0
+        self.last_work_time = 0.0
+
+    def process(self, item=None):
+        # Jalankan work_fn satu kali dengan pencatatan waktu/error. Hasil None = tidak ada output.
+        try:
+            start = time.perf_counter()
+            result = self.work_fn(item) if self.source is not None else self.work_fn()
+            elapsed = time.perf_counter() - start
+        except Exception as e:
+            self.error_count += 1
+            print(f"[Pipeline] Exception di tahap '{self.name}': {e}")
+            traceback.print_exc()
+            return None
+        if result is None:
+            # Tahap capture mengembalikan None saat kamera tidak tersedia.
+            self.empty_count += 1
+            return None
+        self.processed_count += 1
+        self.total_work_time += elapsed
+        self.last_work_time = elapsed
+        self.sink.put(result)
+        return result
+
+    def run(self):
+        last_seq = 0
+        item = None
+        print(f"[Pipeline] Tahap '{self.name}' dimulai.")
+        while self.running:
+            if self.source is not None:
+                last_seq, item = self.source.get_newer(last_seq)
+                if item is None:
+                    self.sleep_fn(self.idle_sleep)
+                    continue
+            if self.process(item) is None:
+                self.sleep_fn(self.idle_sleep)
+                continue
+            self.sleep_fn(0)  # Beri kesempatan thread/greenlet lain berjalan
+        print(f"[Pipeline] Tahap '{self.name}' berhenti. Total diproses: {self.processed_count}.")
+
+    def stats(self):
+        avg_ms = (self.total_work_time / self.processed_count * 1000.0) if self.processed_count else 0.0
+        return {
+            'processed': self.processed_count,
+            'empty': self.empty_count,
+            'errors': self.error_count,
+            'avg_ms': round(avg_ms, 3),
+            'last_ms': round(self.last_work_time * 1000.0, 3),
+        }
+
+
+class FramePipeline:
+    # capture_fn() -> frame BGR atau None; detect_fn(frame) -> frame beranotasi;
+    # encode_fn(frame) -> bytes JPEG atau None. Ketiganya berjalan di thread terpisah,
+    # satu pipeline per kamera; hasil encode di-broadcast lewat `frame_hub`. Tanpa viewer /video_feed
+    # (frame_hub tanpa subscriber) tahap encode dilewati: deteksi tetap jalan, imencode tidak.
+    # detect_lock dipegang selama detect_fn berjalan (mode thread maupun pooled): pemilik pipeline
+    # memegangnya untuk mengubah state deteksi dari thread lain tanpa bertabrakan dengan frame yang sedang diproses.
+    # pooled=True: hanya thread capture yang dibuat; deteksi (try_process_latest) dan encode
+    # (try_encode_latest) dijalankan worker pool eksternal (EngineManager) sebagai tugas terpisah dengan
+    # lock masing-masing, sehingga imencode frame N tidak menunda deteksi frame N+1 kamera yang sama.
+    def __init__(self, capture_fn, detect_fn, encode_fn, spawn_fn=None, sleep_fn=None, idle_sleep=0.005, pooled=False):
+        self.spawn_fn = spawn_fn or spawn_daemon_thread
+        self.pooled = pooled
+        sleep_fn = sleep_fn or time.sleep
+        self.raw_buffer = LatestFrameBuffer('capture')
+        self.detected_buffer = LatestFrameBuffer('detection')
+        self.frame_hub = FrameHub('encode')
+        self.stages = [
+            PipelineStage('capture', capture_fn, None, self.raw_buffer, sleep_fn, idle_sleep),
+            PipelineStage('detection', self._detect, self.raw_buffer, self.detected_buffer, sleep_fn, idle_sleep),
+            PipelineStage('encode', self._encode_if_watched, self.detected_buffer, self.frame_hub, sleep_fn, idle_sleep),
+        ]
+        self.detect_fn = detect_fn
+        self.encode_fn = encode_fn
+        self.detect_lock = threading.Lock()
+        self.encode_skipped = 0
+        self._lock = threading.Lock()
+        self._step_lock = threading.Lock()
+        self._step_seq = 0
+        self._encode_lock = threading.Lock()
+        self._encode_seq = 0
+        self.started = False
+
+    def start(self):
+        with self._lock:
+            if self.started:
+                return False
+            for stage in (self.stages[:1] if self.pooled else self.stages):
+                stage.running = True
+                self.spawn_fn(stage.run, f"pipeline-{stage.name}")
+            self.started = True
+        print(f"[Pipeline] Pipeline frame (capture -> deteksi -> encode{', pooled' if self.pooled else ''}) dimulai.")
+        return True
+
+    def _detect(self, frame):
+        with self.detect_lock:
+            return self.detect_fn(frame)
+
+    def _encode_if_watched(self, frame):
+        if self.frame_hub.subscriber_count() == 0:
+            self.encode_skipped += 1
+            return None
+        return self.encode_fn(frame)
+
+    def try_process_latest(self):
+        # Mode pooled: deteksi frame mentah terbaru jika ada dan tidak sedang diproses worker lain.
+        # State deteksi per kamera tetap maju berurutan, satu frame sekali; hasil ke detected_buffer.
+        if not self._step_lock.acquire(blocking=False):
+            return False
+        try:
+            self._step_seq, frame = self.raw_buffer.get_newer(self._step_seq)
+            if frame is None:
+                return False
+            self.stages[1].process(frame)
+            return True
+        finally:
+            self._step_lock.release()
+
+    def try_encode_latest(self):
+        # Mode pooled: encode frame terdeteksi terbaru (frame lama yang tertimpa dihitung drop).
+        if not self._encode_lock.acquire(blocking=False):
+            return False
+        try:
+            self._encode_seq, frame = self.detected_buffer.get_newer(self._encode_seq)
+            if frame is None:
+                return False
+            self.stages[2].process(frame)
+            return True
+        finally:
+            self._encode_lock.release()
+
+    def stop(self):
+        with self._lock:
+            for stage in self.stages:
+                stage.running = False
+            self.started = False
+
+    def flush(self):
+        # Buang frame yang masih tertahan, mis. setelah kamera dilepas agar frame basi tidak dikirim.
+        for buffer in (self.raw_buffer, self.detected_buffer, self.frame_hub):
+            buffer.clear()
+
+    def stats(self):
+        return {
+            'running': self.started,
+            'stages': {stage.name: stage.stats() for stage in self.stages},
+            'queues': {buffer.name: buffer.stats() for buffer in (self.raw_buffer, self.detected_buffer)},
+            'hub': self.frame_hub.stats(),
+            'encode_skipped': self.encode_skipped,
+        }
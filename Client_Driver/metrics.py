@@ -0,0 +1,214 @@
+# File: Client_Driver/metrics.py
+# Instrumentasi ringan untuk hot path deteksi: histogram latensi per tahap (bucket tetap,
+# estimasi p50/p95/p99), counter, dan collector (nilai yang dibaca saat scrape, mis. jumlah drop
+# dari statistik pipeline). Diekspor dalam format teks Prometheus lewat route /metrics dan bisa
+# di-dump berkala ke log. MetricsRegistry(enabled=False) mengembalikan objek no-op bersama,
+# sehingga biaya di hot path saat dinonaktifkan hanya satu panggilan fungsi kosong.
+import bisect
+import threading
+import time
+
+from thread_utils import spawn_daemon_thread
+
+# Batas bucket (detik), kelipatan ~1.5 dari 50 us sampai ~13 s.
+DEFAULT_BUCKETS = tuple(round(0.00005 * 1.5 ** i, 7) for i in range(32))
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, labels):
+        self.labels = labels
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    def __init__(self, labels, buckets=DEFAULT_BUCKETS):
+        self.labels = labels
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Bucket terakhir = +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q):
+        # Estimasi kuantil dengan interpolasi linear di dalam bucket (seperti histogram_quantile).
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+        if not total:
+            return None
+        rank = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def snapshot(self):
+        with self._lock:
+            counts = list(self.counts)
+            total, value_sum = self.count, self.sum
+        return counts, total, value_sum
+
+
+class LapTimer:
+    # Ukur tahap berurutan dalam satu frame: lap('detector') mencatat waktu sejak lap sebelumnya.
+    __slots__ = ('histograms', '_last')
+
+    def __init__(self, histograms):
+        self.histograms = histograms
+        self._last = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.histograms[stage].observe(now - self._last)
+        self._last = now
+
+
+class _NullMetric:
+    # Pengganti no-op untuk Counter/Histogram/LapTimer saat metrics dinonaktifkan.
+    def inc(self, amount=1):
+        pass
+
+    def observe(self, value):
+        pass
+
+    def lap(self, stage):
+        pass
+
+
+NULL_METRIC = _NullMetric()
+
+
+class MetricsRegistry:
+    def __init__(self, enabled=True, prefix='drowsiness_'):
+        self.enabled = enabled
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._families = {}  # name -> (type, help, {labels: metric})
+        self._collectors = []
+
+    def _get(self, kind, name, help_text, labels, factory):
+        if not self.enabled:
+            return NULL_METRIC
+        labels = tuple(sorted(labels.items()))
+        with self._lock:
+            family = self._families.setdefault(self.prefix + name, (kind, help_text, {}))
+            metric = family[2].get(labels)
+            if metric is None:
+                metric = family[2][labels] = factory(labels)
+            return metric
+
+    def counter(self, name, help_text, **labels):
+        return self._get('counter', name, help_text, labels, Counter)
+
+    def histogram(self, name, help_text, **labels):
+        return self._get('histogram', name, help_text, labels, Histogram)
+
+    def lap_timer(self, histograms):
+        # histograms: dict stage -> Histogram (dibuat sekali, mis. di __init__ engine).
+        return LapTimer(histograms) if self.enabled else NULL_METRIC
+
+    def add_collector(self, collect_fn):
+        # collect_fn() -> iterable (name, type, help, labels dict, value), dipanggil saat scrape/dump.
+        if self.enabled:
+            self._collectors.append(collect_fn)
+
+    def _collected(self):
+        families = {}
+        for collect_fn in list(self._collectors):
+            for name, kind, help_text, labels, value in collect_fn():
+                family = families.setdefault(self.prefix + name, (kind, help_text, []))
+                family[2].append((tuple(sorted(labels.items())), value))
+        return families
+
+    def render_prometheus(self):
+        if not self.enabled:
+            return '# Metrics dinonaktifkan (METRICS_ENABLED=0)\n'
+        lines = []
+        with self._lock:
+            families = {name: (kind, help_text, dict(metrics)) for name, (kind, help_text, metrics) in self._families.items()}
+        for name, (kind, help_text, metrics) in sorted(families.items()):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, metric in sorted(metrics.items()):
+                if kind == 'counter':
+                    lines.append(f'{name}{_format_labels(labels)} {metric.value}')
+                    continue
+                counts, total, value_sum = metric.snapshot()
+                cumulative = 0
+                for bound, count in zip(metric.buckets + ('+Inf',), counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_format_labels(labels + (("le", bound),))} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {value_sum!r}')
+                lines.append(f'{name}_count{_format_labels(labels)} {total}')
+            if kind == 'histogram':
+                # Estimasi kuantil sisi server, agar p50/p95/p99 terbaca tanpa PromQL.
+                lines.append(f'# TYPE {name}_quantile gauge')
+                for labels, metric in sorted(metrics.items()):
+                    for q in QUANTILES:
+                        value = metric.quantile(q)
+                        if value is not None:
+                            lines.append(f'{name}_quantile{_format_labels(labels + (("quantile", q),))} {value!r}')
+        for name, (kind, help_text, samples) in sorted(self._collected().items()):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in samples:
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        # Ringkasan ringkas untuk log: p50/p95/p99 (ms) per histogram, nilai counter & collector.
+        summary = {}
+        with self._lock:
+            families = {name: (kind, dict(metrics)) for name, (kind, _, metrics) in self._families.items()}
+        for name, (kind, metrics) in families.items():
+            for labels, metric in metrics.items():
+                key = name + _format_labels(labels)
+                if kind == 'counter':
+                    summary[key] = metric.value
+                elif metric.count:
+                    summary[key] = {f'p{int(q * 100)}_ms': round(metric.quantile(q) * 1000.0, 3) for q in QUANTILES}
+                    summary[key]['count'] = metric.count
+        for name, (_, _, samples) in self._collected().items():
+            for labels, value in samples:
+                summary[name + _format_labels(labels)] = value
+        return summary
+
+    def start_log_dump(self, interval, log_fn=print, spawn_fn=None, sleep_fn=time.sleep):
+        # Dump snapshot() berkala ke log (interval detik). Tidak melakukan apa-apa jika dinonaktifkan.
+        if not self.enabled or not interval:
+            return None
+
+        def dump_loop():
+            while True:
+                sleep_fn(interval)
+                log_fn(f"[Metrics] {self.snapshot()}")
+
+        return (spawn_fn or spawn_daemon_thread)(dump_loop, 'metrics-log-dump')
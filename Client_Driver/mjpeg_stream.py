@@ -0,0 +1,149 @@
+# File: Client_Driver/mjpeg_stream.py
+# Bagian encode & kirim stream MJPEG /video_feed:
+#   - placeholder_jpeg(): frame placeholder statis (WebRTC aktif, panggilan HTTP, kamera sedang
+#     dibuka/mati, model Dlib gagal) di-render & di-encode SEKALI lalu di-cache sebagai bytes JPEG.
+#   - JpegEncoder: encode frame live dengan kualitas JPEG & skala output yang bisa diatur,
+#     mencatat waktu encode dan bytes/detik.
+#   - ViewerPacer: batas fps/bitrate per viewer. Selama viewer belum boleh dikirimi frame,
+#     frame baru menimpa mailbox-nya (LatestFrameBuffer) sehingga frame lama otomatis di-drop.
+import functools
+import threading
+import time
+
+import cv2
+import numpy as np
+
+MJPEG_PART_HEADER = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+PLACEHOLDER_SIZE = (480, 640)
+PLACEHOLDER_JPEG_QUALITY = 70
+
+# key -> daftar (teks, posisi, skala font, warna BGR, ketebalan)
+PLACEHOLDERS = {
+    'models_loading': [("Memuat model deteksi...", (50, 240), 0.7, (255, 192, 0), 2)],
+    'model_error': [("ERROR: Model Dlib Gagal Dimuat!", (50, 240), 0.7, (0, 0, 255), 2)],
+    'webrtc': [("KAMERA DIGUNAKAN UNTUK PANGGILAN (WebRTC)", (10, 240), 0.6, (200, 200, 200), 2)],
+    'http_call': [("DETEKSI DIJEDA: PANGGILAN HTTP AKTIF", (20, 240), 0.7, (200, 200, 200), 2)],
+    'camera_opening': [("Membuka kamera deteksi...", (50, 240), 0.7, (255, 192, 0), 2)],
+    'camera_unavailable': [("Kamera Deteksi Tidak Aktif.", (50, 240), 0.7, (255, 255, 255), 2),
+                           ("Pastikan Driver.js terhubung.", (50, 280), 0.5, (200, 200, 200), 1)],
+}
+
+
+@functools.lru_cache(maxsize=None)
+def placeholder_jpeg(key):
+    # Render + encode sekali per key; pemanggilan berikutnya mengembalikan bytes yang sama.
+    image = np.zeros(PLACEHOLDER_SIZE + (3,), dtype=np.uint8)
+    for text, org, font_scale, color, thickness in PLACEHOLDERS[key]:
+        cv2.putText(image, text, org, cv2.FONT_HERSHEY_SIMPLEX, font_scale, color, thickness)
+    ret, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, PLACEHOLDER_JPEG_QUALITY])
+    if not ret:
+        raise RuntimeError(f"Gagal encode placeholder '{key}'")
+    return buffer.tobytes()
+
+
+def mjpeg_part(jpeg_bytes):
+    return MJPEG_PART_HEADER + jpeg_bytes + b'\r\n'
+
+
+class RateMeter:
+    # Jumlah per detik dari jendela 1 detik penuh terakhir (bytes/detik, frame/detik).
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._window_start = clock()
+        self._window_total = 0
+        self.rate = 0.0
+
+    def add(self, amount):
+        now = self.clock()
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self.rate = self._window_total / elapsed
+            self._window_start = now
+            self._window_total = 0
+        self._window_total += amount
+
+
+class JpegEncoder:
+    def __init__(self, quality=95, scale=1.0):
+        self.quality = int(quality)
+        self.scale = scale
+        self._params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        self._lock = threading.Lock()
+        self.encoded_count = 0
+        self.failed_count = 0
+        self.total_bytes = 0
+        self.total_encode_time = 0.0
+        self.byte_rate = RateMeter()
+
+    def encode(self, frame):
+        start = time.perf_counter()
+        if self.scale != 1.0:
+            frame = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        ret, buffer = cv2.imencode('.jpg', frame, self._params)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            if not ret:
+                self.failed_count += 1
+                return None
+            data = buffer.tobytes()
+            self.encoded_count += 1
+            self.total_bytes += len(data)
+            self.total_encode_time += elapsed
+            self.byte_rate.add(len(data))
+        return data
+
+    def stats(self):
+        with self._lock:
+            count = self.encoded_count
+            return {
+                'quality': self.quality,
+                'scale': self.scale,
+                'encoded': count,
+                'failed': self.failed_count,
+                'avg_encode_ms': round(self.total_encode_time / count * 1000.0, 3) if count else 0.0,
+                'avg_bytes': int(self.total_bytes / count) if count else 0,
+                'bytes_per_sec': round(self.byte_rate.rate, 1),
+            }
+
+
+class ViewerPacer:
+    # max_fps / max_kbps: 0 atau None = tanpa batas. Jeda minimum setelah frame terkirim adalah
+    # nilai terbesar dari 1/max_fps, waktu kirim frame itu pada bitrate target, dan lamanya
+    # yield (tulis ke socket) itu sendiri -- viewer yang socket-nya tersendat otomatis dijatah.
+    def __init__(self, max_fps=None, max_kbps=None, clock=time.monotonic):
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.max_bytes_per_sec = max_kbps * 1000.0 / 8.0 if max_kbps else None
+        self.clock = clock
+        self.next_send_time = 0.0
+        self.sent_count = 0
+        self.sent_bytes = 0
+        self.backed_up_count = 0
+        self.total_write_time = 0.0
+        self.byte_rate = RateMeter(clock)
+
+    def delay(self):
+        # Detik yang harus ditunggu sebelum frame berikutnya boleh dikirim (0 = kirim sekarang).
+        return max(0.0, self.next_send_time - self.clock())
+
+    def sent(self, nbytes, write_time):
+        gap = self.min_interval
+        if self.max_bytes_per_sec:
+            gap = max(gap, nbytes / self.max_bytes_per_sec)
+        if write_time > gap and gap:
+            self.backed_up_count += 1
+        self.next_send_time = self.clock() + max(0.0, gap - write_time)
+        self.sent_count += 1
+        self.sent_bytes += nbytes
+        self.total_write_time += write_time
+        self.byte_rate.add(nbytes)
+
+    def stats(self):
+        return {
+            'max_fps': round(1.0 / self.min_interval, 2) if self.min_interval else None,
+            'max_kbps': round(self.max_bytes_per_sec * 8.0 / 1000.0, 1) if self.max_bytes_per_sec else None,
+            'sent': self.sent_count,
+            'sent_bytes': self.sent_bytes,
+            'bytes_per_sec': round(self.byte_rate.rate, 1),
+            'backed_up': self.backed_up_count,
+            'avg_write_ms': round(self.total_write_time / self.sent_count * 1000.0, 3) if self.sent_count else 0.0,
+        }
@@ -0,0 +1,143 @@
+# File: Client_Driver/model_registry.py
+# Registry model Dlib (detector HOG + shape predictor 68 titik) yang dimuat LAZY, sekali per proses,
+# thread-safe. Server Flask bisa langsung menerima koneksi sementara model dimuat di thread latar;
+# progres pemuatan dilaporkan lewat status() (dipakai route /ready).
+#
+# Proses worker yang di-fork SETELAH model dimuat (mis. replay.py dengan start method 'fork') mewarisi
+# objek model lewat copy-on-write: tidak ada deserialisasi ulang file .dat ~100 MB per worker.
+import os
+import threading
+import time
+import traceback
+
+from thread_utils import spawn_daemon_thread
+
+MODEL_PENDING = 'pending'
+MODEL_LOADING = 'loading'
+MODEL_READY = 'ready'
+MODEL_FAILED = 'failed'
+
+# (nama langkah, bobot progres) -- deserialisasi predictor mendominasi waktu muat.
+LOAD_STEPS = (('import_dlib', 0.05), ('detector', 0.15), ('predictor', 0.80))
+
+
+class ModelRegistry:
+    def __init__(self, model_path, clock=time.perf_counter):
+        self.model_path = model_path
+        self.clock = clock
+        self.state = MODEL_PENDING
+        self.step = None
+        self.progress = 0.0
+        self.error = None
+        self.timings_ms = {}
+        self.detector = None
+        self.predictor = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._listeners = []
+        self._started_at = None
+        self._finished_at = None
+
+    def on_ready(self, callback):
+        # callback(detector, predictor) dipanggil sekali saat model siap (langsung jika sudah siap).
+        with self._lock:
+            if self.state != MODEL_READY:
+                self._listeners.append(callback)
+                return
+        callback(self.detector, self.predictor)
+
+    def start_background_load(self, spawn_fn=None):
+        # Non-blocking: mulai load() di thread latar jika belum pernah dimulai.
+        with self._lock:
+            if self.state != MODEL_PENDING:
+                return False
+            self.state = MODEL_LOADING
+        (spawn_fn or spawn_daemon_thread)(self._load, 'model-registry-load')
+        return True
+
+    def load(self, timeout=None):
+        # Blocking: muat (atau tunggu pemuatan yang sedang berjalan). Kembalikan (detector, predictor) atau None.
+        with self._lock:
+            start_here = self.state == MODEL_PENDING
+            if start_here:
+                self.state = MODEL_LOADING
+        if start_here:
+            self._load()
+        self._done.wait(timeout)
+        return (self.detector, self.predictor) if self.state == MODEL_READY else None
+
+    def _load(self):
+        self._started_at = self.clock()
+        done_weight = 0.0
+        try:
+            for step, weight in LOAD_STEPS:
+                self.step = step
+                step_start = self.clock()
+                if step == 'import_dlib':
+                    import dlib
+                elif step == 'detector':
+                    detector = dlib.get_frontal_face_detector()
+                elif step == 'predictor':
+                    if not os.path.exists(self.model_path):
+                        raise FileNotFoundError(f"File model Dlib tidak ditemukan di: {self.model_path}")
+                    predictor = dlib.shape_predictor(self.model_path)
+                self.timings_ms[step] = round((self.clock() - step_start) * 1000.0, 1)
+                done_weight += weight
+                self.progress = round(done_weight, 3)
+                print(f"[Model] Langkah '{step}' selesai ({self.timings_ms[step]:.0f} ms, progres {self.progress * 100:.0f}%).")
+        except Exception as e:
+            self.error = str(e)
+            print(f"[ERROR] Gagal memuat model Dlib: {e}")
+            if not isinstance(e, FileNotFoundError):
+                traceback.print_exc()
+            with self._lock:
+                self.state = MODEL_FAILED
+                self._listeners = []
+            self._finished_at = self.clock()
+            self._done.set()
+            return
+        with self._lock:
+            self.detector, self.predictor = detector, predictor
+            self.state = MODEL_READY
+            self.step = None
+            listeners, self._listeners = self._listeners, []
+        self._finished_at = self.clock()
+        print(f"[Model] Model Dlib siap dalam {self.elapsed_ms():.0f} ms.")
+        self._done.set()
+        for callback in listeners:
+            try:
+                callback(detector, predictor)
+            except Exception as e:
+                print(f"[Model] Exception di callback on_ready: {e}")
+
+    def elapsed_ms(self):
+        if self._started_at is None:
+            return 0.0
+        end = self._finished_at if self._finished_at is not None else self.clock()
+        return round((end - self._started_at) * 1000.0, 1)
+
+    def status(self):
+        return {
+            'state': self.state,
+            'ready': self.state == MODEL_READY,
+            'step': self.step,
+            'progress': self.progress,
+            'elapsed_ms': self.elapsed_ms(),
+            'timings_ms': dict(self.timings_ms),
+            'model_path': self.model_path,
+            'error': self.error,
+        }
+
+
+# Satu registry per path model per proses (dibagikan ke worker hasil fork lewat copy-on-write).
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(model_path):
+    model_path = os.path.abspath(model_path)
+    with _registries_lock:
+        registry = _registries.get(model_path)
+        if registry is None:
+            registry = _registries[model_path] = ModelRegistry(model_path)
+        return registry
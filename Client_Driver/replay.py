@@ -0,0 +1,255 @@
+# File: Client_Driver/replay.py
+# Replay offline sesi mengemudi rekaman: hitung ulang timeline EAR/PERCLOS/alarm tanpa kamera,
+# mis. setelah mengubah CLOSED_EYES_SECONDS, PERCLOS_THRESHOLD atau parameter kalibrasi.
+#
+# Bagian mahal (deteksi wajah + landmark -> EAR) dipecah per chunk frame dan dijalankan paralel
+# di process pool. Model Dlib dimuat sekali di proses utama (model_registry) lalu worker di-fork
+# sehingga mewarisinya lewat copy-on-write; di platform tanpa fork (Windows) tiap worker memuat
+# model sendiri. State machine kantuk
+# (drowsiness_state.DrowsinessState) bersifat sekuensial dan murah, jadi dijalankan di proses
+# utama atas deret EAR yang sudah terurut sehingga hasilnya identik dengan loop deteksi live.
+#
+# Contoh:
+#   python replay.py rekaman/ --workers 4 --output-dir hasil_replay --perclos-threshold 0.30
+import argparse
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import time
+
+import cv2
+import numpy as np
+
+from drowsiness_state import (DrowsinessState, ALARM_EVENT_ALERT, ALARM_EVENT_NORMAL, ALARM_COOLDOWN,
+                              CALIBRATION_MIN_SAMPLES, CALIBRATION_SECONDS, CLOSED_EYES_SECONDS,
+                              INITIAL_OPEN_EAR_AVG, PERCLOS_THRESHOLD, PERCLOS_WINDOW_SECONDS)
+from face_tracker import TRACKING_MODES, FaceTracker
+from facial_metrics import mean_ear, shape_to_np
+from model_registry import get_registry
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODEL_PATH = os.path.join(BASE_DIR, "model", "shape_predictor_68_face_landmarks.dat")
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov', '.m4v', '.webm')
+DEFAULT_FPS = 30.0
+
+ALARM_EVENT_CODES = {None: 0, ALARM_EVENT_ALERT: 1, ALARM_EVENT_NORMAL: -1}
+
+# Model Dlib milik proses worker (diisi oleh _init_worker, sekali per proses).
+_worker_models = {}
+
+
+def find_videos(paths):
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                videos.extend(os.path.join(root, name) for name in sorted(files) if name.lower().endswith(VIDEO_EXTENSIONS))
+        else:
+            videos.append(path)
+    return videos
+
+
+def probe_video(video_path):
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise IOError(f"Gagal membuka video: {video_path}")
+    frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = capture.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+    capture.release()
+    return frame_count, fps
+
+
+def _init_worker(model_path, tracking_mode, keyframe_interval, detection_scale):
+    # Worker hasil fork: registry sudah READY (diwarisi dari proses utama), load() langsung kembali.
+    models = get_registry(model_path).load()
+    if models is None:
+        raise RuntimeError(f"Model Dlib gagal dimuat di worker: {model_path}")
+    detector, _worker_models['predictor'] = models
+    _worker_models['tracker_args'] = (detector, tracking_mode, keyframe_interval, detection_scale)
+
+
+def _seek(capture, video_path, start_frame):
+    capture.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    if int(capture.get(cv2.CAP_PROP_POS_FRAMES)) == start_frame:
+        return capture
+    # Seek tidak akurat untuk sebagian codec: buka ulang dan maju frame demi frame.
+    capture.release()
+    capture = cv2.VideoCapture(video_path)
+    for _ in range(start_frame):
+        if not capture.grab():
+            break
+    return capture
+
+
+def score_chunk(video_path, start_frame, end_frame):
+    # Worker: EAR per frame untuk frame [start_frame, end_frame). NaN jika wajah tidak terdeteksi.
+    detector, tracking_mode, keyframe_interval, detection_scale = _worker_models['tracker_args']
+    predictor = _worker_models['predictor']
+    tracker = FaceTracker(detector, mode=tracking_mode, keyframe_interval=keyframe_interval, detection_scale=detection_scale)
+    ears = []
+    capture = _seek(cv2.VideoCapture(video_path), video_path, start_frame)
+    for _ in range(end_frame - start_frame):
+        success, frame = capture.read()
+        if not success:
+            break
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        face = tracker.locate(gray)
+        ears.append(mean_ear(shape_to_np(predictor(gray, face)), INITIAL_OPEN_EAR_AVG) if face is not None else np.nan)
+    capture.release()
+    return start_frame, np.asarray(ears, dtype=np.float32)
+
+
+def score_ear_series(timestamps, ears, **state_kwargs):
+    # Jalankan DrowsinessState atas deret EAR (NaN = tidak ada wajah) -> dict kolom timeline.
+    state = DrowsinessState(**state_kwargs)
+    state.reset(now=float(timestamps[0]) if len(timestamps) else 0.0)
+    count = len(ears)
+    perclos = np.full(count, np.nan, dtype=np.float32)
+    calibrated = np.zeros(count, dtype=bool)
+    threshold = np.zeros(count, dtype=np.float32)
+    alarm_on = np.zeros(count, dtype=bool)
+    alarm_event = np.zeros(count, dtype=np.int8)
+    blink_rate = np.full(count, np.nan, dtype=np.float32)
+    for i in range(count):
+        if np.isnan(ears[i]):
+            result = state.update_no_face(now=float(timestamps[i]))
+        else:
+            result = state.update(float(ears[i]), now=float(timestamps[i]))
+        if result.perclos != -1:
+            perclos[i] = result.perclos
+        calibrated[i] = state.is_calibrated
+        threshold[i] = state.ear_threshold
+        alarm_on[i] = state.alarm_on
+        alarm_event[i] = ALARM_EVENT_CODES[result.alarm_event]
+        rate = state.blink_rate(float(timestamps[i]))
+        if rate is not None:
+            blink_rate[i] = rate
+    return {
+        'frame_index': np.arange(count, dtype=np.int32),
+        'timestamp': np.asarray(timestamps, dtype=np.float64),
+        'ear': np.asarray(ears, dtype=np.float32),
+        'perclos': perclos,
+        'calibrated': calibrated,
+        'threshold': threshold,
+        'alarm_on': alarm_on,
+        'alarm_event': alarm_event,
+        'blink_rate': blink_rate,
+    }
+
+
+def assemble_chunks(parts, chunks, video_path=''):
+    # Gabungkan EAR per chunk. Jika jumlah frame diketahui (chunks tidak None), chunk yang terbaca kurang
+    # (decode error / seek meleset) diisi NaN sampai end - start, agar timestamp frame sesudahnya tidak bergeser.
+    if not parts:
+        return np.zeros(0, dtype=np.float32)
+    if chunks is None:
+        return np.concatenate([ears for _, ears in parts])
+    padded = []
+    for (start, ears), (_, end) in zip(parts, chunks):
+        missing = end - start - len(ears)
+        if missing > 0:
+            print(f"[Replay] Peringatan: {video_path} frame {start}-{end - 1}: {missing} frame tidak terbaca, diisi NaN.")
+            ears = np.concatenate([ears, np.full(missing, np.nan, dtype=np.float32)])
+        padded.append(ears)
+    return np.concatenate(padded)
+
+
+def replay_video(video_path, executor, chunk_size, state_kwargs):
+    frame_count, fps = probe_video(video_path)
+    if frame_count <= 0:
+        # Jumlah frame tidak diketahui (container tanpa indeks): proses seluruh video dalam satu chunk.
+        chunks = [(0, 2 ** 31 - 1)]
+    else:
+        chunks = [(start, min(start + chunk_size, frame_count)) for start in range(0, frame_count, chunk_size)]
+    futures = [executor.submit(score_chunk, video_path, start, end) for start, end in chunks]
+    parts = sorted((future.result() for future in futures), key=lambda part: part[0])
+    ears = assemble_chunks(parts, chunks if frame_count > 0 else None, video_path)
+    timestamps = np.arange(len(ears), dtype=np.float64) / fps
+    timeline = score_ear_series(timestamps, ears, **state_kwargs)
+    return timeline, fps
+
+
+def save_timeline(output_path, timeline, metadata):
+    # Format kolumnar ringkas: satu array per kolom dalam .npz terkompresi + metadata JSON.
+    np.savez_compressed(output_path, metadata=np.array(json.dumps(metadata)), **timeline)
+
+
+def load_timeline(path):
+    with np.load(path) as data:
+        timeline = {key: data[key] for key in data.files if key != 'metadata'}
+        metadata = json.loads(str(data['metadata']))
+    return timeline, metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay & scoring offline rekaman sesi mengemudi.")
+    parser.add_argument('inputs', nargs='+', help="File video atau direktori berisi video")
+    parser.add_argument('--output-dir', default='replay_output')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=900, help="Jumlah frame per tugas worker")
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH)
+    parser.add_argument('--tracking-mode', default='off', choices=TRACKING_MODES)
+    parser.add_argument('--keyframe-interval', type=int, default=10)
+    parser.add_argument('--detection-scale', type=float, default=1.0)
+    parser.add_argument('--closed-eyes-seconds', type=float, default=CLOSED_EYES_SECONDS)
+    parser.add_argument('--perclos-threshold', type=float, default=PERCLOS_THRESHOLD)
+    parser.add_argument('--perclos-window-seconds', type=float, default=PERCLOS_WINDOW_SECONDS)
+    parser.add_argument('--calibration-seconds', type=float, default=CALIBRATION_SECONDS)
+    parser.add_argument('--calibration-min-samples', type=int, default=CALIBRATION_MIN_SAMPLES)
+    parser.add_argument('--alarm-cooldown', type=float, default=ALARM_COOLDOWN)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        raise SystemExit(f"[ERROR] File model Dlib tidak ditemukan di: {args.model}")
+    videos = find_videos(args.inputs)
+    if not videos:
+        raise SystemExit("[ERROR] Tidak ada file video yang ditemukan.")
+    os.makedirs(args.output_dir, exist_ok=True)
+    state_kwargs = {
+        'closed_eyes_seconds': args.closed_eyes_seconds,
+        'perclos_threshold': args.perclos_threshold,
+        'perclos_window_seconds': args.perclos_window_seconds,
+        'calibration_seconds': args.calibration_seconds,
+        'calibration_min_samples': args.calibration_min_samples,
+        'alarm_cooldown': args.alarm_cooldown,
+    }
+
+    total_frames = 0
+    start_all = time.perf_counter()
+    init_args = (args.model, args.tracking_mode, args.keyframe_interval, args.detection_scale)
+    fork_available = 'fork' in multiprocessing.get_all_start_methods()
+    if fork_available:
+        # Pre-fork: muat model sekali di sini, worker mewarisinya (copy-on-write).
+        registry = get_registry(args.model)
+        if registry.load() is None:
+            raise SystemExit(f"[ERROR] {registry.error}")
+        print(f"[Replay] Model dimuat sekali dalam {registry.elapsed_ms():.0f} ms, dibagikan ke {args.workers} worker (fork).")
+    mp_context = multiprocessing.get_context('fork') if fork_available else None
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers, mp_context=mp_context,
+                                                initializer=_init_worker, initargs=init_args) as executor:
+        for video_path in videos:
+            start = time.perf_counter()
+            try:
+                timeline, fps = replay_video(video_path, executor, args.chunk_size, state_kwargs)
+            except IOError as e:
+                print(f"[Replay] {e}")
+                continue
+            elapsed = time.perf_counter() - start
+            frames = len(timeline['ear'])
+            total_frames += frames
+            output_path = os.path.join(args.output_dir, os.path.splitext(os.path.basename(video_path))[0] + '.npz')
+            save_timeline(output_path, timeline, {'video': video_path, 'fps': fps, 'params': state_kwargs,
+                                                  'tracking_mode': args.tracking_mode, 'detection_scale': args.detection_scale})
+            alerts = int(np.sum(timeline['alarm_event'] == ALARM_EVENT_CODES[ALARM_EVENT_ALERT]))
+            fps_done = frames / elapsed if elapsed else 0.0
+            print(f"[Replay] {video_path}: {frames} frame, {alerts} alarm, {fps_done:.1f} fps "
+                  f"({fps_done / args.workers:.1f} fps/core) -> {output_path}")
+    elapsed_all = time.perf_counter() - start_all
+    if elapsed_all and total_frames:
+        print(f"[Replay] Total {total_frames} frame dalam {elapsed_all:.1f}s: {total_frames / elapsed_all:.1f} fps, "
+              f"{total_frames / elapsed_all / args.workers:.1f} fps/core ({args.workers} worker)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+# File: Client_Driver/rolling_stats.py
+# Statistik inkremental untuk state machine kantuk, semua O(1) (amortized) per frame:
+#   - TimeWindowSum      : jumlah/rata-rata berjalan atas jendela WAKTU (detik, dari timestamp frame),
+#                          sehingga makna jendela tidak berubah saat fps kamera naik/turun.
+#   - OnlineStats        : mean/varians online (Welford) tanpa menyimpan sampel.
+#   - CalibrationEstimator: rata-rata EAR mata terbuka selama kalibrasi dengan penolakan outlier
+#                          (kedipan) terhadap median awal dan mean/std berjalan.
+#   - BlinkTracker       : deteksi kedipan dari transisi tertutup->terbuka; laju kedipan (per menit)
+#                          dan durasi kedipan rata-rata atas jendela waktu.
+import collections
+import math
+
+
+class TimeWindowSum:
+    def __init__(self, window_seconds):
+        self.window_seconds = float(window_seconds)
+        self._samples = collections.deque()
+        self.clear()
+
+    def clear(self):
+        self._samples.clear()
+        self.sum = 0.0
+        self._started_at = None
+
+    def add(self, timestamp, value):
+        if self._started_at is None:
+            self._started_at = timestamp
+        self._samples.append((timestamp, value))
+        self.sum += value
+        self.evict(timestamp)
+
+    def evict(self, now):
+        # Buang sampel yang sudah keluar dari jendela (now - window, now].
+        cutoff = now - self.window_seconds
+        samples = self._samples
+        while samples and samples[0][0] <= cutoff:
+            self.sum -= samples.popleft()[1]
+        if not samples:
+            self.sum = 0.0  # Hindari sisa galat floating point saat jendela kosong
+
+    @property
+    def count(self):
+        return len(self._samples)
+
+    def mean(self):
+        return self.sum / len(self._samples) if self._samples else None
+
+    def is_full(self, now):
+        return self._started_at is not None and now - self._started_at >= self.window_seconds
+
+
+class OnlineStats:
+    __slots__ = ('count', 'mean', '_m2')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self):
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+
+class CalibrationEstimator:
+    # Sampel awal (seed_samples) menentukan median acuan; setelah itu sampel ditolak jika
+    # < median x blink_ratio (kedipan/mata menyipit) atau < mean - outlier_sigma x std berjalan.
+    def __init__(self, seed_samples=9, blink_ratio=0.8, outlier_sigma=2.5):
+        self.seed_samples = seed_samples
+        self.blink_ratio = blink_ratio
+        self.outlier_sigma = outlier_sigma
+        self.reset()
+
+    def reset(self):
+        self.stats = OnlineStats()
+        self._seed = []
+        self._reference = None
+        self.rejected = 0
+
+    def add(self, ear):
+        # True jika sampel diterima ke statistik kalibrasi.
+        if self._reference is None:
+            self._seed.append(ear)
+            if len(self._seed) < self.seed_samples:
+                return False
+            self._reference = sorted(self._seed)[len(self._seed) // 2]
+            seed, self._seed = self._seed, []
+            accepted = [value for value in seed if value >= self._reference * self.blink_ratio]
+            self.rejected += len(seed) - len(accepted)
+            for value in accepted:
+                self.stats.add(value)
+            return ear >= self._reference * self.blink_ratio
+        if ear < self._reference * self.blink_ratio or (
+                self.stats.count > 1 and ear < self.stats.mean - self.outlier_sigma * self.stats.std):
+            self.rejected += 1
+            return False
+        self.stats.add(ear)
+        return True
+
+    @property
+    def accepted(self):
+        return self.stats.count
+
+    def mean(self):
+        return self.stats.mean if self.stats.count else None
+
+
+class BlinkTracker:
+    # Kedipan = mata tertutup lalu terbuka lagi dalam <= max_blink_seconds (lebih lama: bukan kedipan,
+    # melainkan mata tertutup lama yang ditangani aturan kantuk). Statistik atas jendela window_seconds.
+    def __init__(self, window_seconds=60.0, max_blink_seconds=0.5):
+        self.max_blink_seconds = max_blink_seconds
+        self.blinks = TimeWindowSum(window_seconds)
+        self.clear()
+
+    def clear(self):
+        self.blinks.clear()
+        self._closed_since = None
+        self._observed_since = None
+
+    def update(self, timestamp, closed):
+        if self._observed_since is None:
+            self._observed_since = timestamp
+        if closed:
+            if self._closed_since is None:
+                self._closed_since = timestamp
+        elif self._closed_since is not None:
+            duration = timestamp - self._closed_since
+            self._closed_since = None
+            if duration <= self.max_blink_seconds:
+                self.blinks.add(timestamp, duration)
+        self.blinks.evict(timestamp)
+
+    def interrupt(self, now):
+        # Frame tanpa wajah: penutupan yang sedang berjalan tidak dihitung kedipan; jendela tetap digeser.
+        self._closed_since = None
+        self.blinks.evict(now)
+
+    def is_closed(self):
+        return self._closed_since is not None
+
+    def closed_seconds(self, now):
+        # Lama mata tertutup berturut-turut sejak frame tertutup pertama (0 jika terbuka).
+        return now - self._closed_since if self._closed_since is not None else 0.0
+
+    def rate_per_minute(self, now):
+        covered = min(self.blinks.window_seconds, now - self._observed_since) if self._observed_since is not None else 0.0
+        return self.blinks.count * 60.0 / covered if covered > 0 else None
+
+    def mean_duration(self):
+        return self.blinks.mean()
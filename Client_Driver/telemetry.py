@@ -0,0 +1,139 @@
+# File: Client_Driver/telemetry.py
+# Penerbit telemetri Socket.IO per engine. Loop deteksi memanggilnya setiap frame, tetapi yang
+# benar-benar dikirim ke klien (Driver.js, lalu diteruskan ke Server.js/Supervisor.js) jauh lebih sedikit:
+#   - update_data   : digabung per jendela 1/rate_hz detik -> satu pesan berisi nilai terakhir
+#                     (format lama, kompatibel dengan Driver.js) + ringkasan min/max/mean jendela.
+#   - status_update : pesan identik berturut-turut tidak dikirim ulang; progres kalibrasi
+#                     (coalesce=True) hanya dikirim versi terbarunya sekali per jendela.
+#   - drowsiness_alert dan event lain (send): langsung dikirim, tanpa penundaan.
+import json
+import threading
+import time
+
+
+def _payload_size(event, data):
+    # Perkiraan ukuran pesan di kabel (nama event + JSON payload), untuk statistik penghematan.
+    return len(event) + len(json.dumps(data, separators=(',', ':'), default=str))
+
+
+class TelemetryPublisher:
+    def __init__(self, emit_fn, rate_hz=5.0, clock=time.monotonic):
+        self.emit_fn = emit_fn
+        self.interval = 1.0 / rate_hz if rate_hz and rate_hz > 0 else 0.0  # 0 = kirim setiap frame (perilaku lama)
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.counters = {'requested': 0, 'sent': 0, 'coalesced': 0, 'suppressed': 0, 'bytes_sent': 0, 'bytes_saved': 0}
+        self.reset(flush=False)
+
+    def reset(self, flush=True):
+        # Dipanggil saat engine direset: kirim dulu jendela berjalan & status tertunda (frame berikutnya
+        # mungkin tidak pernah datang), lalu mulai dari awal tanpa status terakhir.
+        with self._lock:
+            if flush:
+                self._flush_locked(self.clock())
+            self._window_start = None
+            self._clear_window()
+            self._pending_status = None
+            self._last_status = None
+
+    def _clear_window(self):
+        self._frames = 0
+        self._latest = None
+        self._ear_count = 0
+        self._ear_sum = 0.0
+        self._ear_min = None
+        self._ear_max = None
+        self._perclos_max = None
+
+    def _emit(self, event, data, **kwargs):
+        # Dipanggil dengan _lock dipegang.
+        self.counters['sent'] += 1
+        self.counters['bytes_sent'] += _payload_size(event, data)
+        self.emit_fn(event, data, **kwargs)
+
+    def _skip(self, event, data, counter):
+        self.counters[counter] += 1
+        self.counters['bytes_saved'] += _payload_size(event, data)
+
+    def send(self, event, data, **kwargs):
+        # Kirim langsung (alarm, event handler kamera, pesan ke satu klien).
+        with self._lock:
+            self.counters['requested'] += 1
+            if event == 'status_update' and 'room' not in kwargs:
+                self._pending_status = None
+                self._last_status = data
+            elif 'room' not in kwargs:
+                self._last_status = None  # Tampilan klien berubah: status berikutnya harus dikirim lagi
+            self._emit(event, data, **kwargs)
+
+    def alert(self, data):
+        self.send('drowsiness_alert', data)
+
+    def status_update(self, data, coalesce=False):
+        with self._lock:
+            self.counters['requested'] += 1
+            if data == self._last_status or data == self._pending_status:
+                self._skip('status_update', data, 'suppressed')
+                return
+            if coalesce and self.interval:
+                if self._pending_status is not None:
+                    self._skip('status_update', self._pending_status, 'coalesced')
+                self._pending_status = data
+                return
+            self._pending_status = None
+            self._last_status = data
+            self._emit('status_update', data)
+
+    def update_data(self, data):
+        # data: payload update_data per frame (ear/perclos None jika tidak ada).
+        with self._lock:
+            self.counters['requested'] += 1
+            now = self.clock()
+            if self._window_start is None:
+                self._window_start = now
+            if self._latest is not None:
+                self._skip('update_data', self._latest, 'coalesced')
+            self._frames += 1
+            self._latest = data
+            ear, perclos = data.get('ear'), data.get('perclos')
+            if ear is not None:
+                self._ear_count += 1
+                self._ear_sum += ear
+                self._ear_min = ear if self._ear_min is None else min(self._ear_min, ear)
+                self._ear_max = ear if self._ear_max is None else max(self._ear_max, ear)
+            if perclos is not None:
+                self._perclos_max = perclos if self._perclos_max is None else max(self._perclos_max, perclos)
+            if now - self._window_start >= self.interval:
+                self._flush_locked(now)
+
+    def flush(self):
+        # Kirim jendela berjalan sekarang, mis. saat kamera dilepas dan update_data() berhenti dipanggil.
+        with self._lock:
+            self._flush_locked(self.clock())
+
+    def _flush_locked(self, now):
+        if self._pending_status is not None:
+            self._last_status = self._pending_status
+            self._emit('status_update', self._pending_status)
+            self._pending_status = None
+        if self._latest is not None:
+            batch = dict(self._latest)
+            batch.update({
+                'frames': self._frames,
+                'ear_min': self._ear_min, 'ear_max': self._ear_max,
+                'ear_mean': self._ear_sum / self._ear_count if self._ear_count else None,
+                'perclos_max': self._perclos_max,
+            })
+            if self._ear_count:
+                self._last_status = None  # Wajah terlihat: Driver.js memperbarui status dari update_data
+            self._latest = None  # Sudah dikirim, jangan dihitung sebagai 'coalesced'
+            self._emit('update_data', batch)
+        self._clear_window()
+        self._window_start = now
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+        stats['rate_hz'] = round(1.0 / self.interval, 3) if self.interval else None
+        stats['messages_saved'] = stats['coalesced'] + stats['suppressed']
+        return stats
@@ -0,0 +1,8 @@
+# File: Client_Driver/tests/conftest.py
+# Agar modul di Client_Driver/ (alarm_dispatcher, drowsiness_engine, ...) bisa diimpor dari tests/.
+import os
+import sys
+
+CLIENT_DRIVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if CLIENT_DRIVER_DIR not in sys.path:
+    sys.path.insert(0, CLIENT_DRIVER_DIR)
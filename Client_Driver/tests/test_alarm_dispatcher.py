@@ -0,0 +1,81 @@
+# File: Client_Driver/tests/test_alarm_dispatcher.py
+# Episode alarm harus ditutup saat sesi deteksi berakhir (reset/resume/kamera dilepas), bukan terus bereskalasi.
+import time
+
+import pytest
+
+from alarm_dispatcher import AlarmDispatcher, engine_alarm_fn
+from camera_manager import CAMERA_HANDED_OVER, CAMERA_IDLE
+from drowsiness_engine import DrowsinessEngine
+from drowsiness_state import ALARM_EVENT_ALERT
+
+
+def wait_until(predicate, timeout=2.0):
+    end = time.time() + timeout
+    while time.time() < end:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+@pytest.fixture
+def setup():
+    delivered = []
+    levels = [('audio', 0.0, lambda alarm: delivered.append('audio')),
+              ('supervisor', 0.3, lambda alarm: delivered.append('supervisor'))]
+    dispatcher = AlarmDispatcher(levels, debounce_seconds=5.0)
+    dispatcher.start()
+
+    # alarm_fn = fungsi yang sama dengan DrowsinessDetection.dispatch_alarm
+    engine = DrowsinessEngine('driver1', None, '/', None, None, emit_fn=lambda event, data, **kwargs: None,
+                              alarm_fn=engine_alarm_fn(dispatcher), spawn_fn=lambda target, name=None: None)
+    yield engine, dispatcher, delivered
+    dispatcher.stop()
+
+
+def start_alarm(engine, dispatcher, delivered):
+    engine.state.alarm_on = True
+    engine.alarm_fn(engine, ALARM_EVENT_ALERT, "PERCLOS tinggi", engine.state.clock())
+    assert wait_until(lambda: 'audio' in delivered)
+    assert dispatcher.stats()['active_episodes'] == ['driver1']
+
+
+def assert_episode_ended(engine, dispatcher, delivered):
+    assert engine.state.alarm_on is False
+    assert wait_until(lambda: dispatcher.stats()['active_episodes'] == [])
+    time.sleep(0.4)  # Melewati jeda level supervisor: eskalasi tidak boleh terkirim
+    assert 'supervisor' not in delivered
+    assert dispatcher.stats()['ends'] >= 1
+
+
+def test_reset_during_active_alarm_ends_episode(setup):
+    engine, dispatcher, delivered = setup
+    start_alarm(engine, dispatcher, delivered)
+    engine.reset(source="test")
+    assert_episode_ended(engine, dispatcher, delivered)
+
+
+def test_resume_during_active_alarm_ends_episode(setup):
+    engine, dispatcher, delivered = setup
+    start_alarm(engine, dispatcher, delivered)
+    engine.resume(source="test", handover_seconds=1.0)
+    assert_episode_ended(engine, dispatcher, delivered)
+
+
+@pytest.mark.parametrize('camera_state', [CAMERA_HANDED_OVER, CAMERA_IDLE])
+def test_camera_leaving_streaming_ends_episode(setup, camera_state):
+    engine, dispatcher, delivered = setup
+    start_alarm(engine, dispatcher, delivered)
+    engine._on_camera_state(camera_state, {'reason': 'webrtc'})
+    assert_episode_ended(engine, dispatcher, delivered)
+
+
+def test_alert_after_end_starts_new_episode(setup):
+    engine, dispatcher, delivered = setup
+    start_alarm(engine, dispatcher, delivered)
+    engine.reset(source="test")
+    assert wait_until(lambda: dispatcher.stats()['active_episodes'] == [])
+    engine.alarm_fn(engine, ALARM_EVENT_ALERT, "PERCLOS tinggi", engine.state.clock())
+    assert wait_until(lambda: delivered.count('audio') == 2)
+    assert dispatcher.stats()['episodes'] == 2
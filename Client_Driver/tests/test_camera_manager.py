@@ -0,0 +1,174 @@
+# File: Client_Driver/tests/test_camera_manager.py
+# CameraManager dengan capture palsu (tanpa device): handover, pembukaan ulang yang dibatalkan, release.
+import threading
+import time
+
+import numpy as np
+
+from camera_manager import CAMERA_HANDED_OVER, CAMERA_IDLE, CAMERA_OPENING, CAMERA_STREAMING, CameraManager
+
+
+class FakeCapture:
+    def __init__(self, opened=True):
+        self.opened = opened
+        self.released = False
+
+    def isOpened(self):
+        return self.opened
+
+    def read(self):
+        if self.released:
+            return False, None
+        return True, np.zeros((48, 64, 3), np.uint8)
+
+    def release(self):
+        self.released = True
+
+
+class FakeCamera:
+    # open_fn palsu + clock manual; `available` menentukan apakah pembukaan berikutnya berhasil.
+    def __init__(self):
+        self.available = True
+        self.now = 0.0
+        self.captures = []
+
+    def open(self, source):
+        capture = FakeCapture(self.available)
+        self.captures.append(capture)
+        return capture
+
+    def clock(self):
+        return self.now
+
+
+class StateLog:
+    def __init__(self):
+        self.events = []
+        self._changed = threading.Condition()
+
+    def __call__(self, state, info):
+        with self._changed:
+            self.events.append((state, info))
+            self._changed.notify_all()
+
+    def wait_for(self, state, count=1, timeout=2.0):
+        # Tunggu sampai `state` sudah dilaporkan `count` kali; kembalikan info terakhirnya.
+        with self._changed:
+            assert self._changed.wait_for(lambda: self.count(state) >= count, timeout), (state, self.events)
+            return [info for logged, info in self.events if logged == state][-1]
+
+    def count(self, state):
+        return sum(1 for logged, _ in self.events if logged == state)
+
+
+def make_manager():
+    camera, log = FakeCamera(), StateLog()
+    manager = CameraManager(0, on_state_change=log, open_fn=camera.open, retry_delays=(0.2, 0.2, 0.2),
+                            clock=camera.clock, name='test')
+    return manager, camera, log
+
+
+def test_first_open_has_no_handover():
+    manager, camera, log = make_manager()
+    manager.request_open('client_connect')
+    info = log.wait_for(CAMERA_STREAMING)
+    assert info['handover_seconds'] is None
+    success, frame = manager.read()
+    assert success and frame.shape == (48, 64, 3)
+
+
+def test_handover_time_survives_cancelled_reopen():
+    manager, camera, log = make_manager()
+    manager.request_open('client_connect')
+    log.wait_for(CAMERA_STREAMING)
+
+    camera.now = 10.0
+    manager.hand_over('webrtc_start')
+    log.wait_for(CAMERA_HANDED_OVER)
+    assert camera.captures[0].released
+    assert manager.read() == (False, None)
+
+    # Kamera belum tersedia saat dibuka ulang; handover lagi membatalkan retry di tengah jalan.
+    camera.available = False
+    camera.now = 12.0
+    manager.request_open('webrtc_end')
+    log.wait_for(CAMERA_OPENING, count=2)
+    manager.hand_over('webrtc_start')
+    log.wait_for(CAMERA_HANDED_OVER, count=2)
+
+    camera.available = True
+    camera.now = 13.0
+    manager.request_open('webrtc_end')
+    info = log.wait_for(CAMERA_STREAMING, count=2)
+    assert info['handover_seconds'] == 3.0  # Dari handover pertama (stream terakhir dilepas), bukan yang kedua
+
+
+def test_release_forgets_handover():
+    manager, camera, log = make_manager()
+    manager.request_open('client_connect')
+    log.wait_for(CAMERA_STREAMING)
+    manager.hand_over('webrtc_start')
+    log.wait_for(CAMERA_HANDED_OVER)
+    manager.release('no_clients')
+    log.wait_for(CAMERA_IDLE)
+    manager.request_open('client_connect')
+    assert log.wait_for(CAMERA_STREAMING, count=2)['handover_seconds'] is None
+
+
+def test_open_failure_reports_error_after_retries():
+    manager, camera, log = make_manager()
+    camera.available = False
+    manager.request_open('client_connect')
+    info = log.wait_for(CAMERA_IDLE, timeout=3.0)
+    assert 'error' in info
+    assert manager.open_attempts == 4
+    assert all(capture.released for capture in camera.captures)
+    time.sleep(0.05)
+    assert manager.state == CAMERA_IDLE
+
+
+class FakePoint:
+    def __init__(self, x, y):
+        self.x, self.y = x, y
+
+
+class FakeShape:
+    # 68 landmark sembarang yang tidak degenerate (jarak horizontal mata > 0).
+    def parts(self):
+        return [FakePoint(index, (index * 7) % 13) for index in range(68)]
+
+
+def test_detection_uses_capture_timestamp_not_processing_time():
+    import dlib
+    from drowsiness_engine import DrowsinessEngine
+    from drowsiness_state import ALARM_EVENT_ALERT
+
+    camera, alarms, statuses = FakeCamera(), [], []
+    engine = DrowsinessEngine('driver1', 0, '/', lambda gray: [dlib.rectangle(8, 8, 40, 40)], lambda gray, face: FakeShape(),
+                              emit_fn=lambda event, data, **kwargs: statuses.append(data.get('type')),
+                              alarm_fn=lambda engine, alarm_event, reason, detected_at: alarms.append((alarm_event, detected_at)),
+                              spawn_fn=lambda target, name=None: None, camera_open_fn=camera.open)
+    engine.state.clock = camera.clock
+    engine.camera.request_open('client_connect')
+    deadline = time.time() + 2.0
+    while 'calibration_info' not in statuses and time.time() < deadline:  # reset() saat streaming selesai
+        time.sleep(0.01)
+    assert engine.camera.is_streaming() and 'calibration_info' in statuses
+    engine.state.is_calibrated = True
+    engine.state.ear_threshold = 10.0  # Setiap frame dihitung mata tertutup
+    alarms.clear()  # END dari reset saat kamera mulai streaming
+
+    # Dua frame dibaca 0.7 s terpisah, tapi baru dideteksi belakangan dengan jeda pipeline berbeda-beda.
+    camera.now = 100.0
+    first = engine.read_frame()
+    camera.now = 100.7
+    second = engine.read_frame()
+    assert first[1] == 100.0 and second[1] == 100.7
+    camera.now = 101.5
+    engine._process_captured(first)
+    assert alarms == []
+    camera.now = 101.6
+    engine._process_captured(second)
+    assert alarms == [(ALARM_EVENT_ALERT, 100.7)]  # Durasi & timestamp alarm dari waktu capture
+    assert engine.state.closures._samples[0][0] == 100.0
+    engine.camera.release('test_done')
@@ -0,0 +1,90 @@
+# File: Client_Driver/tests/test_drowsiness_engine.py
+# Reset/resume/handover dari thread kamera tidak boleh bertabrakan dengan frame yang sedang dideteksi.
+import threading
+import time
+
+import numpy as np
+
+from camera_manager import CAMERA_HANDED_OVER
+from drowsiness_engine import DrowsinessEngine
+from drowsiness_state import ALARM_EVENT_ALERT, ALARM_EVENT_END
+
+
+class ScriptedEngine(DrowsinessEngine):
+    # process_frame diganti fungsi uji (tanpa model Dlib).
+    __slots__ = ('frame_fn',)
+
+    def process_frame(self, frame, captured_at=None):
+        return self.frame_fn(frame, captured_at)
+
+
+def make_engine(alarms, frame_fn):
+    engine = ScriptedEngine('driver1', None, '/', None, None, emit_fn=lambda event, data, **kwargs: None,
+                            alarm_fn=lambda engine, alarm_event, reason, detected_at: alarms.append(alarm_event),
+                            spawn_fn=lambda target, name=None: None)
+    engine.frame_fn = frame_fn
+    return engine
+
+
+def blank_frame():
+    return np.zeros((4, 4, 3), np.uint8)
+
+
+def test_handover_waits_for_in_flight_detection():
+    alarms = []
+    entered, release = threading.Event(), threading.Event()
+
+    def slow_frame(frame, captured_at):
+        # Frame yang dibaca sebelum handover memicu alarm di tengah deteksi.
+        entered.set()
+        release.wait(2.0)
+        engine.state.alarm_on = True
+        engine.alarm_fn(engine, ALARM_EVENT_ALERT, "PERCLOS tinggi", captured_at)
+        return frame
+
+    engine = make_engine(alarms, slow_frame)
+    detection = threading.Thread(target=engine.pipeline.stages[1].process, args=((engine._session, 0.0, blank_frame()),))
+    detection.start()
+    assert entered.wait(2.0)
+    handover = threading.Thread(target=engine._on_camera_state, args=(CAMERA_HANDED_OVER, {'reason': 'webrtc'}))
+    handover.start()
+    time.sleep(0.1)
+    assert alarms == []  # Handover menunggu frame yang sedang dideteksi
+    release.set()
+    detection.join(2.0)
+    handover.join(2.0)
+    assert alarms == [ALARM_EVENT_ALERT, ALARM_EVENT_END]
+    assert engine.state.alarm_on is False
+
+
+def test_frame_from_previous_session_is_not_detected():
+    processed = []
+    engine = make_engine([], lambda frame, captured_at: processed.append(captured_at) or frame)
+    stale = (engine._session, 1.0, blank_frame())
+    engine._on_camera_state(CAMERA_HANDED_OVER, {'reason': 'webrtc'})
+    assert engine._process_captured(stale) is None
+    assert engine._process_captured((engine._session, 2.0, blank_frame())) is not None
+    assert processed == [2.0]
+
+
+class RecordingStore:
+    def __init__(self):
+        self.events = []
+
+    def record_event(self, driver_id, kind, message=None, payload=None, ts=None):
+        self.events.append(kind)
+
+    def record_sample(self, *args, **kwargs):
+        pass
+
+
+def test_resume_is_not_recorded_as_calibration():
+    from event_store import EVENT_CALIBRATION
+    store = RecordingStore()
+    engine = DrowsinessEngine('driver1', None, '/', None, None, emit_fn=lambda event, data, **kwargs: None,
+                              alarm_fn=lambda engine, alarm_event, reason, detected_at: None,
+                              spawn_fn=lambda target, name=None: None, event_store=store)
+    engine.state.is_calibrated = True
+    engine.resume(source="webrtc_end", handover_seconds=3.0)
+    engine.telemetry.flush()
+    assert EVENT_CALIBRATION not in store.events
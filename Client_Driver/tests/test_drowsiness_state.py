@@ -0,0 +1,44 @@
+# File: Client_Driver/tests/test_drowsiness_state.py
+# Aturan mata tertutup & statistik kedipan bergantung pada timestamp frame, bukan jumlah frame.
+import pytest
+
+from drowsiness_state import ALARM_EVENT_ALERT, CLOSED_EYES_SECONDS, DrowsinessState
+
+
+def calibrated_state():
+    state = DrowsinessState(alarm_cooldown=0.0)
+    state.reset(now=0.0)
+    state.is_calibrated = True
+    state.ear_threshold = 0.2
+    return state
+
+
+def seconds_until_alert(fps):
+    state = calibrated_state()
+    interval = 1.0 / fps
+    start = 10.0
+    for index in range(int(fps * 5)):
+        now = start + index * interval
+        if state.update(0.1, now).alarm_event == ALARM_EVENT_ALERT:
+            return now - start
+    return None
+
+
+@pytest.mark.parametrize('fps', [10, 15, 30, 60])
+def test_closed_eyes_alarm_latency_independent_of_fps(fps):
+    latency = seconds_until_alert(fps)
+    assert latency is not None
+    assert CLOSED_EYES_SECONDS <= latency < CLOSED_EYES_SECONDS + 1.0 / fps
+
+
+def test_blink_rate_decays_while_no_face():
+    state = calibrated_state()
+    now = 0.0
+    for _ in range(10):  # 10 kedipan 0.1 s, tiap 1 s
+        state.update(0.1, now)
+        state.update(0.3, now + 0.1)
+        now += 1.0
+    assert state.blink_rate(now) > 0
+    for step in range(120):  # 60 s tanpa wajah pada 2 fps
+        state.update_no_face(now + step * 0.5)
+    assert state.blink_rate(now + 60.0) == 0
@@ -0,0 +1,35 @@
+# File: Client_Driver/tests/test_face_tracker.py
+# detection_scale berlaku juga untuk deteksi di ROI (mode 'roi'), dengan kotak dipetakan ke resolusi penuh.
+import dlib
+import numpy as np
+import pytest
+
+from face_tracker import FaceTracker
+
+
+class CenterDetector:
+    # Detector palsu: selalu "menemukan" wajah di tengah citra (separuh lebar/tinggi), mencatat ukuran input.
+    def __init__(self):
+        self.shapes = []
+
+    def __call__(self, image):
+        height, width = image.shape[:2]
+        self.shapes.append((height, width))
+        return [dlib.rectangle(width // 4, height // 4, 3 * width // 4, 3 * height // 4)]
+
+
+@pytest.mark.parametrize('scale', [1.0, 0.5])
+def test_roi_detection_uses_detection_scale(scale):
+    detector = CenterDetector()
+    tracker = FaceTracker(detector, mode='roi', roi_padding=0.25, detection_scale=scale)
+    gray = np.zeros((1440, 1920), np.uint8)
+    first = tracker.locate(gray)  # Keyframe: full-frame
+    second = tracker.locate(gray)  # ROI di sekitar wajah pertama
+    assert tracker.roi_frames == 1
+    roi_width = first.right() - first.left() + 2 * int(first.width() * 0.25)
+    roi_height = first.bottom() - first.top() + 2 * int(first.height() * 0.25)
+    assert roi_width < gray.shape[1] and roi_height < gray.shape[0]
+    assert detector.shapes[1] == (int(round(roi_height * scale)), int(round(roi_width * scale)))
+    # Wajah di tengah ROI = wajah yang sama dengan keyframe, dalam koordinat resolusi penuh.
+    assert abs(second.center().x - first.center().x) <= 2 and abs(second.center().y - first.center().y) <= 2
+    assert abs(second.width() - roi_width // 2) <= 4  # Ukuran kotak dipetakan balik dengan 1 / scale
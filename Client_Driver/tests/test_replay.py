@@ -0,0 +1,21 @@
+# File: Client_Driver/tests/test_replay.py
+# Chunk replay yang terbaca kurang tidak boleh menggeser timestamp frame sesudahnya.
+import numpy as np
+
+from replay import assemble_chunks
+
+
+def test_short_middle_chunk_is_padded_with_nan():
+    chunks = [(0, 3), (3, 6), (6, 9)]
+    parts = [(0, np.array([0.1, 0.2, 0.3], np.float32)),
+             (3, np.array([0.4], np.float32)),  # Decode error setelah frame pertama
+             (6, np.array([0.7, 0.8, 0.9], np.float32))]
+    ears = assemble_chunks(parts, chunks)
+    assert len(ears) == 9
+    assert np.isnan(ears[4:6]).all()
+    np.testing.assert_allclose(ears[6:], [0.7, 0.8, 0.9])
+
+
+def test_unknown_frame_count_concatenates_as_read():
+    parts = [(0, np.array([0.1, 0.2], np.float32))]
+    np.testing.assert_allclose(assemble_chunks(parts, None), [0.1, 0.2])
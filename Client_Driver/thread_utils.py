@@ -0,0 +1,12 @@
+# File: Client_Driver/thread_utils.py
+# Helper thread bersama. Semua thread latar (capture, worker deteksi, lifecycle kamera, pemuat model,
+# writer riwayat, dispatcher alarm) dibuat lewat sini sebagai daemon thread biasa; Socket.IO berjalan
+# dengan async_mode 'threading' sehingga emit dari thread-thread ini aman (lihat DrowsinessDetection.py).
+# Kelas yang menerima `spawn_fn` memakai fungsi ini sebagai default; signature spawn_fn(target, name=None).
+import threading
+
+
+def spawn_daemon_thread(target, name=None):
+    thread = threading.Thread(target=target, daemon=True, name=name)
+    thread.start()
+    return thread
@@ -131,6 +131,11 @@ function handleServerMessage(data) {
             updateDriverStatusInList(data.driver_id, 'DROWSY');
             addLogToSupervisorPanel(`PERINGATAN KANTUK ${data.driver_id}: ${data.message}`, "warning");
             break;
+        case 'supervisor_alarm_escalation':
+            displayDrowsinessNotification(data.driver_id, data.message, 'critical');
+            updateDriverStatusInList(data.driver_id, 'DROWSY');
+            addLogToSupervisorPanel(`ESKALASI KANTUK ${data.driver_id} (${Math.round(data.episode_seconds || 0)} detik): ${data.message}`, "error");
+            break;
         case 'supervisor_driver_normal':
             displayDrowsinessNotification(data.driver_id, `Driver ${data.driver_id} kembali normal.`, 'normal');
             updateDriverStatusInList(data.driver_id, 'ONLINE');
@@ -171,6 +171,20 @@ wss.on('connection', (ws) => {
                 }
                 break;
 
+            case 'driver_alarm_escalation':
+                if (currentClientInfo.type === 'driver') {
+                    console.log(`[Server] Alarm escalation from Driver '${currentClientInfo.id}' (level ${data.level}): ${data.message}`);
+                    broadcastToSupervisors({
+                        type: 'supervisor_alarm_escalation',
+                        driver_id: currentClientInfo.id,
+                        message: data.message || 'Drowsiness persists!',
+                        level: data.level,
+                        episode_seconds: data.episode_seconds,
+                        timestamp: data.timestamp
+                    });
+                }
+                break;
+
             case 'driver_normal_notification':
                  if (currentClientInfo.type === 'driver') {
                     console.log(`[Server] Normal status from Driver '${currentClientInfo.id}'`);